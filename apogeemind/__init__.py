@@ -6,6 +6,7 @@ Modules:
 - processing.heuristics: deterministic processing (summary, classification, scoring)
 - retrieval.retrieval_engine: context retrieval across STM/LTM with re-ranking
 - agents.conscious_agent: promotion of long-term items to short-term
+- agents.retention_agent: chat_history retention with Parquet archival
 - utils.context_builder: bounded system block formatting
 - store.memory_store: thin orchestration over the components
 """
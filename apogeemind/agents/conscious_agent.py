@@ -1,68 +1,89 @@
 import threading
 import time
-from typing import List, Optional
+from typing import Dict, Optional
 
 from ..db.duckdb_manager import DuckDBManager
+from .retention_agent import RetentionAgent
+
+PROMOTION_CATEGORIES = ("preference", "rule", "skill", "context")
+PERMANENT_CATEGORIES = ("preference", "rule")
 
 
 class ConsciousAgent:
     """Promotion of eligible LTM items to STM with capacity and expiry enforcement."""
 
-    def __init__(self, db: DuckDBManager, stm_capacity: int = 20, promotion_threshold: float = 0.65) -> None:
+    def __init__(
+        self,
+        db: DuckDBManager,
+        stm_capacity: int = 20,
+        promotion_threshold: float = 0.65,
+        stm_ttl: Optional[Dict[str, float]] = None,  # seconds by source LTM category
+    ) -> None:
         self.db = db
         self.stm_capacity = stm_capacity
         self.promotion_threshold = promotion_threshold
+        self.stm_ttl = dict(stm_ttl or {})
         self._thread: Optional[threading.Thread] = None
         self._stop_event: Optional[threading.Event] = None
 
     def run_initial_promotion(self, namespace: str) -> int:
-        # Select candidate LTM rows above threshold with preferred categories
-        q = self.db.execute(
-            """
-            SELECT memory_id, category_primary, summary, searchable_content, importance_score
-            FROM long_term_memory
-            WHERE namespace = ? AND importance_score >= ? AND category_primary IN ('preference','rule','skill','context')
-            ORDER BY importance_score DESC, created_at DESC
-            LIMIT 100
-            """,
-            (namespace, self.promotion_threshold),
-        )
-
-        promoted = 0
-        for row in q.rows:
-            try:
-                self.db.insert_stm(
-                    memory_id=f"conscious_{row['memory_id']}",
-                    namespace=namespace,
-                    category_primary="conscious_context",
-                    summary=row["summary"],
-                    searchable_content=row["searchable_content"],
-                    importance_score=float(row["importance_score"]),
-                    is_permanent_context=row["category_primary"] in ("preference", "rule"),
-                )
-                promoted += 1
-            except Exception:
-                # Likely duplicate key; skip
-                continue
-
-        # Enforce capacity
-        self.db.prune_stm_by_capacity(namespace=namespace, capacity=self.stm_capacity)
+        with self.db.tracer.span("promotion") as span:
+            # Incremental: only LTM rows added since the last pass are considered
+            promoted = self.db.promote_ltm_to_stm(
+                namespace=namespace,
+                min_importance=self.promotion_threshold,
+                categories=PROMOTION_CATEGORIES,
+                permanent_categories=PERMANENT_CATEGORIES,
+                ttl_seconds=self.stm_ttl,
+            )
+            if promoted:
+                # Enforce capacity
+                self.db.prune_stm_by_capacity(namespace=namespace, capacity=self.stm_capacity)
+            span["promoted"] = promoted
         return promoted
 
+    def sweep_expired(self, namespace: Optional[str] = None) -> int:
+        return self.db.sweep_expired_stm(namespace)
+
     # Background scheduling (thread-based)
-    def start_scheduler(self, namespace: str, interval_hours: float = 6.0) -> None:
+    def start_scheduler(
+        self,
+        namespace: str,
+        interval_hours: float = 6.0,
+        sweep_interval_seconds: float = 300.0,
+        retention: Optional[RetentionAgent] = None,
+    ) -> None:
         if self._thread and self._thread.is_alive():
             return
         self._stop_event = threading.Event()
+        # DuckDB connections are not shared across threads; the worker gets its own cursor
+        worker = ConsciousAgent(
+            self.db.thread_view(),
+            stm_capacity=self.stm_capacity,
+            promotion_threshold=self.promotion_threshold,
+            stm_ttl=self.stm_ttl,
+        )
+        worker_retention = retention.with_db(worker.db) if retention and retention.enabled else None
+        promote_every = max(60.0, interval_hours * 3600.0)
+        # Expiry sweeps are cheap (STM is capacity-bounded), so they run more often than promotion
+        tick = max(1.0, min(sweep_interval_seconds, promote_every))
 
         def loop():
+            next_promotion = 0.0
             while self._stop_event and not self._stop_event.is_set():
                 try:
-                    self.run_initial_promotion(namespace)
+                    worker.sweep_expired(namespace)
+                    if time.monotonic() >= next_promotion:
+                        worker.run_initial_promotion(namespace)
+                        if worker_retention:
+                            worker_retention.run(namespace)
+                        next_promotion = time.monotonic() + promote_every
+                    # Sweeps and promotion mark indexes dirty too; rebuild off the request path
+                    worker.db.refresh_fts_indexes()
                 except Exception:
                     pass
                 # Sleep with early exit support
-                if self._stop_event and self._stop_event.wait(timeout=max(60.0, interval_hours * 3600.0)):
+                if self._stop_event and self._stop_event.wait(timeout=tick):
                     break
 
         self._thread = threading.Thread(target=loop, name="MemoriConsciousScheduler", daemon=True)
@@ -0,0 +1,65 @@
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from ..db.duckdb_manager import DuckDBManager
+
+
+def default_archive_dir(db_path: str) -> str:
+    return str(Path(db_path).parent / "archive")
+
+
+class RetentionAgent:
+    """Age/row-count retention for chat_history with Parquet archival.
+
+    Archived chats land in `<archive_dir>/namespace=<ns>/chat_history-<time_ns>.parquet`,
+    so one namespace (or all, with hive_partitioning) can be queried later via
+    read_parquet('<archive_dir>/*/*.parquet'). A CHECKPOINT after moving rows
+    reclaims the space in the DuckDB file.
+    """
+
+    def __init__(
+        self,
+        db: DuckDBManager,
+        archive_dir: str,
+        max_age_days: Optional[float] = None,
+        max_rows: Optional[int] = None,
+    ) -> None:
+        self.db = db
+        self.archive_dir = archive_dir
+        self.max_age_days = max_age_days
+        self.max_rows = max_rows
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_age_days is not None or self.max_rows is not None
+
+    def with_db(self, db: DuckDBManager) -> "RetentionAgent":
+        return RetentionAgent(db, self.archive_dir, max_age_days=self.max_age_days, max_rows=self.max_rows)
+
+    def archive_path(self, namespace: str) -> str:
+        part = Path(self.archive_dir) / f"namespace={quote(namespace, safe='')}"
+        return str(part / f"chat_history-{time.time_ns():020d}.parquet")
+
+    def namespaces(self) -> List[str]:
+        rows = self.db.execute("SELECT DISTINCT namespace FROM chat_history ORDER BY namespace").rows
+        return [r["namespace"] for r in rows]
+
+    def run(self, namespace: Optional[str] = None, checkpoint: bool = True) -> Dict[str, int]:
+        """Apply the policy to one namespace (all namespaces when None); returns rows archived per namespace."""
+        if not self.enabled:
+            return {}
+        moved: Dict[str, int] = {}
+        for ns in [namespace] if namespace else self.namespaces():
+            n = self.db.archive_chat_history(
+                ns,
+                self.archive_path(ns),
+                max_age_days=self.max_age_days,
+                max_rows=self.max_rows,
+            )
+            if n:
+                moved[ns] = n
+        if moved and checkpoint:
+            self.db.checkpoint()
+        return moved
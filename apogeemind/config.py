@@ -1,7 +1,10 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
+
+# Default STM lifetimes (days) by source LTM category; preferences/rules do not expire
+DEFAULT_STM_TTL_DAYS = {"context": 7.0, "skill": 30.0}
 
 
 def _env_bool(name: str, default: bool) -> bool:
@@ -11,6 +14,19 @@ def _env_bool(name: str, default: bool) -> bool:
     return v.strip().lower() in {"1", "true", "yes", "on"}
 
 
+def _env_ttl_days(name: str, default: Dict[str, float]) -> Dict[str, float]:
+    """Parse "category=days,..." (e.g. "context=7,skill=30"); an empty value disables expiry."""
+    v = os.environ.get(name)
+    if v is None:
+        return dict(default)
+    ttl: Dict[str, float] = {}
+    for part in v.split(","):
+        if "=" in part:
+            cat, days = part.split("=", 1)
+            ttl[cat.strip()] = float(days)
+    return ttl
+
+
 @dataclass
 class Config:
     db_path: str
@@ -19,6 +35,35 @@ class Config:
     auto_ingest: bool = True
     stm_capacity: int = 20
     promotion_threshold: float = 0.65
+    daemon: bool = True
+    daemon_socket: Optional[str] = None
+    daemon_idle_seconds: float = 900.0
+    recent_boost_window_days: float = 30.0
+    rank_text_weight: float = 0.5
+    rank_importance_weight: float = 1.0
+    rank_recency_weight: float = 0.25
+    rank_access_weight: float = 0.1
+    rank_stm_boost: float = 1.0
+    query_cache: bool = True
+    query_cache_size: int = 256
+    query_cache_ttl_seconds: float = 3600.0
+    stm_ttl_days: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_STM_TTL_DAYS))
+    redact_defaults: bool = True
+    redact_patterns_file: Optional[str] = None
+    semantic: bool = False
+    semantic_dim: int = 256
+    semantic_nprobe: int = 48
+    rank_semantic_weight: float = 0.5
+    chunk_chars: int = 1500
+    context_tokens: int = 500
+    context_conscious_share: float = 0.4
+    inject_mode: str = "combined"
+    trace: bool = False
+    trace_file: Optional[str] = None
+    trace_max_bytes: int = 5 * 1024 * 1024
+    chat_retention_days: Optional[float] = None
+    chat_retention_rows: Optional[int] = None
+    archive_dir: Optional[str] = None
 
     @classmethod
     def from_env(
@@ -34,6 +79,34 @@ class Config:
         auto = _env_bool("APOGEEMIND_AUTO", True)
         stm_capacity = int(os.environ.get("APOGEEMIND_STM_CAPACITY", os.environ.get("STM_CAPACITY", "20")))
         promotion_threshold = float(os.environ.get("APOGEEMIND_PROMOTION_THRESHOLD", os.environ.get("PROMOTION_THRESHOLD", "0.65")))
+        daemon = _env_bool("APOGEEMIND_DAEMON", True)
+        daemon_socket = os.environ.get("APOGEEMIND_DAEMON_SOCKET") or None
+        daemon_idle_seconds = float(os.environ.get("APOGEEMIND_DAEMON_IDLE_SECONDS", "900"))
+        recent_boost_window_days = float(os.environ.get("APOGEEMIND_RECENT_BOOST_WINDOW_DAYS", "30"))
+        rank_text_weight = float(os.environ.get("APOGEEMIND_RANK_TEXT_WEIGHT", "0.5"))
+        rank_importance_weight = float(os.environ.get("APOGEEMIND_RANK_IMPORTANCE_WEIGHT", "1.0"))
+        rank_recency_weight = float(os.environ.get("APOGEEMIND_RANK_RECENCY_WEIGHT", "0.25"))
+        rank_access_weight = float(os.environ.get("APOGEEMIND_RANK_ACCESS_WEIGHT", "0.1"))
+        rank_stm_boost = float(os.environ.get("APOGEEMIND_RANK_STM_BOOST", "1.0"))
+        query_cache = _env_bool("APOGEEMIND_QUERY_CACHE", True)
+        query_cache_size = int(os.environ.get("APOGEEMIND_QUERY_CACHE_SIZE", "256"))
+        query_cache_ttl_seconds = float(os.environ.get("APOGEEMIND_QUERY_CACHE_TTL_SECONDS", "3600"))
+        stm_ttl_days = _env_ttl_days("APOGEEMIND_STM_TTL_DAYS", DEFAULT_STM_TTL_DAYS)
+        redact_defaults = _env_bool("APOGEEMIND_REDACT_DEFAULTS", True)
+        redact_patterns_file = os.environ.get("APOGEEMIND_REDACT_PATTERNS") or None
+        semantic = _env_bool("APOGEEMIND_SEMANTIC", False)
+        semantic_dim = int(os.environ.get("APOGEEMIND_SEMANTIC_DIM", "256"))
+        semantic_nprobe = int(os.environ.get("APOGEEMIND_SEMANTIC_NPROBE", "48"))
+        rank_semantic_weight = float(os.environ.get("APOGEEMIND_RANK_SEMANTIC_WEIGHT", "0.5"))
+        chunk_chars = int(os.environ.get("APOGEEMIND_CHUNK_CHARS", "1500"))
+        context_tokens = int(os.environ.get("APOGEEMIND_CONTEXT_TOKENS", "500"))
+        context_conscious_share = float(os.environ.get("APOGEEMIND_CONTEXT_CONSCIOUS_SHARE", "0.4"))
+        inject_mode = os.environ.get("APOGEEMIND_INJECT_MODE", "combined").strip().lower()
+        trace = _env_bool("APOGEEMIND_TRACE", False)
+        trace_max_bytes = int(os.environ.get("APOGEEMIND_TRACE_MAX_BYTES", str(5 * 1024 * 1024)))
+        retention_days = os.environ.get("APOGEEMIND_CHAT_RETENTION_DAYS")
+        retention_rows = os.environ.get("APOGEEMIND_CHAT_RETENTION_ROWS")
+        archive_dir = os.environ.get("APOGEEMIND_ARCHIVE_DIR") or None
         return cls(
             db_path=db_path,
             namespace=namespace,
@@ -41,4 +114,33 @@ class Config:
             auto_ingest=auto,
             stm_capacity=stm_capacity,
             promotion_threshold=promotion_threshold,
+            daemon=daemon,
+            daemon_socket=daemon_socket,
+            daemon_idle_seconds=daemon_idle_seconds,
+            recent_boost_window_days=recent_boost_window_days,
+            rank_text_weight=rank_text_weight,
+            rank_importance_weight=rank_importance_weight,
+            rank_recency_weight=rank_recency_weight,
+            rank_access_weight=rank_access_weight,
+            rank_stm_boost=rank_stm_boost,
+            query_cache=query_cache,
+            query_cache_size=query_cache_size,
+            query_cache_ttl_seconds=query_cache_ttl_seconds,
+            stm_ttl_days=stm_ttl_days,
+            redact_defaults=redact_defaults,
+            redact_patterns_file=redact_patterns_file,
+            semantic=semantic,
+            semantic_dim=semantic_dim,
+            semantic_nprobe=semantic_nprobe,
+            rank_semantic_weight=rank_semantic_weight,
+            chunk_chars=chunk_chars,
+            context_tokens=context_tokens,
+            context_conscious_share=context_conscious_share,
+            inject_mode=inject_mode,
+            trace=trace,
+            trace_file=os.environ.get("APOGEEMIND_TRACE_FILE") or None,
+            trace_max_bytes=trace_max_bytes,
+            chat_retention_days=float(retention_days) if retention_days else None,
+            chat_retention_rows=int(retention_rows) if retention_rows else None,
+            archive_dir=archive_dir,
         )
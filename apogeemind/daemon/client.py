@@ -0,0 +1,148 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Repo root (parent of apogeemind/) so the spawned daemon can import the package
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon cannot be reached or returns an error."""
+
+
+def default_socket_path() -> str:
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return str(Path(base) / f"apogeemind-{uid}.sock")
+
+
+class DaemonClient:
+    """Thin client for the resident apogeemind daemon (newline-delimited JSON over a Unix socket).
+
+    Deliberately avoids importing duckdb so hook processes stay cheap to start.
+    """
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        idle_seconds: float = 900.0,
+        timeout: float = 10.0,
+        spawn: bool = True,
+        spawn_timeout: float = 5.0,
+    ) -> None:
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self.spawn = spawn
+        self.spawn_timeout = spawn_timeout
+
+    # Transport
+    def _send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(self.timeout)
+            s.connect(self.socket_path)
+            s.sendall(data)
+            s.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                buf = s.recv(65536)
+                if not buf:
+                    break
+                chunks.append(buf)
+        raw = b"".join(chunks).decode("utf-8").strip()
+        if not raw:
+            raise DaemonError("empty response from daemon")
+        return json.loads(raw)
+
+    def _spawn_daemon(self) -> None:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (str(REPO_ROOT), env.get("PYTHONPATH", "")) if p)
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "apogeemind.daemon.server",
+                "--socket",
+                self.socket_path,
+                "--idle-seconds",
+                str(self.idle_seconds),
+            ],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            close_fds=True,
+        )
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            resp = self._send(payload)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if not self.spawn:
+                raise DaemonError(f"daemon not running at {self.socket_path}")
+            self._spawn_daemon()
+            deadline = time.monotonic() + self.spawn_timeout
+            while True:
+                try:
+                    resp = self._send(payload)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if time.monotonic() >= deadline:
+                        raise DaemonError(f"daemon did not start at {self.socket_path}")
+                    time.sleep(0.02)
+        except (OSError, ValueError) as e:
+            raise DaemonError(str(e)) from e
+
+        if not resp.get("ok"):
+            raise DaemonError(str(resp.get("error") or "daemon request failed"))
+        return resp.get("result") or {}
+
+    # Operations
+    def ping(self) -> Dict[str, Any]:
+        return self.request({"op": "ping"})
+
+    def inject(self, store: Dict[str, Any], query: str, mode: str = "auto") -> str:
+        """Rendered block for `query`; mode "combined" adds the conscious working memory in the same retrieval."""
+        res = self.request({"op": "inject", "store": store, "query": query, "mode": mode})
+        return str(res.get("block") or "")
+
+    def record(
+        self,
+        store: Dict[str, Any],
+        user_input: str,
+        ai_output: str,
+        model: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        res = self.request(
+            {
+                "op": "record",
+                "store": store,
+                "user_input": user_input,
+                "ai_output": ai_output,
+                "model": model,
+                "metadata": metadata,
+            }
+        )
+        return str(res.get("chat_id") or "")
+
+    def record_bulk(self, store: Dict[str, Any], exchanges: Sequence[Tuple[str, str]], model: Optional[str] = None) -> List[str]:
+        res = self.request({"op": "record_bulk", "store": store, "exchanges": [list(x) for x in exchanges], "model": model})
+        return [str(c) for c in res.get("chat_ids") or []]
+
+    def drain(self, db_path: str) -> int:
+        return int(self.request({"op": "drain", "db_path": db_path}).get("applied") or 0)
+
+    def health(self, store: Dict[str, Any]) -> Dict[str, Any]:
+        return self.request({"op": "health", "store": store})
+
+    def shutdown(self) -> None:
+        self.request({"op": "shutdown"})
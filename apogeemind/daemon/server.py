@@ -0,0 +1,203 @@
+import argparse
+import fcntl
+import json
+import os
+import socketserver
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..db.duckdb_manager import DuckDBManager
+from ..db.spool import WriteSpool, apply_spool_entries
+from ..store.memory_store import MemoryStore, MemoryStoreConfig
+from .client import default_socket_path
+
+StoreKey = Tuple[str, str, bool, bool]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        daemon: "MemoryDaemon" = self.server.daemon  # type: ignore[attr-defined]
+        line = self.rfile.readline()
+        try:
+            payload = json.loads(line.decode("utf-8") or "{}")
+            resp = {"ok": True, "result": daemon.dispatch(payload)}
+        except Exception as e:
+            resp = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write((json.dumps(resp, default=str) + "\n").encode("utf-8"))
+
+
+class MemoryDaemon:
+    """Resident process holding warm MemoryStore instances, one per (db_path, namespace).
+
+    Requests are served one at a time: a DuckDB connection must not be used from
+    several threads at once, and per-request work is short.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, idle_seconds: float = 900.0) -> None:
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_seconds = idle_seconds
+        self.stores: Dict[StoreKey, MemoryStore] = {}
+        self._last_activity = time.monotonic()
+        self._stop = False
+        self._lock_fh = None
+        self._server: Optional[socketserver.UnixStreamServer] = None
+
+    # Store cache
+    @staticmethod
+    def _db_path(spec: Dict[str, Any]) -> str:
+        db_path = str(spec.get("db_path") or "")
+        if not db_path:
+            raise ValueError("request needs a db_path")
+        return db_path
+
+    def get_store(self, spec: Dict[str, Any]) -> MemoryStore:
+        self._db_path(spec)
+        key: StoreKey = (
+            str(spec.get("db_path") or ""),
+            str(spec.get("namespace") or "default"),
+            bool(spec.get("conscious_ingest", True)),
+            bool(spec.get("auto_ingest", True)),
+        )
+        store = self.stores.get(key)
+        if store is None:
+            cfg = MemoryStoreConfig(
+                db_path=key[0],
+                namespace=key[1],
+                conscious_ingest=key[2],
+                auto_ingest=key[3],
+            )
+            store = MemoryStore(cfg)
+            self.stores[key] = store
+        return store
+
+    # Request handling
+    def dispatch(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        self._last_activity = time.monotonic()
+        op = payload.get("op")
+        if op == "ping":
+            return {"pid": os.getpid(), "stores": len(self.stores)}
+        if op == "shutdown":
+            self._stop = True
+            return {}
+        if op == "drain":
+            return {"applied": self.drain_spool(self._db_path(payload))}
+        if op == "health":
+            return self.health(payload.get("store") or {})
+
+        store = self.get_store(payload.get("store") or {})
+        if op == "inject":
+            query = str(payload.get("query") or "").strip()
+            if not query:
+                return {"block": ""}
+            if payload.get("mode") == "combined":
+                return {"block": store.get_combined_system_prompt(query)}
+            return {"block": store.get_auto_ingest_system_prompt(query)}
+        if op == "record":
+            chat_id = store.record_conversation(
+                str(payload.get("user_input") or ""),
+                str(payload.get("ai_output") or ""),
+                model=payload.get("model"),
+                metadata=payload.get("metadata"),
+            )
+            return {"chat_id": chat_id}
+        if op == "record_bulk":
+            exchanges = [(str(u or ""), str(a or "")) for u, a in payload.get("exchanges") or []]
+            chat_ids = store.record_conversations_bulk(exchanges, model=payload.get("model"))
+            return {"chat_ids": chat_ids}
+        raise ValueError(f"unknown op: {op!r}")
+
+    def health(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Counts for a namespace without creating a store: a cached connection to the DB, else a read-only open."""
+        db_path = self._db_path(spec)
+        namespace = str(spec.get("namespace") or "default")
+        db = next((st.db for key, st in self.stores.items() if key[0] == db_path), None)
+        if db is not None:
+            return {"db_path": db_path, "namespace": namespace, "search": db.search_backend, **db.namespace_counts(namespace)}
+        ro = DuckDBManager(db_path, auto_init_schema=True, read_only=True)
+        try:
+            return {"db_path": db_path, "namespace": namespace, "search": ro.search_backend, **ro.namespace_counts(namespace)}
+        finally:
+            ro.close()
+
+    # Spooled writes (queued by hook processes; the daemon is the single writer)
+    def drain_spool(self, db_path: str) -> int:
+        spool = WriteSpool(db_path)
+        if not spool.pending():
+            return 0
+        with spool.writer_lock() as acquired:
+            if not acquired:
+                return 0
+            return spool.drain(lambda entries: apply_spool_entries(entries, self.get_store))
+
+    def _drain_known_spools(self) -> None:
+        for db_path in {key[0] for key in self.stores}:
+            try:
+                self.drain_spool(db_path)
+            except Exception:
+                pass  # entries stay spooled; retried on the next tick
+
+    # Lifecycle
+    def _acquire_lock(self) -> bool:
+        Path(self.socket_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock_fh = open(self.socket_path + ".lock", "w")
+        try:
+            fcntl.flock(self._lock_fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_fh.close()
+            self._lock_fh = None
+            return False
+        return True
+
+    def serve(self) -> int:
+        # Only one daemon per socket; a concurrent spawn simply exits
+        if not self._acquire_lock():
+            return 0
+        try:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self._server = socketserver.UnixStreamServer(self.socket_path, _Handler)
+            self._server.daemon = self  # type: ignore[attr-defined]
+            self._server.timeout = 1.0
+            os.chmod(self.socket_path, 0o600)
+            self._last_activity = time.monotonic()
+            while not self._stop:
+                self._server.handle_request()
+                self._drain_known_spools()
+                if self.idle_seconds > 0 and time.monotonic() - self._last_activity >= self.idle_seconds:
+                    break
+        finally:
+            self.close()
+        return 0
+
+    def close(self) -> None:
+        for store in self.stores.values():
+            store.db.close()
+        self.stores.clear()
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        if self._lock_fh is not None:
+            self._lock_fh.close()
+            self._lock_fh = None
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="apogeemind resident daemon")
+    ap.add_argument("--socket", default=os.environ.get("APOGEEMIND_DAEMON_SOCKET") or default_socket_path())
+    ap.add_argument(
+        "--idle-seconds",
+        type=float,
+        default=float(os.environ.get("APOGEEMIND_DAEMON_IDLE_SECONDS", "900")),
+        help="Exit after this many seconds without requests (0 = never)",
+    )
+    args = ap.parse_args()
+    return MemoryDaemon(args.socket, idle_seconds=args.idle_seconds).serve()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
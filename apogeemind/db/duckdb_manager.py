@@ -1,14 +1,26 @@
+import copy
+import json
 import os
+import time
 import uuid
+from contextlib import contextmanager
 from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
+_import_start = time.perf_counter_ns()
 try:
     import duckdb  # type: ignore
 except Exception as e:  # pragma: no cover
     duckdb = None
+DUCKDB_IMPORT_MS = (time.perf_counter_ns() - _import_start) / 1e6
 
+from ..utils.hashing import BloomFilter, content_hash as _content_hash, summary_hash as _summary_hash
+from ..utils.tracing import get_tracer, statement_label
+
+
+_import_reported = False
 
 DEFAULT_DB_PATH = str((Path.cwd() / "apogeemind" / "apogeemind.duckdb").resolve())
 
@@ -44,6 +56,7 @@ DDL = {
           is_permanent_context BOOLEAN NOT NULL DEFAULT FALSE
         );
         CREATE INDEX IF NOT EXISTS idx_st_ns_cat ON short_term_memory(namespace, category_primary);
+        CREATE INDEX IF NOT EXISTS idx_st_ns_expires ON short_term_memory(namespace, expires_at);
         """
     ),
     "long_term_memory": (
@@ -61,7 +74,10 @@ DDL = {
           topic TEXT,
           entities_json TEXT,
           keywords_json TEXT,
-          content_hash TEXT
+          content_hash TEXT,
+          summary_hash TEXT,
+          chat_id TEXT,
+          chunk_index INTEGER
         );
         CREATE INDEX IF NOT EXISTS idx_lt_ns_cat ON long_term_memory(namespace, category_primary);
         """
@@ -82,57 +98,264 @@ DDL = {
           key TEXT PRIMARY KEY,
           value TEXT
         );
-        INSERT OR REPLACE INTO meta(key, value) VALUES ('schema_version', '1');
+        INSERT OR IGNORE INTO meta(key, value) VALUES ('schema_version', '1');
         """
     ),
 }
 
 
+CHAT_COLUMNS = ("chat_id", "session_id", "namespace", "user_input", "ai_output", "model", "tokens_used")
+LTM_COLUMNS = (
+    "memory_id",
+    "namespace",
+    "category_primary",
+    "summary",
+    "searchable_content",
+    "importance_score",
+    "classification",
+    "entities_json",
+    "keywords_json",
+    "content_hash",
+    "summary_hash",
+    "chat_id",
+    "chunk_index",
+)
+STM_COLUMNS = (
+    "memory_id",
+    "namespace",
+    "category_primary",
+    "summary",
+    "searchable_content",
+    "importance_score",
+    "is_permanent_context",
+    "expires_at",
+)
+
+
 @dataclass
 class QueryResult:
     rows: List[Dict[str, Any]]
 
 
+FTS_TABLES = ("short_term_memory", "long_term_memory")
+# Per-namespace tables moved by export/import, with the column that orders them
+NAMESPACE_TABLES = {
+    "chat_history": "timestamp",
+    "short_term_memory": "created_at",
+    "long_term_memory": "created_at",
+    "rules_memory": "created_at",
+}
+EXPORT_FORMATS = {"parquet": "(FORMAT parquet, COMPRESSION zstd)", "ndjson": "(FORMAT json)"}
+# Columns the ranking and context stages read; search never transfers full text/JSON
+SEARCH_COLUMNS = ("memory_id", "category_primary", "summary", "importance_score", "created_at", "access_count")
+SCHEMA_VERSION = 4
+# Retrieval predicate for STM rows whose TTL has not passed
+STM_LIVE = "(expires_at IS NULL OR expires_at > CAST(current_timestamp AS TIMESTAMP))"
+
+
 class DuckDBManager:
     """Minimal DuckDB manager with schema init and FTS adapter (LIKE fallback)."""
 
-    def __init__(self, db_path: Optional[str] = None, auto_init_schema: bool = True) -> None:
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        auto_init_schema: bool = True,
+        fts_refresh_threshold: int = 64,
+        read_only: bool = False,
+        lock_timeout: float = 2.0,
+    ) -> None:
         self.db_path = db_path or DEFAULT_DB_PATH
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
         if duckdb is None:
             raise RuntimeError("duckdb package is not available. Please install duckdb.")
 
-        # Open connection
-        self.con = duckdb.connect(self.db_path)
-        self.fts_enabled = False
+        self.read_only = read_only
+        self.lock_timeout = lock_timeout
+        self.fts_available = False  # extension loaded
+        self.fts_enabled = False  # BM25 indexes built and used by search_memories
+        self.fts_refresh_threshold = fts_refresh_threshold
+        # Per-namespace bloom filters over LTM summary/content hashes (lazy, in-process)
+        self._ltm_hash_filters: Dict[str, BloomFilter] = {}
+        self._table_types: Dict[str, Dict[str, str]] = {}
+        self._in_transaction = False
+        # Opt-in (APOGEEMIND_TRACE): statement timings and open stages
+        self.tracer = get_tracer()
+        global _import_reported
+        if not _import_reported:
+            _import_reported = True
+            self.tracer.event("import.duckdb", DUCKDB_IMPORT_MS)
+
+        with self.tracer.span("db.open", read_only=read_only):
+            # Read-only opens need an existing, current file; create/upgrade it with a
+            # short-lived writer first (only on first use or after a version bump)
+            if read_only and auto_init_schema and not Path(self.db_path).exists():
+                self._init_with_writer()
+
+            # Open connection
+            with self.tracer.span("db.connect", read_only=read_only):
+                self.con = self._connect(read_only)
+
+            if auto_init_schema:
+                with self.tracer.span("db.schema_init"):
+                    if not read_only:
+                        self.initialize_schema()
+                    elif self._get_schema_version() < SCHEMA_VERSION:
+                        self.con.close()
+                        self._init_with_writer()
+                        self.con = self._connect(True)
+                with self.tracer.span("db.fts_load"):
+                    self.enable_fts_or_fallback()
 
-        if auto_init_schema:
+    def _connect(self, read_only: bool) -> Any:
+        """Open the file, retrying with backoff while another process holds the DuckDB lock."""
+        deadline = time.monotonic() + max(0.0, self.lock_timeout)
+        delay = 0.01
+        while True:
+            try:
+                return duckdb.connect(self.db_path, read_only=read_only)
+            except duckdb.IOException as e:
+                if "lock" not in str(e).lower() or time.monotonic() + delay > deadline:
+                    raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+    def _init_with_writer(self) -> None:
+        con = self._connect(False)
+        ro, self.read_only, self.con = self.read_only, False, con
+        try:
             self.initialize_schema()
             self.enable_fts_or_fallback()
+        finally:
+            self.read_only = ro
+            con.close()
 
-    def initialize_schema(self) -> None:
+    def initialize_schema(self, force: bool = False) -> None:
+        """Create tables and run migrations; a no-op when the stored version is current unless forced."""
+        if not force and self._get_schema_version() >= SCHEMA_VERSION:
+            return
         # Create base tables if missing
         for _, ddl in DDL.items():
             self.con.execute(ddl)
         # Ensure migrations run to bring schema up to date
         self.apply_migrations()
 
+    # Full-text search (duckdb fts extension, BM25)
     def enable_fts_or_fallback(self) -> None:
+        self.fts_available = self._load_fts_extension()
+        if not self.fts_available:
+            self.fts_enabled = False
+            return
         try:
-            self.con.execute("INSTALL fts;")
-            self.con.execute("LOAD fts;")
-            # Attempt FTS indexes on STM & LTM (searchable_content, summary)
-            self.con.execute(
-                "CREATE INDEX IF NOT EXISTS fts_st ON short_term_memory USING fts(searchable_content, summary);"
-            )
-            self.con.execute(
-                "CREATE INDEX IF NOT EXISTS fts_lt ON long_term_memory USING fts(searchable_content, summary);"
-            )
+            for table in FTS_TABLES:
+                if not self._fts_index_exists(table):
+                    if self.read_only:
+                        raise RuntimeError(f"no FTS index on {table}")
+                    self.build_fts_index(table)
             self.fts_enabled = True
         except Exception:
             self.fts_enabled = False
 
+    def _load_fts_extension(self) -> bool:
+        # LOAD first: INSTALL hits the network even when the extension is already present
+        for stmts in (("LOAD fts;",), ("INSTALL fts;", "LOAD fts;")):
+            try:
+                for stmt in stmts:
+                    self.con.execute(stmt)
+                return True
+            except Exception:
+                continue
+        return False
+
+    def _fts_index_exists(self, table: str) -> bool:
+        q = self.execute(
+            "SELECT 1 AS x FROM information_schema.schemata WHERE schema_name = ? LIMIT 1",
+            (f"fts_main_{table}",),
+        )
+        return bool(q.rows)
+
+    def build_fts_index(self, table: str) -> None:
+        """(Re)build the BM25 index for `table` and reset its dirty counter.
+
+        The index is a snapshot; rows created after the recorded watermark are
+        matched by search_memories with a bounded ILIKE scan until the next rebuild.
+        """
+        if table not in FTS_TABLES:
+            raise ValueError(f"no FTS index defined for table {table!r}")
+        self.con.execute(
+            f"PRAGMA create_fts_index('{table}', 'memory_id', 'summary', 'searchable_content', overwrite=1)"
+        )
+        wm = self.execute(f"SELECT max(created_at) AS wm FROM {table}").rows[0]["wm"]
+        self._set_meta(f"fts_watermark:{table}", str(wm) if wm is not None else None)
+        self._set_meta(f"fts_dirty:{table}", "0")
+
+    def _mark_fts_dirty(self, table: str, n: int = 1) -> None:
+        if not self.fts_enabled or n <= 0:
+            return
+        self.execute(
+            """
+            INSERT INTO meta(key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = CAST(CAST(meta.value AS BIGINT) + CAST(excluded.value AS BIGINT) AS TEXT)
+            """,
+            (f"fts_dirty:{table}", str(n)),
+        )
+
+    def fts_dirty_counts(self) -> Dict[str, int]:
+        q = self.execute("SELECT key, value FROM meta WHERE key LIKE 'fts_dirty:%'")
+        counts = {t: 0 for t in FTS_TABLES}
+        for r in q.rows:
+            counts[str(r["key"]).split(":", 1)[1]] = int(r["value"] or 0)
+        return counts
+
+    def refresh_fts_indexes(self, force: bool = False) -> List[str]:
+        """Rebuild indexes whose dirty counter reached the threshold (any change if force)."""
+        if not self.fts_enabled or self.read_only:
+            return []
+        rebuilt: List[str] = []
+        for table, dirty in self.fts_dirty_counts().items():
+            if dirty >= max(1, self.fts_refresh_threshold) or (force and dirty > 0):
+                self.build_fts_index(table)
+                rebuilt.append(table)
+        return rebuilt
+
+    @property
+    def search_backend(self) -> str:
+        return "fts" if self.fts_enabled else "like"
+
+    def fts_status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {
+            "backend": self.search_backend,
+            "extension_loaded": self.fts_available,
+        }
+        if self.fts_enabled:
+            status["dirty"] = self.fts_dirty_counts()
+        return status
+
+    # Meta key/value helpers
+    def _get_meta(self, key: str) -> Optional[str]:
+        q = self.execute("SELECT value FROM meta WHERE key = ? LIMIT 1", (key,))
+        return q.rows[0]["value"] if q.rows else None
+
+    def _set_meta(self, key: str, value: Optional[str]) -> None:
+        self.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, value))
+
+    # Per-namespace write generation: bumped by every write that can change
+    # retrieval results, so caches keyed on it never serve stale blocks
+    def write_generation(self, namespace: str) -> int:
+        value = self._get_meta(f"write_gen:{namespace}")
+        return int(value) if value else 0
+
+    def bump_write_generation(self, namespace: str) -> None:
+        if self.read_only:
+            return
+        self.execute(
+            """
+            INSERT INTO meta(key, value) VALUES (?, '1')
+            ON CONFLICT (key) DO UPDATE SET value = CAST(CAST(meta.value AS BIGINT) + 1 AS TEXT)
+            """,
+            (f"write_gen:{namespace}",),
+        )
+
     # Schema versioning & migrations
     def _get_schema_version(self) -> int:
         try:
@@ -162,8 +385,78 @@ class DuckDBManager:
                 self.execute("ALTER TABLE long_term_memory ADD COLUMN content_hash TEXT")
             self._set_schema_version(1)
 
+        # Migration to v2: normalized summary hash, backfilled hashes, hash lookup indexes
+        if cur < 2:
+            if not self._column_exists("long_term_memory", "summary_hash"):
+                self.execute("ALTER TABLE long_term_memory ADD COLUMN summary_hash TEXT")
+            self._backfill_ltm_hashes()
+            # Single-column indexes: DuckDB only uses an ART index for a lone equality predicate
+            self.execute("CREATE INDEX IF NOT EXISTS idx_lt_summary_hash ON long_term_memory(summary_hash)")
+            self.execute("CREATE INDEX IF NOT EXISTS idx_lt_content_hash ON long_term_memory(content_hash)")
+            self._set_schema_version(2)
+
+        # Migration to v3: STM expiry sweeps and live-row predicates
+        if cur < 3:
+            self.execute("CREATE INDEX IF NOT EXISTS idx_st_ns_expires ON short_term_memory(namespace, expires_at)")
+            self._set_schema_version(3)
+
+        # Migration to v4: memories chunked from one exchange link back to it
+        if cur < 4:
+            if not self._column_exists("long_term_memory", "chat_id"):
+                self.execute("ALTER TABLE long_term_memory ADD COLUMN chat_id TEXT")
+            if not self._column_exists("long_term_memory", "chunk_index"):
+                self.execute("ALTER TABLE long_term_memory ADD COLUMN chunk_index INTEGER")
+            self.execute("CREATE INDEX IF NOT EXISTS idx_lt_chat ON long_term_memory(chat_id)")
+            self._set_schema_version(4)
+
+    def _backfill_ltm_hashes(self, chunk_size: int = 5000) -> None:
+        # Separate cursor: statements on self.con would discard the pending result
+        reader = self.con.cursor()
+        cur = reader.execute(
+            """
+            SELECT memory_id, summary, searchable_content, content_hash
+            FROM long_term_memory
+            WHERE summary_hash IS NULL OR content_hash IS NULL
+            """
+        )
+        self.con.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS _ltm_hash_backfill(memory_id TEXT, summary_hash TEXT, content_hash TEXT)"
+        )
+        try:
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                self.con.executemany(
+                    "INSERT INTO _ltm_hash_backfill VALUES (?, ?, ?)",
+                    [(mid, _summary_hash(summ), ch or _content_hash(content)) for mid, summ, content, ch in rows],
+                )
+            self.con.execute(
+                """
+                UPDATE long_term_memory AS l
+                SET summary_hash = b.summary_hash, content_hash = b.content_hash
+                FROM _ltm_hash_backfill AS b
+                WHERE l.memory_id = b.memory_id
+                """
+            )
+        finally:
+            reader.close()
+            self.con.execute("DROP TABLE IF EXISTS _ltm_hash_backfill")
+
     # Basic helpers
     def execute(self, sql: str, params: Optional[Sequence[Any]] = None) -> QueryResult:
+        if self.tracer.enabled:
+            with self.tracer.span("db.execute", sql=statement_label(sql)) as span:
+                try:
+                    result = self._execute(sql, params)
+                except Exception as e:
+                    span["error"] = type(e).__name__
+                    raise
+                span["rows"] = len(result.rows)
+                return result
+        return self._execute(sql, params)
+
+    def _execute(self, sql: str, params: Optional[Sequence[Any]] = None) -> QueryResult:
         cur = self.con.execute(sql, params or [])
         try:
             cols = [d[0] for d in cur.description] if cur.description else []
@@ -174,6 +467,37 @@ class DuckDBManager:
             # duckdb keeps statements; no explicit cursor close needed
             pass
 
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group statements into one commit; nested use joins the outer transaction."""
+        if self._in_transaction:
+            yield
+            return
+        self.con.execute("BEGIN TRANSACTION")
+        self._in_transaction = True
+        try:
+            yield
+        except BaseException:
+            self._in_transaction = False
+            self.con.execute("ROLLBACK")
+            raise
+        self._in_transaction = False
+        self.con.execute("COMMIT")
+
+    def thread_view(self) -> "DuckDBManager":
+        """Same database over a separate DuckDB cursor, for use from another thread."""
+        view = copy.copy(self)
+        view.con = self.con.cursor()
+        view._in_transaction = False
+        view._ltm_hash_filters = {}
+        return view
+
+    def close(self) -> None:
+        try:
+            self.con.close()
+        except Exception:
+            pass
+
     # Inserts
     def insert_chat(self, namespace: str, session_id: str, user_input: str, ai_output: str, model: Optional[str] = None, tokens_used: Optional[int] = None) -> str:
         chat_id = str(uuid.uuid4())
@@ -198,13 +522,17 @@ class DuckDBManager:
         entities_json: Optional[str],
         keywords_json: Optional[str],
         content_hash: Optional[str],
+        summary_hash: Optional[str] = None,
+        chat_id: Optional[str] = None,
+        chunk_index: Optional[int] = None,
     ) -> None:
+        summary_hash = summary_hash or _summary_hash(summary)
         self.execute(
             """
             INSERT INTO long_term_memory(
-              memory_id, namespace, category_primary, summary, searchable_content,
-              importance_score, classification, entities_json, keywords_json, content_hash
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+              memory_id, namespace, category_primary, summary, searchable_content, importance_score,
+              classification, entities_json, keywords_json, content_hash, summary_hash, chat_id, chunk_index
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 memory_id,
@@ -217,8 +545,14 @@ class DuckDBManager:
                 entities_json,
                 keywords_json,
                 content_hash,
+                summary_hash,
+                chat_id,
+                chunk_index,
             ),
         )
+        self._remember_ltm_hashes(namespace, summary_hash, content_hash)
+        self._mark_fts_dirty("long_term_memory")
+        self.bump_write_generation(namespace)
 
     def insert_stm(
         self,
@@ -249,19 +583,116 @@ class DuckDBManager:
                 expires_at,
             ),
         )
+        self._mark_fts_dirty("short_term_memory")
+        self.bump_write_generation(namespace)
+
+    # Bulk inserts (one statement per table; wrap in transaction() for a single commit)
+    def _column_types(self, table: str) -> Dict[str, str]:
+        types = self._table_types.get(table)
+        if types is None:
+            cols = self.execute(
+                "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ?",
+                (table,),
+            ).rows
+            types = self._table_types[table] = {c["column_name"]: c["data_type"] for c in cols}
+        return types
+
+    def _json_rows(self, table: str, columns: Sequence[str], rows: Sequence[Mapping[str, Any]]) -> Tuple[str, str]:
+        """(SELECT expanding one JSON parameter into typed columns, the JSON text).
+
+        Rows travel as a single string: executemany binds and executes row by
+        row, which costs ~100x more for batches of a few thousand rows.
+        """
+        types = self._column_types(table)
+        spec = json.dumps([{c: types[c] for c in columns}])
+        payload = json.dumps([{c: r.get(c) for c in columns} for r in rows], default=str, ensure_ascii=False)
+        return f"SELECT unnest(from_json(?, '{spec}'), recursive := true)", payload
+
+    def _insert_many(self, table: str, columns: Sequence[str], rows: Sequence[Mapping[str, Any]], or_ignore: bool = False) -> None:
+        if not rows:
+            return
+        verb = "INSERT OR IGNORE" if or_ignore else "INSERT"
+        select, payload = self._json_rows(table, columns, rows)
+        with self.tracer.span("db.insert_many", table=table, rows=len(rows)):
+            self.con.execute(f"{verb} INTO {table} BY NAME {select}", [payload])
+
+    def insert_chats_bulk(self, rows: Sequence[Mapping[str, Any]]) -> None:
+        self._insert_many("chat_history", CHAT_COLUMNS, rows)
+
+    def insert_ltm_bulk(self, rows: Sequence[Mapping[str, Any]]) -> None:
+        rows = [r if r.get("summary_hash") else {**r, "summary_hash": _summary_hash(r["summary"])} for r in rows]
+        self._insert_many("long_term_memory", LTM_COLUMNS, rows)
+        for r in rows:
+            self._remember_ltm_hashes(r["namespace"], r["summary_hash"], r.get("content_hash"))
+        self._mark_fts_dirty("long_term_memory", len(rows))
+        for ns in {r["namespace"] for r in rows}:
+            self.bump_write_generation(ns)
+
+    def insert_stm_bulk(self, rows: Sequence[Mapping[str, Any]]) -> None:
+        # Existing ids are skipped rather than raising, unlike insert_stm
+        rows = [{"is_permanent_context": False, **r} for r in rows]
+        self._insert_many("short_term_memory", STM_COLUMNS, rows, or_ignore=True)
+        self._mark_fts_dirty("short_term_memory", len(rows))
+        for ns in {r["namespace"] for r in rows}:
+            self.bump_write_generation(ns)
 
     # Lookups
-    def find_ltm_duplicate(self, namespace: str, summary_norm: str, content_norm: str) -> Optional[Dict[str, Any]]:
-        # Simple duplicate check: normalized equality on summary or content hash
-        q = self.execute(
+    def find_ltm_duplicate(self, namespace: str, summary_hash: Optional[str], content_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return {memory_id} of an LTM row with the same normalized summary or content hash."""
+        hashes = [h for h in (summary_hash, content_hash) if h]
+        if not hashes:
+            return None
+        bloom = self._ltm_hash_filter(namespace)
+        if not any(h in bloom for h in hashes):
+            return None  # definitely new; skip the DB round trip
+
+        # One lone equality predicate per branch so each side is an index lookup;
+        # namespace is filtered here rather than in SQL for the same reason
+        cur = self.con.execute(
             """
-            SELECT * FROM long_term_memory
-            WHERE namespace = ? AND (lower(summary) = ? OR lower(searchable_content) = ?)
-            LIMIT 1
+            SELECT memory_id, namespace FROM long_term_memory WHERE summary_hash = ?
+            UNION ALL
+            SELECT memory_id, namespace FROM long_term_memory WHERE content_hash = ?
             """,
-            (namespace, summary_norm, content_norm),
+            (summary_hash, content_hash),
         )
-        return q.rows[0] if q.rows else None
+        for memory_id, ns in cur.fetchall():
+            if ns == namespace:
+                return {"memory_id": memory_id}
+        return None
+
+    def _ltm_hash_filter(self, namespace: str) -> BloomFilter:
+        bloom = self._ltm_hash_filters.get(namespace)
+        if bloom is not None and not bloom.saturated:
+            return bloom
+        n = self.execute(
+            "SELECT COUNT(*) AS c FROM long_term_memory WHERE namespace = ?",
+            (namespace,),
+        ).rows[0]["c"]
+        bloom = BloomFilter(capacity=max(1024, 4 * int(n)))
+        cur = self.con.execute(
+            "SELECT summary_hash, content_hash FROM long_term_memory WHERE namespace = ?",
+            (namespace,),
+        )
+        while True:
+            rows = cur.fetchmany(10000)
+            if not rows:
+                break
+            for sh, ch in rows:
+                if sh:
+                    bloom.add(sh)
+                if ch:
+                    bloom.add(ch)
+        self._ltm_hash_filters[namespace] = bloom
+        return bloom
+
+    def _remember_ltm_hashes(self, namespace: str, *hashes: Optional[str]) -> None:
+        bloom = self._ltm_hash_filters.get(namespace)
+        if bloom is None:
+            return  # built lazily from the table on first lookup
+        for h in hashes:
+            if h:
+                bloom.add(h)
 
     def bump_ltm_access(self, memory_id: str) -> None:
         self.execute(
@@ -269,6 +700,89 @@ class DuckDBManager:
             (memory_id,),
         )
 
+    def bump_ltm_access_bulk(self, counts: Mapping[str, int]) -> None:
+        if not counts:
+            return
+        payload = json.dumps([{"memory_id": memory_id, "n": n} for memory_id, n in counts.items()])
+        self.con.execute(
+            """
+            UPDATE long_term_memory AS l SET access_count = l.access_count + b.n
+            FROM (SELECT unnest(from_json(?, '[{"memory_id": "VARCHAR", "n": "INTEGER"}]'), recursive := true)) AS b
+            WHERE l.memory_id = b.memory_id
+            """,
+            [payload],
+        )
+
+    def promote_ltm_to_stm(
+        self,
+        namespace: str,
+        min_importance: float,
+        categories: Sequence[str],
+        permanent_categories: Sequence[str] = (),
+        ttl_seconds: Optional[Mapping[str, float]] = None,
+    ) -> int:
+        """Copy eligible LTM rows newer than the namespace's promotion watermark into STM.
+
+        The watermark is the (created_at, memory_id) of the newest LTM row seen
+        by the last pass, so each pass only reads rows added since (created_at
+        zonemaps keep that range scan cheap) and returns early when there are
+        none. Rows already in STM are skipped by ON CONFLICT; expires_at is set
+        from `ttl_seconds` by source category. Returns the number of STM rows
+        inserted.
+        """
+        key = f"promotion_watermark:{namespace}"
+        ttl = dict(ttl_seconds or {})
+        raw = self._get_meta(key)
+        wm_ts, wm_id = raw.split("\t", 1) if raw else (None, "")
+        wm_ts = wm_ts or "-infinity"
+        newer = "namespace = ? AND (created_at > CAST(? AS TIMESTAMP) OR (created_at = CAST(? AS TIMESTAMP) AND memory_id > ?))"
+        head = self.execute(
+            f"""
+            SELECT CAST(created_at AS VARCHAR) AS created_at, memory_id FROM long_term_memory
+            WHERE {newer}
+            ORDER BY created_at DESC, memory_id DESC
+            LIMIT 1
+            """,
+            (namespace, wm_ts, wm_ts, wm_id),
+        ).rows
+        if not head:
+            return 0
+        top_ts, top_id = head[0]["created_at"], head[0]["memory_id"]
+        with self.transaction():
+            inserted = self.execute(
+                f"""
+                INSERT INTO short_term_memory(
+                  memory_id, namespace, category_primary, summary, searchable_content,
+                  importance_score, is_permanent_context, expires_at
+                )
+                SELECT 'conscious_' || memory_id, namespace, 'conscious_context', summary, searchable_content,
+                       importance_score, list_contains(?::TEXT[], category_primary),
+                       CAST(current_timestamp AS TIMESTAMP) + to_seconds(ttl.seconds)
+                FROM long_term_memory
+                LEFT JOIN (SELECT unnest(?::TEXT[]) AS category, unnest(?::DOUBLE[]) AS seconds) AS ttl
+                  ON ttl.category = category_primary
+                WHERE {newer}
+                  AND (created_at < CAST(? AS TIMESTAMP) OR (created_at = CAST(? AS TIMESTAMP) AND memory_id <= ?))
+                  AND importance_score >= ?
+                  AND list_contains(?::TEXT[], category_primary)
+                ON CONFLICT DO NOTHING
+                RETURNING 1
+                """,
+                (
+                    list(permanent_categories),
+                    list(ttl), [float(v) for v in ttl.values()],
+                    namespace, wm_ts, wm_ts, wm_id,
+                    top_ts, top_ts, top_id,
+                    min_importance,
+                    list(categories),
+                ),
+            ).rows
+            self._set_meta(key, f"{top_ts}\t{top_id}")
+            if inserted:
+                self._mark_fts_dirty("short_term_memory", len(inserted))
+                self.bump_write_generation(namespace)
+        return len(inserted)
+
     def stm_count(self, namespace: str) -> int:
         q = self.execute(
             "SELECT COUNT(*) AS c FROM short_term_memory WHERE namespace = ?",
@@ -276,76 +790,220 @@ class DuckDBManager:
         )
         return int(q.rows[0]["c"]) if q.rows else 0
 
-    def prune_stm_by_capacity(self, namespace: str, capacity: int) -> None:
-        # Remove non-permanent lowest-importance/oldest until under capacity
+    def namespace_counts(self, namespace: str) -> Dict[str, int]:
         q = self.execute(
             """
-            SELECT memory_id FROM short_term_memory
-            WHERE namespace = ? AND is_permanent_context = FALSE
-            ORDER BY importance_score ASC, created_at ASC
-            OFFSET ?
+            SELECT
+              (SELECT COUNT(*) FROM chat_history WHERE namespace = ?) AS chats,
+              (SELECT COUNT(*) FROM short_term_memory WHERE namespace = ?) AS stm,
+              (SELECT COUNT(*) FROM long_term_memory WHERE namespace = ?) AS ltm
             """,
-            (namespace, max(capacity - 1, 0)),
+            (namespace, namespace, namespace),
         )
-        to_prune = [r["memory_id"] for r in q.rows]
-        if to_prune:
-            placeholders = ",".join(["?"] * len(to_prune))
-            self.execute(
-                f"DELETE FROM short_term_memory WHERE memory_id IN ({placeholders})",
-                to_prune,
-            )
+        row = q.rows[0] if q.rows else {}
+        return {k: int(row.get(k) or 0) for k in ("chats", "stm", "ltm")}
+
+    def prune_stm_by_capacity(self, namespace: str, capacity: int) -> int:
+        """Enforce STM capacity and expiry for a namespace in one statement; returns rows deleted.
+
+        Live rows are ranked permanent-context first, then by importance and
+        recency; non-permanent rows ranked past `capacity` are deleted, as are
+        rows whose expires_at has passed. Permanent rows are never evicted for
+        capacity but do occupy it.
+        """
+        res = self.execute(
+            f"""
+            DELETE FROM short_term_memory
+            WHERE namespace = ?
+              AND (
+                expires_at <= CAST(current_timestamp AS TIMESTAMP)
+                OR memory_id IN (
+                  SELECT memory_id FROM (
+                    SELECT memory_id, is_permanent_context,
+                           row_number() OVER (
+                             ORDER BY is_permanent_context DESC, importance_score DESC, created_at DESC, memory_id
+                           ) AS rn
+                    FROM short_term_memory
+                    WHERE namespace = ? AND {STM_LIVE}
+                  )
+                  WHERE rn > ? AND NOT is_permanent_context
+                )
+              )
+            RETURNING 1
+            """,
+            (namespace, namespace, max(capacity, 0)),
+        )
+        pruned = len(res.rows)
+        if pruned:
+            self._mark_fts_dirty("short_term_memory", pruned)
+            self.bump_write_generation(namespace)
+        return pruned
+
+    def sweep_expired_stm(self, namespace: Optional[str] = None) -> int:
+        """Delete STM rows whose expires_at has passed (all namespaces by default); returns rows deleted."""
+        if self.read_only:
+            return 0
+        res = self.execute(
+            """
+            DELETE FROM short_term_memory
+            WHERE (? IS NULL OR namespace = ?) AND expires_at <= CAST(current_timestamp AS TIMESTAMP)
+            RETURNING namespace
+            """,
+            (namespace, namespace),
+        )
+        if res.rows:
+            self._mark_fts_dirty("short_term_memory", len(res.rows))
+            for ns in {r["namespace"] for r in res.rows}:
+                self.bump_write_generation(ns)
+        return len(res.rows)
+
+    def next_stm_expiry_seconds(self, namespace: str) -> Optional[float]:
+        """Seconds until the namespace's earliest live STM row expires; None when no live row has a TTL."""
+        rows = self.execute(
+            """
+            SELECT date_diff('microsecond', CAST(current_timestamp AS TIMESTAMP), min(expires_at)) / 1e6 AS seconds
+            FROM short_term_memory
+            WHERE namespace = ? AND expires_at > CAST(current_timestamp AS TIMESTAMP)
+            """,
+            (namespace,),
+        ).rows
+        return rows[0]["seconds"] if rows else None
+
+    def db_now(self) -> datetime:
+        """Current time as DuckDB stores it in created_at/expires_at (naive TIMESTAMP)."""
+        return self.execute("SELECT CAST(current_timestamp AS TIMESTAMP) AS now").rows[0]["now"]
 
     # Search
     def search_memories(self, namespace: str, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        if self.fts_enabled and query.strip():
-            # Use FTS virtual indexes (duckdb fts)
-            # Query STM
-            stm = self.execute(
-                """
-                SELECT *, 'short_term' AS memory_type
-                FROM short_term_memory
-                WHERE namespace = ? AND fts_main('fts_st', ?) MATCH rowid
-                ORDER BY importance_score DESC, created_at DESC
-                LIMIT ?
-                """,
-                (namespace, query, limit),
-            ).rows
-            # Query LTM
-            ltm = self.execute(
-                """
-                SELECT *, 'long_term' AS memory_type
+        """Return SEARCH_COLUMNS + memory_type, text_score, lexical for matching STM/LTM rows (at most `limit` each).
+
+        Matching is _search_branch's: BM25 over the FTS snapshot plus an ILIKE
+        tail (text_score NULL there and on the LIKE fallback); writers rebuild
+        the snapshot, never the read path. Full text and JSON columns are not
+        transferred; use fetch_memory_content for that.
+        """
+        results = []
+        for table, memory_type in (("short_term_memory", "short_term"), ("long_term_memory", "long_term")):
+            sql, params = self._search_branch(table, memory_type, query, namespace)
+            results.extend(
+                self.execute(f"{sql} ORDER BY importance_score DESC, created_at DESC LIMIT ?", [*params, limit]).rows
+            )
+        # Merged; caller can re-rank
+        return results
+
+    def _search_branch(self, table: str, memory_type: str, query: str, namespace: str) -> Tuple[str, List[Any]]:
+        """SELECT for one table's lexical matches (SEARCH_COLUMNS, memory_type, text_score, lexical) and its params."""
+        cols = ", ".join(SEARCH_COLUMNS)
+        live = f" AND {STM_LIVE}" if table == "short_term_memory" else ""
+        q = query.strip()
+        like = f"%{q}%" if q else "%"
+        if self.fts_enabled and q:
+            wm = self._get_meta(f"fts_watermark:{table}")
+            sql = f"""
+                SELECT {cols}, '{memory_type}' AS memory_type, text_score, TRUE AS lexical FROM (
+                  SELECT {cols}, searchable_content, fts_main_{table}.match_bm25(memory_id, ?) AS text_score
+                  FROM {table}
+                  WHERE namespace = ?{live}
+                )
+                WHERE text_score IS NOT NULL
+                   OR (created_at > COALESCE(CAST(? AS TIMESTAMP), TIMESTAMP '-infinity')
+                       AND (summary ILIKE ? OR searchable_content ILIKE ?))
+            """
+            return sql, [query, namespace, wm, like, like]
+        sql = f"""
+            SELECT {cols}, '{memory_type}' AS memory_type, CAST(NULL AS DOUBLE) AS text_score, TRUE AS lexical
+            FROM {table}
+            WHERE namespace = ?{live} AND (summary ILIKE ? OR searchable_content ILIKE ?)
+        """
+        return sql, [namespace, like, like]
+
+    def search_ranked(
+        self,
+        namespace: str,
+        query: str,
+        rank_sql: str,
+        rank_params: Sequence[Any] = (),
+        limit: int = 5,
+        semantic: Optional[Mapping[str, float]] = None,
+        pinned_limit: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """One round trip: match STM+LTM, score with `rank_sql`, dedup by (memory_id, summary), LIMIT server-side.
+
+        `rank_sql` is a scalar/window expression over the candidate columns
+        (see retrieval.scoring.ScoringModel); its value is returned as rank_score.
+        `semantic` maps LTM memory_ids to vector similarities: those rows join
+        the candidates even without a lexical match (lexical = FALSE), and every
+        candidate gets its similarity as semantic_score.
+        With `pinned_limit`, the same statement also returns the top live STM
+        rows by importance (the conscious working set, rank_score NULL); every
+        row then carries section = 'conscious' or 'relevant', conscious first.
+        Searches the current FTS snapshot plus the ILIKE tail; it never rebuilds
+        an index (writers call refresh_fts_indexes after committing).
+        """
+        stm_sql, stm_params = self._search_branch("short_term_memory", "short_term", query, namespace)
+        ltm_sql, ltm_params = self._search_branch("long_term_memory", "long_term", query, namespace)
+        candidates = f"{stm_sql} UNION ALL {ltm_sql}"
+        params: List[Any] = [*rank_params, *stm_params, *ltm_params]
+        if semantic:
+            ids, sims = list(semantic), [float(v) for v in semantic.values()]
+            candidates += f"""
+                UNION ALL
+                SELECT {", ".join(SEARCH_COLUMNS)}, 'long_term' AS memory_type, CAST(NULL AS DOUBLE) AS text_score, FALSE AS lexical
                 FROM long_term_memory
-                WHERE namespace = ? AND fts_main('fts_lt', ?) MATCH rowid
-                ORDER BY importance_score DESC, created_at DESC
-                LIMIT ?
-                """,
-                (namespace, query, limit),
-            ).rows
+                WHERE namespace = ? AND memory_id IN (SELECT unnest(?::TEXT[]))
+            """
+            scored = f"""
+                SELECT c.*, s.sim AS semantic_score
+                FROM ({candidates}) AS c
+                LEFT JOIN (SELECT unnest(?::TEXT[]) AS memory_id, unnest(?::DOUBLE[]) AS sim) AS s
+                  ON s.memory_id = c.memory_id AND c.memory_type = 'long_term'
+            """
+            params += [namespace, ids, ids, sims]
         else:
-            like = f"%{query.strip()}%" if query.strip() else "%"
-            stm = self.execute(
-                """
-                SELECT *, 'short_term' AS memory_type
-                FROM short_term_memory
-                WHERE namespace = ? AND (summary ILIKE ? OR searchable_content ILIKE ?)
-                ORDER BY importance_score DESC, created_at DESC
-                LIMIT ?
-                """,
-                (namespace, like, like, limit),
-            ).rows
-            ltm = self.execute(
-                """
-                SELECT *, 'long_term' AS memory_type
-                FROM long_term_memory
-                WHERE namespace = ? AND (summary ILIKE ? OR searchable_content ILIKE ?)
-                ORDER BY importance_score DESC, created_at DESC
-                LIMIT ?
-                """,
-                (namespace, like, like, limit),
-            ).rows
+            scored = f"SELECT *, CAST(NULL AS DOUBLE) AS semantic_score FROM ({candidates})"
+        sql = f"""
+            SELECT * FROM (
+              SELECT *, ({rank_sql}) AS rank_score
+              FROM ({scored})
+            )
+            QUALIFY row_number() OVER (PARTITION BY memory_id, summary ORDER BY rank_score DESC) = 1
+            ORDER BY rank_score DESC, created_at DESC
+            LIMIT ?
+        """
+        # Positional params: the rank expression precedes the FROM clause in SQL text
+        params.append(limit)
+        if pinned_limit > 0:
+            sql = f"""
+                SELECT 'conscious' AS section, * FROM (
+                  SELECT {", ".join(SEARCH_COLUMNS)}, 'short_term' AS memory_type
+                  FROM short_term_memory
+                  WHERE namespace = ? AND {STM_LIVE}
+                  ORDER BY importance_score DESC, created_at DESC
+                  LIMIT ?
+                )
+                UNION ALL BY NAME
+                SELECT 'relevant' AS section, * FROM ({sql})
+                ORDER BY section, rank_score DESC NULLS LAST, importance_score DESC, created_at DESC
+            """
+            params = [namespace, pinned_limit, *params]
+        return self.execute(sql, params).rows
 
-        # Merge; caller can re-rank
-        return stm + ltm
+    def fetch_memory_content(self, memory_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Lazily load full content for retrieved items: {memory_id: {searchable_content, entities_json, keywords_json}}."""
+        ids = list(dict.fromkeys(memory_ids))
+        if not ids:
+            return {}
+        q = self.execute(
+            """
+            SELECT memory_id, searchable_content, NULL AS entities_json, NULL AS keywords_json
+            FROM short_term_memory WHERE memory_id IN (SELECT unnest(?::TEXT[]))
+            UNION ALL
+            SELECT memory_id, searchable_content, entities_json, keywords_json
+            FROM long_term_memory WHERE memory_id IN (SELECT unnest(?::TEXT[]))
+            """,
+            (ids, ids),
+        )
+        return {r.pop("memory_id"): r for r in q.rows}
 
     # Admin utilities
     def delete_chat_history(self, namespace: str, session_id: Optional[str] = None) -> int:
@@ -359,6 +1017,7 @@ class DuckDBManager:
                 "DELETE FROM chat_history WHERE namespace = ? RETURNING 1",
                 (namespace,),
             )
+        self.bump_write_generation(namespace)
         return len(res.rows)
 
     def delete_stm(self, namespace: str) -> int:
@@ -366,6 +1025,8 @@ class DuckDBManager:
             "DELETE FROM short_term_memory WHERE namespace = ? RETURNING 1",
             (namespace,),
         )
+        self._mark_fts_dirty("short_term_memory", len(res.rows))
+        self.bump_write_generation(namespace)
         return len(res.rows)
 
     def delete_ltm(self, namespace: str) -> int:
@@ -373,8 +1034,68 @@ class DuckDBManager:
             "DELETE FROM long_term_memory WHERE namespace = ? RETURNING 1",
             (namespace,),
         )
+        self._ltm_hash_filters.pop(namespace, None)
+        self._mark_fts_dirty("long_term_memory", len(res.rows))
+        self.bump_write_generation(namespace)
         return len(res.rows)
 
+    def archive_chat_history(
+        self,
+        namespace: str,
+        archive_path: str,
+        max_age_days: Optional[float] = None,
+        max_rows: Optional[int] = None,
+    ) -> int:
+        """Move chats older than `max_age_days` or beyond the newest `max_rows` into a Parquet file.
+
+        The selected rows are written to `archive_path` (zstd Parquet, readable
+        with read_parquet) before they are deleted, so a failure can only leave
+        rows both archived and live, never lost. Returns the number of rows moved.
+        """
+        if self.read_only or (max_age_days is None and max_rows is None):
+            return 0
+        self.con.execute("CREATE TEMP TABLE IF NOT EXISTS _chat_archive(chat_id TEXT)")
+        self.con.execute("DELETE FROM _chat_archive")
+        self.execute(
+            """
+            INSERT INTO _chat_archive
+            SELECT chat_id FROM (
+              SELECT chat_id, timestamp, row_number() OVER (ORDER BY timestamp DESC, chat_id DESC) AS rn
+              FROM chat_history
+              WHERE namespace = ?
+            )
+            WHERE (? IS NOT NULL AND timestamp < CAST(current_timestamp AS TIMESTAMP) - to_seconds(CAST(? AS DOUBLE) * 86400))
+               OR (? IS NOT NULL AND rn > ?)
+            """,
+            (namespace, max_age_days, max_age_days, max_rows, max_rows),
+        )
+        n = int(self.execute("SELECT COUNT(*) AS c FROM _chat_archive").rows[0]["c"])
+        if n == 0:
+            return 0
+        Path(archive_path).parent.mkdir(parents=True, exist_ok=True)
+        target = str(archive_path).replace("'", "''")
+        self.execute(
+            f"""
+            COPY (
+              SELECT * FROM chat_history WHERE chat_id IN (SELECT chat_id FROM _chat_archive) ORDER BY timestamp
+            ) TO '{target}' (FORMAT parquet, COMPRESSION zstd)
+            """
+        )
+        with self.transaction():
+            self.execute("DELETE FROM chat_history WHERE chat_id IN (SELECT chat_id FROM _chat_archive)")
+        self.con.execute("DELETE FROM _chat_archive")
+        return n
+
+    def checkpoint(self) -> bool:
+        """Flush the WAL and let DuckDB reclaim space freed by deletes; False if it could not run now."""
+        if self.read_only or self._in_transaction:
+            return False
+        try:
+            self.con.execute("CHECKPOINT")
+            return True
+        except Exception:
+            return False
+
     def export_namespace(self, namespace: str) -> Dict[str, Any]:
         data: Dict[str, Any] = {}
         data["chat_history"] = self.execute(
@@ -394,3 +1115,105 @@ class DuckDBManager:
             (namespace,),
         ).rows
         return data
+
+    def iter_namespace_rows(self, namespace: str, table: str, chunk_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """Yield a table's rows for a namespace in chunks of at most `chunk_size` (bounded memory)."""
+        if table not in NAMESPACE_TABLES:
+            raise ValueError(f"unknown table: {table}")
+        reader = self.con.cursor()
+        try:
+            cur = reader.execute(f"SELECT * FROM {table} WHERE namespace = ? ORDER BY {NAMESPACE_TABLES[table]}", (namespace,))
+            cols = [d[0] for d in cur.description]
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield [dict(zip(cols, r)) for r in rows]
+        finally:
+            reader.close()
+
+    def export_namespace_files(self, namespace: str, out_dir: str, fmt: str = "parquet") -> Dict[str, int]:
+        """Write one `<table>.<fmt>` file per table with DuckDB COPY; rows never pass through Python.
+
+        NDJSON output renders TIMESTAMP columns as ISO strings. Returns rows written per table.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"unsupported export format: {fmt}")
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        counts: Dict[str, int] = {}
+        for table, order in NAMESPACE_TABLES.items():
+            target = str(out / f"{table}.{fmt}").replace("'", "''")
+            res = self.execute(
+                f"COPY (SELECT * FROM {table} WHERE namespace = ? ORDER BY {order}) TO '{target}' {EXPORT_FORMATS[fmt]}",
+                (namespace,),
+            )
+            counts[table] = int(res.rows[0]["Count"]) if res.rows else 0
+        return counts
+
+    def _file_reader(self, table: str, path: Path) -> str:
+        if path.suffix == ".parquet":
+            return "read_parquet(?)"
+        # Explicit column types: JSON inference would turn timestamps/ids into other types
+        cols = self.execute(
+            "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
+            (table,),
+        ).rows
+        spec = ", ".join(f"'{c['column_name']}': '{c['data_type']}'" for c in cols)
+        return f"read_json(?, format = 'newline_delimited', columns = {{{spec}}})"
+
+    def import_namespace_files(
+        self, in_dir: str, namespace: Optional[str] = None, ltm_namespaces: Optional[set] = None
+    ) -> Dict[str, int]:
+        """Append rows from files written by export_namespace_files, in one transaction.
+
+        Rows whose primary key already exists are skipped, and LTM rows are also
+        deduplicated on content_hash (against the target namespace and within
+        the file). `namespace` re-targets all rows. Returns rows inserted per table;
+        `ltm_namespaces`, if given, receives every namespace that gained LTM rows.
+
+        Imported rows keep their original created_at, which is usually older
+        than the FTS and promotion watermarks: the touched FTS indexes are
+        rebuilt after the commit and the promotion watermark of each touched
+        namespace is reset, so the rows are searchable and promotable at once.
+        """
+        src = Path(in_dir)
+        counts: Dict[str, int] = {}
+        touched: set = set()
+        with self.transaction():
+            for table, order in NAMESPACE_TABLES.items():
+                path = next((p for p in (src / f"{table}.{fmt}" for fmt in EXPORT_FORMATS) if p.exists()), None)
+                if path is None:
+                    continue
+                ns_expr = "* REPLACE (CAST(? AS TEXT) AS namespace)" if namespace else "*"
+                ns_params: List[Any] = [namespace] if namespace else []
+                source = f"SELECT {ns_expr} FROM {self._file_reader(table, path)}"
+                params: List[Any] = [*ns_params, str(path)]
+                if table == "long_term_memory":
+                    source = f"""
+                        SELECT * FROM ({source}) AS f
+                        WHERE f.content_hash IS NULL OR NOT EXISTS (
+                          SELECT 1 FROM long_term_memory AS l
+                          WHERE l.content_hash = f.content_hash AND l.namespace = f.namespace
+                        )
+                        QUALIFY row_number() OVER (PARTITION BY f.namespace, COALESCE(f.content_hash, f.memory_id) ORDER BY f.{order}) = 1
+                    """
+                res = self.execute(
+                    f"INSERT INTO {table} BY NAME {source} ON CONFLICT DO NOTHING RETURNING namespace",
+                    params,
+                )
+                counts[table] = len(res.rows)
+                touched.update(r["namespace"] for r in res.rows if table != "chat_history")
+                if table == "long_term_memory" and ltm_namespaces is not None:
+                    ltm_namespaces.update(r["namespace"] for r in res.rows)
+                if table in FTS_TABLES:
+                    self._mark_fts_dirty(table, len(res.rows))
+            if counts.get("long_term_memory"):
+                self._backfill_ltm_hashes()
+            for ns in touched:
+                self._ltm_hash_filters.pop(ns, None)
+                self._set_meta(f"promotion_watermark:{ns}", None)
+                self.bump_write_generation(ns)
+        if touched:
+            self.refresh_fts_indexes(force=True)
+        return counts
@@ -0,0 +1,106 @@
+import fcntl
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+SpoolEntry = Dict[str, Any]
+
+
+class WriteSpool:
+    """Durable queue of pending record batches for one DuckDB file.
+
+    Writers append one JSON file per batch (atomic rename, never blocks on the
+    database). Whoever holds the writer lock drains the spool in order and
+    deletes entries only after they were applied, so no exchange is lost when
+    the database is busy. The spool directory (`<db_path>.spool/`) belongs to
+    one DB file, like the lock, so a drainer never applies another DB's
+    entries without holding that DB's lock.
+    """
+
+    def __init__(self, db_path: str, spool_dir: Optional[str] = None) -> None:
+        self.db_path = db_path
+        self.spool_dir = Path(spool_dir) if spool_dir else Path(f"{db_path}.spool")
+        self.lock_path = f"{db_path}.writer.lock"
+        # Older versions shared `<db dir>/spool/` between all DBs in a directory
+        self._legacy_dir = None if spool_dir else Path(db_path).parent / "spool"
+
+    def enqueue(self, spec: Dict[str, Any], exchanges: Sequence[Tuple[str, str]], model: Optional[str] = None) -> Path:
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        # Sortable name: nanosecond timestamp first keeps drain order = arrival order
+        name = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+        entry = {"spec": spec, "model": model, "exchanges": [list(x) for x in exchanges]}
+        tmp = self.spool_dir / f".{name}.tmp"
+        tmp.write_text(json.dumps(entry))
+        final = self.spool_dir / name
+        os.replace(tmp, final)
+        return final
+
+    def pending(self) -> List[Path]:
+        if not self.spool_dir.is_dir():
+            return []
+        return sorted(p for p in self.spool_dir.iterdir() if p.suffix == ".json" and not p.name.startswith("."))
+
+    @contextmanager
+    def writer_lock(self, blocking: bool = False) -> Iterator[bool]:
+        Path(self.lock_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "w") as fh:
+            try:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def _adopt_legacy(self) -> None:
+        """Move this DB's entries out of the shared legacy spool directory (caller holds the writer lock)."""
+        if self._legacy_dir is None or not self._legacy_dir.is_dir():
+            return
+        mine = os.path.abspath(self.db_path)
+        for p in sorted(self._legacy_dir.glob("[!.]*.json")):
+            try:
+                spec = json.loads(p.read_text()).get("spec") or {}
+            except (OSError, ValueError):
+                continue
+            if os.path.abspath(str(spec.get("db_path", ""))) == mine:
+                self.spool_dir.mkdir(parents=True, exist_ok=True)
+                os.replace(p, self.spool_dir / p.name)
+
+    def drain(self, apply: Callable[[List[SpoolEntry]], None], batch_size: int = 100) -> int:
+        """Apply pending entries in batches; the caller must hold the writer lock."""
+        self._adopt_legacy()
+        applied = 0
+        while True:
+            paths = self.pending()[:batch_size]
+            if not paths:
+                return applied
+            entries: List[SpoolEntry] = []
+            for p in paths:
+                try:
+                    entries.append(json.loads(p.read_text()))
+                except (OSError, ValueError):
+                    # Unreadable entry: set aside instead of blocking the queue
+                    os.replace(p, p.with_suffix(".bad"))
+            ok = [p for p in paths if p.exists()]
+            apply(entries)
+            for p in ok:
+                p.unlink(missing_ok=True)
+            applied += len(entries)
+
+
+def apply_spool_entries(entries: Sequence[SpoolEntry], get_store: Callable[[Dict[str, Any]], Any]) -> None:
+    """Record spooled batches, one record_conversations_bulk call per (store spec, model) run."""
+    groups: Dict[Tuple[str, Optional[str]], Tuple[Dict[str, Any], List[Tuple[str, str]]]] = {}
+    for entry in entries:
+        spec = entry.get("spec") or {}
+        key = (json.dumps(spec, sort_keys=True), entry.get("model"))
+        groups.setdefault(key, (spec, []))[1].extend((str(u or ""), str(a or "")) for u, a in entry.get("exchanges") or [])
+    for (_, model), (spec, exchanges) in groups.items():
+        if exchanges:
+            get_store(spec).record_conversations_bulk(exchanges, model=model)
@@ -1,9 +1,12 @@
-import hashlib
 import json
 import re
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..utils.hashing import content_hash as _content_hash
+from ..utils.hashing import summary_hash as _summary_hash
+from .vectors import HashedNgramVectorizer
 
 
 TECH_KEYWORDS = {
@@ -42,6 +45,10 @@ FILE_PATTERN = re.compile(r"(?:\b|\./|/)[\w./-]+\.(?:py|go|ts|tsx|js|rs|md|json|
 ISSUE_PATTERN = re.compile(r"\b(?:#\d+|[A-Z]{2,10}-\d{1,6})\b")
 PREF_PATTERN = re.compile(r"\b(i\s+prefer|i\s+like|default\s+to|please\s+always)\b", re.I)
 RULE_PATTERN = re.compile(r"\b(always|never|do\s+not|must|should)\b", re.I)
+CODE_BLOCK_SPLIT = re.compile(r"(```[\s\S]*?```)")
+WHITESPACE = re.compile(r"\s+")
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?]) ")
 
 
 @dataclass
@@ -55,21 +62,70 @@ class ProcessedMemory:
     keywords: List[str]
     promotion_eligible: bool
     content_hash: str
+    summary_hash: str
+    vector: Optional[Any] = None  # float32 hashed n-gram vector when a vectorizer is configured
+    chunk_index: int = 0  # position within the exchange when it was split into several memories
+
+
+@dataclass
+class _Piece:
+    side: str  # "user" or "ai"
+    text: str  # normalized paragraph, or a raw code block
+    code: bool = False
+
+
+@dataclass
+class _Signals:
+    """What the heuristics read from one exchange (or one chunk of it), normalized and tokenized once."""
+
+    text: str  # normalized exchange (code blocks stripped, whitespace collapsed)
+    window: str  # text truncated to the analysis bound
+    summary_source: str  # normalized ai output (or user input when there is none)
+    code: List[str]  # stripped code blocks; still count for preference/rule cues
+    tokens: Set[str]
+    pieces: List[_Piece] = field(default_factory=list)
+    overflow: str = ""  # raw input past the normalization bound; only hashed and counted
 
 
 class HeuristicProcessor:
-    """Deterministic processing of conversations into structured memory items."""
+    """Deterministic processing of conversations into structured memory items.
+
+    Each side is normalized once, keeping paragraph boundaries, and tokenized
+    once; every pattern scans the result at most once. Exchanges longer than
+    `chunk_chars` become several memories, packed from whole paragraphs (or
+    sentences of an overlong one), each classified, scored and hashed on its
+    own. Only the first `max_chars` are analyzed, and raw input past
+    `max_raw_chars` per side is never normalized, so cost is bounded for very
+    long outputs; a single memory's content hash still covers that raw
+    remainder, keeping dedup exact.
+    """
 
-    def __init__(self, promotion_threshold: float = 0.65) -> None:
+    def __init__(
+        self,
+        promotion_threshold: float = 0.65,
+        vectorizer: Optional[HashedNgramVectorizer] = None,
+        max_chars: int = 16384,
+        chunk_chars: int = 1500,
+    ) -> None:
         self.promotion_threshold = promotion_threshold
+        self.vectorizer = vectorizer
+        self.max_chars = max_chars
+        self.chunk_chars = chunk_chars  # <= 0 disables chunking
+        # Whitespace and code blocks shrink under normalization; this leaves room to fill the window
+        self.max_raw_chars = 4 * max_chars
 
     def process_conversation(self, user_input: str, ai_output: str) -> List[ProcessedMemory]:
-        text = self._normalize(f"{user_input}\n\n{ai_output}")
-        summary = self._summarize(ai_output or user_input)
-        category = self._classify(user_input, ai_output)
-        entities, keywords = self._extract_entities_keywords(text)
-        importance = self._importance_score(text, category, entities, keywords)
-        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        sig = self._scan(user_input or "", ai_output or "")
+        if self.chunk_chars <= 0 or len(sig.text) <= self.chunk_chars:
+            return [self._memory(sig)]
+        return [self._memory(chunk, chunk_index=i) for i, chunk in enumerate(self._chunks(sig.pieces))]
+
+    def _memory(self, sig: _Signals, chunk_index: int = 0) -> ProcessedMemory:
+        text = sig.window
+        summary = self._summarize(sig.summary_source)
+        category = self._classify(sig)
+        entities, keywords = self._extract_entities_keywords(sig)
+        importance = self._importance_score(len(sig.text) + len(sig.overflow), category, entities, keywords)
 
         classification = None
         if category in {"preference", "rule"}:
@@ -82,7 +138,7 @@ class HeuristicProcessor:
             "context",
         }
 
-        pm = ProcessedMemory(
+        return ProcessedMemory(
             category_primary=category,
             summary=summary,
             searchable_content=text,
@@ -91,19 +147,123 @@ class HeuristicProcessor:
             entities=entities,
             keywords=keywords,
             promotion_eligible=promotion_eligible,
-            content_hash=content_hash,
+            content_hash=_content_hash(sig.text + sig.overflow),
+            summary_hash=_summary_hash(summary),
+            vector=self.vectorizer.transform(text) if self.vectorizer else None,
+            chunk_index=chunk_index,
         )
 
-        return [pm]
+    def _head(self, s: str) -> Tuple[str, str]:
+        """Split raw input at the last whitespace before max_raw_chars; later passes never see the rest."""
+        if len(s) <= self.max_raw_chars:
+            return s, ""
+        cut = max(s.rfind(" ", 0, self.max_raw_chars), s.rfind("\n", 0, self.max_raw_chars))
+        cut = cut if cut > 0 else self.max_raw_chars
+        return s[:cut], s[cut:]
+
+    def _pieces(self, s: str, ai_from: int) -> List[_Piece]:
+        """Normalized paragraphs and raw code blocks in order; pieces starting at or after offset `ai_from` are the reply's."""
+        pieces: List[_Piece] = []
+        parts = CODE_BLOCK_SPLIT.split(s) if "```" in s else [s]
+        pos = 0
+        for i, part in enumerate(parts):
+            start, pos = pos, pos + len(part)
+            if i % 2:
+                pieces.append(_Piece("ai" if start >= ai_from else "user", part, code=True))
+                continue
+            last = 0
+            for m in [*PARAGRAPH_SPLIT.finditer(part), None]:
+                end = m.start() if m else len(part)
+                para = WHITESPACE.sub(" ", part[last:end]).strip()
+                if para:
+                    pieces.append(_Piece("ai" if start + last >= ai_from else "user", para))
+                last = m.end() if m else end
+        return pieces
 
-    def _normalize(self, s: str) -> str:
-        # Strip code blocks, condense whitespace
-        s = re.sub(r"```[\s\S]*?```", " ", s)
-        s = re.sub(r"\s+", " ", s).strip()
-        return s
+    def _signals(self, pieces: List[_Piece], overflow: str = "") -> _Signals:
+        text = " ".join(p.text for p in pieces if not p.code)
+        window = text
+        if len(text) > self.max_chars:
+            # Cut at a word boundary so no partial path/token is analyzed or stored
+            window = text[: self.max_chars]
+            space = window.rfind(" ")
+            if space > 0:
+                window = window[:space]
+        return _Signals(
+            text=text,
+            window=window,
+            summary_source=" ".join(p.text for p in pieces if p.side == "ai" and not p.code) or text,
+            code=[p.text for p in pieces if p.code],
+            tokens=set(window.split()),
+            pieces=pieces,
+            overflow=overflow,
+        )
+
+    def _scan(self, user: str, ai: str) -> _Signals:
+        user, user_rest = self._head(user)
+        ai, ai_rest = self._head(ai)
+        if user.count("```") % 2:
+            # An unclosed fence in the prompt pairs with one in the reply; split them together, sides by offset
+            pieces = self._pieces(f"{user}\n\n{ai}", ai_from=len(user) + 2)
+        else:
+            pieces = self._pieces(user, ai_from=len(user) + 1) + self._pieces(ai, ai_from=0)
+        # Separators keep a cut exchange from hashing like an uncut one
+        overflow = f"\x00{user_rest}\x00{ai_rest}" if user_rest or ai_rest else ""
+        return self._signals(pieces, overflow)
+
+    def _chunks(self, pieces: List[_Piece]) -> List[_Signals]:
+        """Pack paragraphs (split at sentences, then words, when too long) into chunks of at most chunk_chars."""
+        chunks: List[_Signals] = []
+        current: List[_Piece] = []
+        size = consumed = 0
+        full = False
+        for piece in pieces:
+            if piece.code:
+                current.append(piece)  # travels with the paragraph before it
+                continue
+            for part in self._split_long(piece.text):
+                if consumed + len(part) > self.max_chars:
+                    # Stop at the first part that does not fit: later, shorter ones would leave a gap
+                    full = True
+                    break
+                consumed += len(part) + 1
+                if size and size + 1 + len(part) > self.chunk_chars:
+                    chunks.append(self._signals(current))
+                    current, size = [], 0
+                current.append(_Piece(piece.side, part))
+                size += len(part) + (1 if size else 0)
+            if full or consumed >= self.max_chars:
+                break
+        if any(not p.code for p in current):
+            chunks.append(self._signals(current))
+        elif current and chunks:
+            chunks[-1] = self._signals(chunks[-1].pieces + current)
+        return chunks
+
+    def _split_long(self, text: str) -> List[str]:
+        if len(text) <= self.chunk_chars:
+            return [text]
+        parts: List[str] = []
+        current = ""
+        for sentence in SENTENCE_SPLIT.split(text):
+            while len(sentence) > self.chunk_chars:
+                # No sentence break in reach: cut at the last space that fits
+                cut = sentence.rfind(" ", 0, self.chunk_chars + 1)
+                cut = cut if cut > 0 else self.chunk_chars
+                head, sentence = sentence[:cut], sentence[cut:].lstrip()
+                if current:
+                    parts.append(current)
+                    current = ""
+                parts.append(head)
+            if current and len(current) + 1 + len(sentence) > self.chunk_chars:
+                parts.append(current)
+                current = ""
+            current = f"{current} {sentence}" if current else sentence
+        if current:
+            parts.append(current)
+        return parts
 
     def _summarize(self, s: str, max_len: int = 280) -> str:
-        s = self._normalize(s)
         if len(s) <= max_len:
             return s
         # Try to keep first sentence or meaningful chunk
@@ -114,35 +274,27 @@ class HeuristicProcessor:
             head = s[: max_len - 3]
         return head + "…"
 
-    def _classify(self, user: str, ai: str) -> str:
-        combo = f"{user}\n{ai}"
-        if PREF_PATTERN.search(combo):
+    def _classify(self, sig: _Signals) -> str:
+        # Cues inside code blocks count too; those are only searched when the prose has none
+        code = "\n".join(sig.code)[: self.max_chars] if sig.code else ""
+        if PREF_PATTERN.search(sig.window) or (code and PREF_PATTERN.search(code)):
             return "preference"
-        if RULE_PATTERN.search(combo):
+        if RULE_PATTERN.search(sig.window) or (code and RULE_PATTERN.search(code)):
             return "rule"
         # Skills/knowledge if tech mentions present
-        tokens = set(self._normalize(combo).split())
-        if any(tok in tokens for tok in TECH_KEYWORDS):
+        if not TECH_KEYWORDS.isdisjoint(sig.tokens):
             return "skill"
-        # Context if issues/paths present
-        if FILE_PATTERN.search(combo) or ISSUE_PATTERN.search(combo):
-            return "context"
-        return "context"  # default conservative
-
-    def _extract_entities_keywords(self, text: str) -> Tuple[List[str], List[str]]:
-        entities: List[str] = []
-        for m in FILE_PATTERN.findall(text):
-            entities.append(m)
-        for m in ISSUE_PATTERN.findall(text):
-            entities.append(m)
-
-        tokens = set(text.lower().split())
-        kws = sorted(list(tokens.intersection(TECH_KEYWORDS)))
-        return list(dict.fromkeys(entities)), kws
-
-    def _importance_score(self, text: str, category: str, entities: List[str], keywords: List[str]) -> float:
-        # Length penalty
-        l = len(text)
+        # Issues/paths, or nothing specific: context (default conservative)
+        return "context"
+
+    def _extract_entities_keywords(self, sig: _Signals) -> Tuple[List[str], List[str]]:
+        entities = list(dict.fromkeys(FILE_PATTERN.findall(sig.window) + ISSUE_PATTERN.findall(sig.window)))
+        kws = sorted({tok.lower() for tok in sig.tokens} & TECH_KEYWORDS)
+        return entities, kws
+
+    def _importance_score(self, length: int, category: str, entities: List[str], keywords: List[str]) -> float:
+        # Length penalty (of the whole normalized exchange, not the analysis window)
+        l = length
         length_penalty = 0.0 if l < 800 else 0.15 if l < 2000 else 0.3
 
         # Category boost
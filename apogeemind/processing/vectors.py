@@ -0,0 +1,57 @@
+import re
+import zlib
+from typing import List, Sequence
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+class HashedNgramVectorizer:
+    """Model-free text vectors: word 1-2 grams and character 3-4 grams hashed into `dim` signed buckets.
+
+    Character n-grams give overlap between related word forms ("tests" /
+    "pytest"), so cosine similarity finds matches that share no exact token.
+    crc32 keeps bucket assignment stable across processes (unlike hash()).
+    Vectors are float32 and L2-normalized, so a dot product is the cosine.
+    """
+
+    def __init__(self, dim: int = 256, char_ngrams: Sequence[int] = (3, 4), word_ngrams: Sequence[int] = (1, 2)) -> None:
+        if np is None:
+            raise RuntimeError("numpy is required for semantic vectors")
+        self.dim = dim
+        self.char_ngrams = tuple(char_ngrams)
+        self.word_ngrams = tuple(word_ngrams)
+
+    def _features(self, text: str) -> List[str]:
+        words = WORD_PATTERN.findall(text.lower())
+        feats: List[str] = []
+        for n in self.word_ngrams:
+            feats.extend("w:" + " ".join(words[i : i + n]) for i in range(len(words) - n + 1))
+        for w in words:
+            padded = f" {w} "
+            for n in self.char_ngrams:
+                feats.extend(padded[i : i + n] for i in range(len(padded) - n + 1))
+        return feats
+
+    def transform(self, text: str) -> "np.ndarray":
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in self._features(text)), dtype=np.uint32)
+        vec = np.zeros(self.dim, dtype=np.float32)
+        if hashes.size:
+            # Low bits pick the bucket, the top bit the sign (reduces collision bias)
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            vec = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim).astype(np.float32)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    def transform_many(self, texts: Sequence[str]) -> "np.ndarray":
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([self.transform(t) for t in texts])
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
 from ..db.duckdb_manager import DuckDBManager
+from .scoring import LinearScoringModel, ScoringModel
+from .vector_store import SemanticIndex
 
 
 @dataclass
@@ -14,40 +16,38 @@ class RetrievalResult:
 class RetrievalEngine:
     """Retrieval across STM and LTM with re-ranking and fallback."""
 
-    def __init__(self, db: DuckDBManager) -> None:
+    def __init__(self, db: DuckDBManager, scoring: Optional[ScoringModel] = None, semantic: Optional[SemanticIndex] = None) -> None:
         self.db = db
+        self.scoring = scoring or LinearScoringModel()
+        self.semantic = semantic
 
     def execute_search(
         self,
         namespace: str,
         query: str,
         limit: int = 5,
-        recent_boost_window: int = 30,  # days (placeholder, not used in basic version)
+        recent_boost_window: float = 30,  # days; recency decay time constant
+        with_content: bool = False,
+        pinned_limit: int = 0,
     ) -> RetrievalResult:
-        raw = self.db.search_memories(namespace=namespace, query=query, limit=limit * 3)
-
-        # Simple re-ranking: STM first, then importance desc, then created_at desc
-        def key_fn(r: Dict[str, Any]) -> Tuple[int, float, str]:
-            stm_rank = 1 if r.get("memory_type") == "short_term" else 0
-            return (
-                stm_rank,
-                float(r.get("importance_score", 0.0)),
-                str(r.get("created_at", "")),
-            )
-
-        ranked = sorted(raw, key=key_fn, reverse=True)
-
-        # Dedup by memory_id/summary
-        seen: set = set()
-        deduped: List[Dict[str, Any]] = []
-        for r in ranked:
-            k = (r.get("memory_id"), r.get("summary"))
-            if k in seen:
-                continue
-            seen.add(k)
-            deduped.append(r)
-            if len(deduped) >= limit:
-                break
-
-        return RetrievalResult(items=deduped)
-
+        # Matching, scoring over the whole candidate set, dedup and LIMIT all
+        # happen in one SQL round trip
+        rank_sql, rank_params = self.scoring.rank_sql(recent_boost_window)
+        # Semantic top-k (vectorized cosine) joins the lexical candidates in the same query
+        semantic = self.semantic.search(namespace, query, k=max(4 * limit, 20)) if self.semantic else None
+        items = self.db.search_ranked(
+            namespace=namespace,
+            query=query,
+            rank_sql=rank_sql,
+            rank_params=rank_params,
+            limit=limit,
+            semantic=semantic,
+            pinned_limit=pinned_limit,  # conscious STM rows ride along in the same statement
+        )
+
+        if with_content:
+            # Full text is fetched only for the final items, not for every candidate
+            content = self.db.fetch_memory_content([r["memory_id"] for r in items])
+            items = [{**r, **content.get(r["memory_id"], {})} for r in items]
+
+        return RetrievalResult(items=items)
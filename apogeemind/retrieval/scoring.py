@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, List, Tuple
+
+
+@dataclass
+class RankingWeights:
+    text: float = 0.5  # BM25 score, normalized to the best match in the candidate set
+    importance: float = 1.0
+    recency: float = 0.25  # exp(-age / recent_boost_window)
+    access: float = 0.1  # log(1 + access_count), normalized to the most used candidate
+    stm_boost: float = 1.0
+    semantic: float = 0.5  # cosine similarity of hashed n-gram vectors (semantic layer)
+
+
+class ScoringModel(ABC):
+    """Produces the SQL expression that ranks retrieval candidates.
+
+    The expression is evaluated by DuckDB over the whole candidate set in one
+    pass (window aggregates are allowed), so ranking cost does not depend on
+    Python-side row handling. Available columns: memory_type, importance_score,
+    created_at, access_count, text_score (NULL for LIKE-only matches), lexical
+    (FALSE for rows found only by the semantic layer), semantic_score.
+    Subclass and override rank_sql to plug in a different model.
+    """
+
+    @abstractmethod
+    def rank_sql(self, recent_boost_window_days: float) -> Tuple[str, List[Any]]:
+        """SQL expression (with ? placeholders) and its parameters."""
+
+
+class LinearScoringModel(ScoringModel):
+    """Weighted sum of text relevance, semantic similarity, importance, recency decay, access frequency and an STM boost.
+
+    Lexical rows without a BM25 score (the ILIKE tail of unindexed rows on the
+    FTS path) get `tail_text_score` as their relevance, so a fresh substring
+    match cannot tie with the best BM25 hit; when no candidate has a BM25
+    score (LIKE fallback) every lexical row gets full text relevance.
+    """
+
+    def __init__(self, weights: RankingWeights | None = None, tail_text_score: float = 0.5) -> None:
+        self.weights = weights or RankingWeights()
+        self.tail_text_score = tail_text_score
+
+    def rank_sql(self, recent_boost_window_days: float) -> Tuple[str, List[Any]]:
+        w = self.weights
+        window_s = max(1.0, float(recent_boost_window_days) * 86400.0)
+        sql = """
+            ? * CASE WHEN NOT lexical THEN 0
+                     WHEN max(text_score) OVER () IS NULL THEN 1.0
+                     ELSE COALESCE(text_score / NULLIF(max(text_score) OVER (), 0), ?) END
+            + ? * greatest(0, COALESCE(semantic_score, 0))
+            + ? * importance_score
+            + ? * exp(-greatest(0, date_diff('second', created_at, CAST(current_timestamp AS TIMESTAMP))) / ?)
+            + ? * COALESCE(ln(1 + COALESCE(access_count, 0)) / NULLIF(ln(1 + max(COALESCE(access_count, 0)) OVER ()), 0), 0)
+            + ? * CAST(memory_type = 'short_term' AS DOUBLE)
+        """
+        return sql, [w.text, self.tail_text_score, w.semantic, w.importance, w.recency, window_s, w.access, w.stm_boost]
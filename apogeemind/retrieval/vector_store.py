@@ -0,0 +1,386 @@
+import fcntl
+import math
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from ..processing.vectors import HashedNgramVectorizer, np
+
+
+class VectorStore:
+    """Append-only float32 matrix per namespace, memory-mapped for search.
+
+    Files live next to the DuckDB file: `<ns>.d<dim>.f32` holds the rows and
+    `<ns>.d<dim>.ids` the matching memory_ids, one per line. Rows are written
+    before ids, so a reader trusting the id count never sees a partial row.
+    Readers keep the mapping and id list cached and only read what was
+    appended since the last call. drop() bumps a counter in `<ns>.d<dim>.gen`
+    after removing the files; a reader seeing a new generation reloads
+    everything, since a rewritten file may be as large as the cached one.
+    """
+
+    def __init__(self, root: str, dim: int) -> None:
+        if np is None:
+            raise RuntimeError("numpy is required for the vector store")
+        self.root = Path(root)
+        self.dim = dim
+        self._ids: Dict[str, Tuple[int, int, List[str]]] = {}  # ns -> (generation, bytes read, ids)
+        self._maps: Dict[str, Any] = {}
+
+    def _paths(self, namespace: str) -> Tuple[Path, Path]:
+        stem = f"{quote(namespace, safe='')}.d{self.dim}"
+        return self.root / f"{stem}.f32", self.root / f"{stem}.ids"
+
+    def _generation_path(self, namespace: str) -> Path:
+        vec_path, _ = self._paths(namespace)
+        return vec_path.with_suffix(".gen")
+
+    def _generation(self, namespace: str) -> int:
+        try:
+            return int(self._generation_path(namespace).read_text() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    @contextmanager
+    def _locked(self, namespace: str) -> Iterator[None]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        vec_path, _ = self._paths(namespace)
+        with open(f"{vec_path}.lock", "w") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def add(self, namespace: str, ids: Sequence[str], vectors: Any) -> None:
+        if not ids:
+            return
+        mat = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        vec_path, ids_path = self._paths(namespace)
+        with self._locked(namespace):
+            with open(vec_path, "ab") as fh:
+                fh.write(mat.tobytes())
+                fh.flush()
+                os.fsync(fh.fileno())
+            with open(ids_path, "a", encoding="utf-8") as fh:
+                fh.write("".join(f"{i}\n" for i in ids))
+
+    def drop(self, namespace: str) -> None:
+        with self._locked(namespace):
+            for p in self._paths(namespace):
+                p.unlink(missing_ok=True)
+            # Bumped only once the old files are gone, so a reader at the new generation never sees them
+            gen_path = self._generation_path(namespace)
+            tmp = gen_path.with_suffix(".gen.tmp")
+            tmp.write_text(str(self._generation(namespace) + 1))
+            os.replace(tmp, gen_path)
+        self._ids.pop(namespace, None)
+        self._maps.pop(namespace, None)
+
+    def load(self, namespace: str) -> Tuple[List[str], Any]:
+        """Return (ids, matrix) with matrix rows aligned to ids; the matrix is a read-only memmap."""
+        vec_path, ids_path = self._paths(namespace)
+        while True:
+            gen = self._generation(namespace)
+            try:
+                size = ids_path.stat().st_size
+            except OSError:
+                self._ids.pop(namespace, None)
+                self._maps.pop(namespace, None)
+                return [], np.zeros((0, self.dim), dtype=np.float32)
+            cached_gen, read, ids = self._ids.get(namespace, (gen, 0, []))
+            if cached_gen != gen:
+                read, ids = 0, []  # dropped and rewritten
+                self._maps.pop(namespace, None)
+            if size > read:
+                with open(ids_path, "rb") as fh:
+                    fh.seek(read)
+                    chunk = fh.read(size - read)
+                # Only complete lines; a concurrent append may be mid-write
+                complete = chunk[: chunk.rfind(b"\n") + 1]
+                ids = ids + complete.decode("utf-8").splitlines()
+                read += len(complete)
+                self._maps.pop(namespace, None)
+            if self._generation(namespace) == gen:
+                break
+            # A drop landed while reading: what was read may belong to either file
+            self._ids.pop(namespace, None)
+        self._ids[namespace] = (gen, read, ids)
+        mat = self._maps.get(namespace)
+        if mat is None or mat.shape[0] != len(ids):
+            rows = min(len(ids), vec_path.stat().st_size // (4 * self.dim)) if vec_path.exists() else 0
+            mat = np.memmap(vec_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else np.zeros((0, self.dim), dtype=np.float32)
+            self._maps[namespace] = mat
+        # Slicing copies the list; skip it in the common aligned case
+        return (ids if len(ids) == mat.shape[0] else ids[: mat.shape[0]]), mat
+
+    def count(self, namespace: str) -> int:
+        return len(self.load(namespace)[0])
+
+    def search(self, namespace: str, query: Any, k: int) -> List[Tuple[str, float]]:
+        """Brute-force cosine top-k: one matrix-vector product plus argpartition."""
+        ids, mat = self.load(namespace)
+        if not ids or k <= 0:
+            return []
+        sims = mat @ np.asarray(query, dtype=np.float32)
+        k = min(k, len(ids))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(ids[i], float(sims[i])) for i in top]
+
+
+class _IVFState:
+    __slots__ = ("version", "centroids", "order", "offsets", "packed")
+
+    def __init__(self, version: int, centroids: Any, order: Any, offsets: Any, packed: Any) -> None:
+        self.version = version
+        self.centroids = centroids
+        self.order = order  # matrix row numbers, grouped by list
+        self.offsets = offsets  # list i is order[offsets[i]:offsets[i + 1]]
+        self.packed = packed  # the same rows, copied in list order
+
+
+class IVFIndex:
+    """Inverted-file ANN index over a VectorStore namespace (spherical k-means lists).
+
+    Next to the vector files: `<ns>.d<dim>.ivf.assign` holds one raw int32
+    list number per matrix row, `<ns>.d<dim>.ivf.npz` the centroids and the
+    list layout, and `<ns>.d<dim>.ivf.<gen>.f32` a copy of the rows packed in
+    list order, so probing a list reads one contiguous slice.
+
+    update() assigns appended rows to their nearest centroid. Until the next
+    repack they are scanned exactly as a tail; the pack is rewritten (no
+    k-means) once the tail outgrows `repack_fraction` of it, and the centroids
+    are retrained only after the namespace grew `retrain_growth` times since
+    the last training, so both costs are amortized. Below `min_train_rows`
+    search is the exact scan.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        nprobe: int = 48,
+        min_train_rows: int = 4096,
+        retrain_growth: float = 4.0,
+        repack_fraction: float = 0.125,
+        kmeans_iters: int = 8,
+        seed: int = 0,
+    ) -> None:
+        self.store = store
+        self.nprobe = nprobe
+        self.min_train_rows = min_train_rows
+        self.retrain_growth = retrain_growth
+        self.repack_fraction = repack_fraction
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+        self._states: Dict[str, _IVFState] = {}
+
+    def _stem(self, namespace: str) -> str:
+        vec_path, _ = self.store._paths(namespace)
+        return str(vec_path)[: -len(".f32")]
+
+    def _paths(self, namespace: str) -> Tuple[Path, Path]:
+        stem = self._stem(namespace)
+        return Path(f"{stem}.ivf.npz"), Path(f"{stem}.ivf.assign")
+
+    def _pack_path(self, namespace: str, gen: int) -> Path:
+        return Path(f"{self._stem(namespace)}.ivf.{gen}.f32")
+
+    @staticmethod
+    def nlist_for(rows: int) -> int:
+        return max(1, min(4096, int(2 * math.sqrt(rows))))
+
+    def _assign(self, centroids: Any, mat: Any, start: int, chunk: int = 65536) -> Any:
+        out = np.empty(mat.shape[0] - start, dtype=np.int32)
+        for i in range(start, mat.shape[0], chunk):
+            block = np.asarray(mat[i : i + chunk])
+            out[i - start : i - start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return out
+
+    def _kmeans(self, mat: Any, nlist: int) -> Any:
+        rng = np.random.default_rng(self.seed)
+        n = mat.shape[0]
+        # ~32 points per list is enough to place centroids; sorted picks keep memmap reads sequential
+        sample = np.asarray(mat[np.sort(rng.choice(n, min(n, nlist * 32), replace=False))])
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            labels = self._assign(centroids, sample, 0)
+            order = np.argsort(labels, kind="stable")
+            present, starts = np.unique(labels[order], return_index=True)
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            # Empty lists are reseeded from random sample points
+            fresh = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            fresh[present] = sums
+            norms = np.linalg.norm(fresh, axis=1, keepdims=True)
+            centroids = (fresh / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+        return centroids
+
+    def _read_meta(self, namespace: str) -> Optional[Dict[str, Any]]:
+        npz_path, _ = self._paths(namespace)
+        try:
+            with np.load(npz_path) as z:
+                return {key: z[key] for key in z.files}
+        except OSError:
+            return None
+
+    def _pack(self, namespace: str, mat: Any, centroids: Any, labels: Any, trained_rows: int, chunk: int = 65536) -> None:
+        """Write rows [0, len(labels)) in list order, then publish the layout (caller holds the lock)."""
+        old = self._read_meta(namespace)
+        gen = int(old["gen"]) + 1 if old is not None else 0
+        order = np.argsort(labels, kind="stable").astype(np.int64)
+        offsets = np.searchsorted(labels[order], np.arange(len(centroids) + 1)).astype(np.int64)
+        pack_path = self._pack_path(namespace, gen)
+        with open(pack_path, "wb") as fh:
+            for i in range(0, len(order), chunk):
+                # Sorted row numbers keep each chunk's memmap reads sequential
+                rows = order[i : i + chunk]
+                fh.write(np.asarray(mat[rows], dtype=np.float32).tobytes())
+        npz_path, _ = self._paths(namespace)
+        with open(f"{npz_path}.tmp", "wb") as fh:
+            np.savez(fh, centroids=centroids, order=order, offsets=offsets, trained_rows=np.int64(trained_rows), gen=np.int64(gen))
+        os.replace(f"{npz_path}.tmp", npz_path)
+        if old is not None:
+            # Readers still mapping the old pack keep it alive until they reload
+            self._pack_path(namespace, int(old["gen"])).unlink(missing_ok=True)
+
+    def train(self, namespace: str) -> int:
+        """Retrain the centroids on the whole namespace and reassign every row; returns the list count."""
+        with self.store._locked(namespace):
+            return self._train_locked(namespace)
+
+    def _train_locked(self, namespace: str) -> int:
+        ids, mat = self.store.load(namespace)
+        if not ids:
+            return 0
+        nlist = self.nlist_for(len(ids))
+        centroids = self._kmeans(mat, nlist)
+        labels = self._assign(centroids, mat, 0)
+        _, assign_path = self._paths(namespace)
+        labels.tofile(f"{assign_path}.tmp")
+        os.replace(f"{assign_path}.tmp", assign_path)
+        self._pack(namespace, mat, centroids, labels, trained_rows=len(ids))
+        return nlist
+
+    def update(self, namespace: str) -> None:
+        """Assign rows appended since the last call; repacks or retrains when the unpacked tail has grown enough."""
+        with self.store._locked(namespace):
+            ids, mat = self.store.load(namespace)
+            meta = self._read_meta(namespace)
+            if meta is None:
+                if len(ids) >= self.min_train_rows:
+                    self._train_locked(namespace)
+                return
+            if len(ids) >= int(meta["trained_rows"]) * self.retrain_growth:
+                self._train_locked(namespace)
+                return
+            _, assign_path = self._paths(namespace)
+            assigned = assign_path.stat().st_size // 4 if assign_path.exists() else 0
+            if assigned < len(ids):
+                with open(assign_path, "ab") as fh:
+                    fh.write(self._assign(meta["centroids"], mat, assigned).tobytes())
+            packed = len(meta["order"])
+            if len(ids) - packed > max(self.min_train_rows, packed * self.repack_fraction):
+                labels = np.fromfile(assign_path, dtype=np.int32)[: len(ids)]
+                self._pack(namespace, mat, meta["centroids"], labels, trained_rows=int(meta["trained_rows"]))
+
+    def _state(self, namespace: str) -> Optional[_IVFState]:
+        npz_path, _ = self._paths(namespace)
+        try:
+            version = npz_path.stat().st_mtime_ns
+        except OSError:
+            self._states.pop(namespace, None)
+            return None
+        state = self._states.get(namespace)
+        if state is None or state.version != version:
+            meta = self._read_meta(namespace)
+            if meta is None:
+                return None
+            try:
+                shape = (len(meta["order"]), self.store.dim)
+                packed = np.memmap(self._pack_path(namespace, int(meta["gen"])), dtype=np.float32, mode="r", shape=shape)
+            except (OSError, ValueError):
+                return None  # repacked between the two reads; the next call picks up the new layout
+            state = _IVFState(version, meta["centroids"], meta["order"], meta["offsets"], packed)
+            self._states[namespace] = state
+        return state
+
+    def search(self, namespace: str, query: Any, k: int, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        state = self._state(namespace)
+        if state is None:
+            return self.store.search(namespace, query, k)
+        ids, mat = self.store.load(namespace)
+        if not ids or k <= 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        nprobe = min(nprobe or self.nprobe, len(state.centroids))
+        probes = np.sort(np.argpartition(-(state.centroids @ q), nprobe - 1)[:nprobe])
+        rows, sims = [], []
+        for p in probes:
+            a, b = state.offsets[p], state.offsets[p + 1]
+            rows.append(state.order[a:b])
+            sims.append(state.packed[a:b] @ q)
+        # Rows appended since the last pack are scanned exactly
+        packed = len(state.order)
+        rows.append(np.arange(packed, len(ids)))
+        sims.append(mat[packed:] @ q if len(ids) > packed else np.zeros(0, dtype=np.float32))
+        rows_a, sims_a = np.concatenate(rows), np.concatenate(sims)
+        keep = rows_a < len(ids)
+        rows_a, sims_a = rows_a[keep], sims_a[keep]
+        if not len(rows_a):
+            return []
+        k = min(k, len(rows_a))
+        top = np.argpartition(-sims_a, k - 1)[:k]
+        top = top[np.argsort(-sims_a[top])]
+        return [(ids[rows_a[i]], float(sims_a[i])) for i in top]
+
+    def drop(self, namespace: str) -> None:
+        with self.store._locked(namespace):
+            meta = self._read_meta(namespace)
+            if meta is not None:
+                self._pack_path(namespace, int(meta["gen"])).unlink(missing_ok=True)
+            for p in self._paths(namespace):
+                p.unlink(missing_ok=True)
+        self._states.pop(namespace, None)
+
+
+class SemanticIndex:
+    """Vectorizer + vector store (+ optional IVF index): what ingestion writes and retrieval queries."""
+
+    def __init__(
+        self,
+        vectorizer: HashedNgramVectorizer,
+        store: VectorStore,
+        min_similarity: float = 0.12,
+        ann: Optional[IVFIndex] = None,
+    ) -> None:
+        self.vectorizer = vectorizer
+        self.store = store
+        self.min_similarity = min_similarity
+        self.ann = ann
+
+    @classmethod
+    def for_db(cls, db_path: str, dim: int = 256, nprobe: int = 48) -> Optional["SemanticIndex"]:
+        """nprobe=0 disables the IVF index (exact scans only)."""
+        if np is None:
+            return None
+        store = VectorStore(f"{db_path}.vectors", dim=dim)
+        return cls(HashedNgramVectorizer(dim=dim), store, ann=IVFIndex(store, nprobe=nprobe) if nprobe > 0 else None)
+
+    def add(self, namespace: str, ids: Sequence[str], vectors: Any) -> None:
+        self.store.add(namespace, ids, vectors)
+        if self.ann is not None:
+            self.ann.update(namespace)
+
+    def search(self, namespace: str, query: str, k: int) -> Dict[str, float]:
+        if not query.strip():
+            return {}
+        index = self.ann or self.store
+        hits = index.search(namespace, self.vectorizer.transform(query), k)
+        return {mid: sim for mid, sim in hits if sim >= self.min_similarity}
+
+    def drop(self, namespace: str) -> None:
+        if self.ann is not None:
+            self.ann.drop(namespace)
+        self.store.drop(namespace)
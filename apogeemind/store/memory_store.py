@@ -1,16 +1,22 @@
 import json
+import time
 import uuid
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from ..agents.conscious_agent import ConsciousAgent
+from ..agents.conscious_agent import PERMANENT_CATEGORIES, ConsciousAgent
+from ..agents.retention_agent import RetentionAgent, default_archive_dir
 from ..config import Config as EnvConfig
-from ..db.duckdb_manager import DuckDBManager
+from ..db.duckdb_manager import STM_LIVE, DuckDBManager
 from ..processing.heuristics import HeuristicProcessor
 from ..retrieval.retrieval_engine import RetrievalEngine
+from ..retrieval.scoring import LinearScoringModel, RankingWeights
+from ..retrieval.vector_store import SemanticIndex
 from ..utils.context_builder import ContextBuilder
-from ..utils.redaction import redact
+from ..utils.query_cache import QueryCache
+from ..utils.redaction import Redactor, load_patterns_file
 
 
 def default_namespace() -> str:
@@ -28,12 +34,15 @@ class MemoryStoreConfig:
     auto_ingest: bool = True
     stm_capacity: int = 20
     promotion_threshold: float = 0.65
+    read_only: bool = False  # retrieval-only callers (inject/health): no write lock, no promotion
+    lock_timeout: float = 2.0  # seconds to retry while another process holds the DB lock
 
 
 class MemoryStore:
     """Orchestrates DB, heuristics, retrieval, and promotion."""
 
     def __init__(self, config: Optional[MemoryStoreConfig] = None) -> None:
+        opened = time.perf_counter_ns()
         # Merge env config with provided config; provided values take precedence
         env = EnvConfig.from_env(
             default_db=str(Path.cwd() / "apogeemind" / "apogeemind.duckdb"),
@@ -57,91 +66,215 @@ class MemoryStore:
                 auto_ingest=config.auto_ingest,
                 stm_capacity=config.stm_capacity,
                 promotion_threshold=config.promotion_threshold,
+                read_only=config.read_only,
+                lock_timeout=config.lock_timeout,
             )
         self.config = cfg
-        self.db = DuckDBManager(cfg.db_path, auto_init_schema=True)
+        self.recent_boost_window = env.recent_boost_window_days
+        self.db = DuckDBManager(cfg.db_path, auto_init_schema=True, read_only=cfg.read_only, lock_timeout=cfg.lock_timeout)
+        self.tracer = self.db.tracer
         self.session_id = str(uuid.uuid4())
 
         # Components
-        self.heur = HeuristicProcessor(promotion_threshold=cfg.promotion_threshold)
-        self.retrieval = RetrievalEngine(self.db)
-        self.conscious = ConsciousAgent(self.db, stm_capacity=cfg.stm_capacity, promotion_threshold=cfg.promotion_threshold)
-        self.ctx_builder = ContextBuilder()
+        # Built once: all patterns in one compiled alternation (custom ones from APOGEEMIND_REDACT_PATTERNS)
+        self.redactor = Redactor.from_config(
+            load_patterns_file(env.redact_patterns_file) if env.redact_patterns_file else None,
+            defaults=env.redact_defaults,
+        )
+        # Optional semantic layer (needs numpy): hashed n-gram vectors in an mmap matrix per namespace, IVF-indexed
+        self.semantic = SemanticIndex.for_db(cfg.db_path, dim=env.semantic_dim, nprobe=env.semantic_nprobe) if env.semantic else None
+        self.heur = HeuristicProcessor(
+            promotion_threshold=cfg.promotion_threshold,
+            vectorizer=self.semantic.vectorizer if self.semantic else None,
+            chunk_chars=env.chunk_chars,
+        )
+        weights = RankingWeights(
+            text=env.rank_text_weight,
+            importance=env.rank_importance_weight,
+            recency=env.rank_recency_weight,
+            access=env.rank_access_weight,
+            stm_boost=env.rank_stm_boost,
+            semantic=env.rank_semantic_weight,
+        )
+        self.retrieval = RetrievalEngine(self.db, scoring=LinearScoringModel(weights), semantic=self.semantic)
+        # STM lifetimes by source LTM category, in seconds
+        self.stm_ttl = {cat: days * 86400.0 for cat, days in env.stm_ttl_days.items() if days > 0}
+        self.conscious = ConsciousAgent(
+            self.db,
+            stm_capacity=cfg.stm_capacity,
+            promotion_threshold=cfg.promotion_threshold,
+            stm_ttl=self.stm_ttl,
+        )
+        self.retention = RetentionAgent(
+            self.db,
+            env.archive_dir or default_archive_dir(cfg.db_path),
+            max_age_days=env.chat_retention_days,
+            max_rows=env.chat_retention_rows,
+        )
+        self.ctx_builder = ContextBuilder(max_tokens=env.context_tokens)
+        self.conscious_share = min(1.0, max(0.0, env.context_conscious_share))
+        self.query_cache: Optional[QueryCache] = None
+        if env.query_cache:
+            self.query_cache = QueryCache(
+                f"{cfg.db_path}.cache.sqlite",
+                max_entries=env.query_cache_size,
+                ttl_seconds=env.query_cache_ttl_seconds,
+            )
 
         # Initial conscious promotion if enabled
-        if cfg.conscious_ingest:
+        if cfg.conscious_ingest and not cfg.read_only:
             self.conscious.run_initial_promotion(cfg.namespace)
+        self.tracer.event("store.open", (time.perf_counter_ns() - opened) / 1e6, read_only=cfg.read_only)
 
     # Recording
     def record_conversation(self, user_input: str, ai_output: str, model: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> str:
-        # Redact sensitive data before persisting
-        user_input_red = redact(user_input or "")
-        ai_output_red = redact(ai_output or "")
-        chat_id = self.db.insert_chat(
-            namespace=self.config.namespace,
-            session_id=self.session_id,
-            user_input=user_input_red,
-            ai_output=ai_output_red,
-            model=model,
-            tokens_used=(metadata or {}).get("tokens_used"),
-        )
+        tokens_used = (metadata or {}).get("tokens_used")
+        with self.tracer.span("record", exchanges=1):
+            return self._record_batch([(user_input, ai_output, tokens_used)], model=model)[0]
 
-        # Process and store derived LTM, and possibly promote to STM
-        processed = self.heur.process_conversation(user_input_red, ai_output_red)
-        for pm in processed:
-            # Dedup check
-            dup = self.db.find_ltm_duplicate(
-                namespace=self.config.namespace,
-                summary_norm=pm.summary.lower(),
-                content_norm=pm.searchable_content.lower(),
-            )
-            if dup:
-                self.db.bump_ltm_access(dup["memory_id"])  # soft update
-                continue
-
-            mem_id = str(uuid.uuid4())
-            self.db.insert_ltm(
-                memory_id=mem_id,
-                namespace=self.config.namespace,
-                category_primary=pm.category_primary,
-                summary=pm.summary,
-                searchable_content=pm.searchable_content,
-                importance_score=pm.importance_score,
-                classification=pm.classification,
-                entities_json=json.dumps(pm.entities) if pm.entities else None,
-                keywords_json=json.dumps(pm.keywords) if pm.keywords else None,
-                content_hash=pm.content_hash,
+    def record_conversations_bulk(self, exchanges: Iterable[Tuple[str, str]], model: Optional[str] = None) -> List[str]:
+        """Record many (user_input, ai_output) exchanges in one transaction; returns chat_ids in order."""
+        batch = [(u, a, None) for u, a in exchanges]
+        with self.tracer.span("record", exchanges=len(batch)):
+            return self._record_batch(batch, model=model)
+
+    def _record_batch(self, exchanges: Sequence[Tuple[str, str, Optional[int]]], model: Optional[str]) -> List[str]:
+        ns = self.config.namespace
+        chat_ids: List[str] = []
+        chats: List[Dict[str, Any]] = []
+        ltm: List[Dict[str, Any]] = []
+        stm: List[Dict[str, Any]] = []
+        bumps: Dict[str, int] = {}
+        batch_hashes: Dict[str, str] = {}  # hash -> memory_id for rows not yet inserted
+        now: Optional[datetime] = None
+        vec_ids: List[str] = []
+        vecs: List[Any] = []
+        stages = self.tracer.stages("record")  # per-stage totals over the batch
+
+        for user_input, ai_output, tokens_used in exchanges:
+            # Redact sensitive data before persisting
+            with stages.time("redact"):
+                user_input_red = self.redactor.redact(user_input or "")
+                ai_output_red = self.redactor.redact(ai_output or "")
+            chat_id = str(uuid.uuid4())
+            chat_ids.append(chat_id)
+            chats.append(
+                {
+                    "chat_id": chat_id,
+                    "session_id": self.session_id,
+                    "namespace": ns,
+                    "user_input": user_input_red,
+                    "ai_output": ai_output_red,
+                    "model": model,
+                    "tokens_used": tokens_used,
+                }
             )
 
-            # Promote eligible
-            if pm.promotion_eligible and self.config.conscious_ingest:
-                try:
-                    self.db.insert_stm(
-                        memory_id=f"conscious_{mem_id}",
-                        namespace=self.config.namespace,
-                        category_primary="conscious_context",
-                        summary=pm.summary,
-                        searchable_content=pm.searchable_content,
-                        importance_score=pm.importance_score,
-                        is_permanent_context=pm.category_primary in ("preference", "rule"),
+            # Process and store derived LTM, and possibly promote to STM
+            with stages.time("heuristics"):
+                processed = self.heur.process_conversation(user_input_red, ai_output_red)
+            for pm in processed:
+                # Dedup check: earlier in this batch, then the table
+                with stages.time("dedup"):
+                    dup_id = batch_hashes.get(pm.summary_hash) or batch_hashes.get(pm.content_hash)
+                    if dup_id is None:
+                        dup = self.db.find_ltm_duplicate(namespace=ns, summary_hash=pm.summary_hash, content_hash=pm.content_hash)
+                        dup_id = dup["memory_id"] if dup else None
+                if dup_id:
+                    bumps[dup_id] = bumps.get(dup_id, 0) + 1  # soft update
+                    continue
+
+                mem_id = str(uuid.uuid4())
+                if pm.vector is not None:
+                    vec_ids.append(mem_id)
+                    vecs.append(pm.vector)
+                batch_hashes[pm.summary_hash] = mem_id
+                batch_hashes[pm.content_hash] = mem_id
+                ltm.append(
+                    {
+                        "memory_id": mem_id,
+                        "namespace": ns,
+                        "category_primary": pm.category_primary,
+                        "summary": pm.summary,
+                        "searchable_content": pm.searchable_content,
+                        "importance_score": pm.importance_score,
+                        "classification": pm.classification,
+                        "entities_json": json.dumps(pm.entities) if pm.entities else None,
+                        "keywords_json": json.dumps(pm.keywords) if pm.keywords else None,
+                        "content_hash": pm.content_hash,
+                        "summary_hash": pm.summary_hash,
+                        "chat_id": chat_id,
+                        "chunk_index": pm.chunk_index,
+                    }
+                )
+
+                # Promote eligible
+                if pm.promotion_eligible and self.config.conscious_ingest:
+                    ttl = self.stm_ttl.get(pm.category_primary)
+                    if ttl and now is None:
+                        # expires_at uses DuckDB's clock, the one created_at defaults to
+                        now = self.db.db_now()
+                    stm.append(
+                        {
+                            "memory_id": f"conscious_{mem_id}",
+                            "namespace": ns,
+                            "category_primary": "conscious_context",
+                            "summary": pm.summary,
+                            "searchable_content": pm.searchable_content,
+                            "importance_score": pm.importance_score,
+                            "is_permanent_context": pm.category_primary in PERMANENT_CATEGORIES,
+                            "expires_at": now + timedelta(seconds=ttl) if ttl else None,
+                        }
                     )
-                except Exception:
-                    pass
-                self.db.prune_stm_by_capacity(self.config.namespace, self.config.stm_capacity)
 
-        return chat_id
+        stages.flush(exchanges=len(exchanges))
+
+        # One commit for the whole batch; capacity is enforced once
+        with self.tracer.span("record.write", ltm=len(ltm), stm=len(stm), dedup=len(bumps)):
+            with self.db.transaction():
+                self.db.insert_chats_bulk(chats)
+                self.db.insert_ltm_bulk(ltm)
+                self.db.bump_ltm_access_bulk(bumps)
+                if bumps:
+                    # access_count feeds ranking; new rows bump the generation themselves
+                    self.db.bump_write_generation(ns)
+                if stm:
+                    self.db.insert_stm_bulk(stm)
+                with self.tracer.span("record.prune"):
+                    if stm:
+                        # Also drops expired rows
+                        self.db.prune_stm_by_capacity(ns, self.config.stm_capacity)
+                    else:
+                        self.db.sweep_expired_stm(ns)
+
+        # Rebuild stale FTS snapshots here, after the commit, so searches never pay for it
+        with self.tracer.span("record.fts_refresh") as span:
+            span["tables"] = len(self.db.refresh_fts_indexes())
+
+        if self.semantic and vec_ids:
+            # After commit: a vector never points at a row that was rolled back
+            with self.tracer.span("record.vectors", rows=len(vec_ids)):
+                self.semantic.add(ns, vec_ids, vecs)
+
+        return chat_ids
 
     # Retrieval & prompts
-    def retrieve_context(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        result = self.retrieval.execute_search(namespace=self.config.namespace, query=query, limit=limit)
+    def retrieve_context(self, query: str, limit: int = 5, with_content: bool = False) -> List[Dict[str, Any]]:
+        result = self.retrieval.execute_search(
+            namespace=self.config.namespace,
+            query=query,
+            limit=limit,
+            recent_boost_window=self.recent_boost_window,
+            with_content=with_content,
+        )
         return result.items
 
     def get_conscious_system_prompt(self) -> str:
         # Pull top STM items
         rows = self.db.execute(
-            """
-            SELECT * FROM short_term_memory
-            WHERE namespace = ?
+            f"""
+            SELECT category_primary, summary, created_at, importance_score FROM short_term_memory
+            WHERE namespace = ? AND {STM_LIVE}
             ORDER BY importance_score DESC, created_at DESC
             LIMIT 10
             """,
@@ -149,13 +282,73 @@ class MemoryStore:
         ).rows
         return self.ctx_builder.build_system_block(rows, header_label="Conscious Working Memory", namespace=self.config.namespace)
 
-    def get_auto_ingest_system_prompt(self, user_input: str) -> str:
-        items = self.retrieve_context(user_input, limit=5)
-        return self.ctx_builder.build_system_block(items, header_label="Relevant Memories", namespace=self.config.namespace)
+    def get_auto_ingest_system_prompt(self, user_input: str, limit: int = 5) -> str:
+        ns = self.config.namespace
+
+        def build() -> str:
+            with self.tracer.span("inject.retrieve"):
+                items = self.retrieve_context(user_input, limit=limit)
+            with self.tracer.span("inject.render", items=len(items)):
+                return self.ctx_builder.build_system_block(items, header_label="Relevant Memories", namespace=ns)
+
+        return self._cached_block(user_input, limit, "", build)
+
+    def get_combined_system_prompt(self, user_input: str, limit: int = 5, pinned_limit: int = 10) -> str:
+        """Conscious working memory and query-relevant memories in one block, fetched by one statement.
+
+        The two sections split one token budget (APOGEEMIND_CONTEXT_CONSCIOUS_SHARE
+        for the conscious part, the rest and anything it leaves unused for
+        relevant memories); a memory shown as conscious is not repeated.
+        Returns "" when there is nothing to inject.
+        """
+        ns = self.config.namespace
+        pinned = pinned_limit if self.config.conscious_ingest else 0
+
+        def build() -> str:
+            with self.tracer.span("inject.retrieve"):
+                result = self.retrieval.execute_search(
+                    namespace=ns,
+                    query=user_input,
+                    limit=limit,
+                    recent_boost_window=self.recent_boost_window,
+                    pinned_limit=pinned,
+                )
+            conscious = [r for r in result.items if r.get("section") == "conscious"]
+            relevant = [r for r in result.items if r.get("section") != "conscious"]
+            with self.tracer.span("inject.render", items=len(result.items)):
+                return self.ctx_builder.build_sections(
+                    [
+                        ("Conscious Working Memory", conscious, self.conscious_share),
+                        ("Relevant Memories", relevant, 1.0 - self.conscious_share),
+                    ],
+                    namespace=ns,
+                )
+
+        return self._cached_block(user_input, limit, f"combined:{pinned}", build)
+
+    def _cached_block(self, user_input: str, limit: int, mode: str, build: Callable[[], str]) -> str:
+        ns = self.config.namespace
+        with self.tracer.span("inject", mode=mode or "auto") as span:
+            if self.query_cache is None:
+                return build()
+            # A repeated query costs a generation lookup plus one cache read
+            with self.tracer.span("inject.cache_lookup"):
+                generation = self.db.write_generation(ns)
+                block = self.query_cache.get(ns, user_input, limit, generation, mode)
+            span["cached"] = block is not None
+            if block is None:
+                # STM expiry changes results without a write: the entry lives until the next row expires
+                started = time.time()
+                remaining = self.db.next_stm_expiry_seconds(ns)
+                block = build()
+                expires_at = started + remaining if remaining is not None else None
+                self.query_cache.put(ns, user_input, limit, generation, block, mode, expires_at=expires_at)
+            return block
 
     # Background scheduler controls
     def start_background_scheduler(self, interval_hours: float = 6.0) -> None:
-        self.conscious.start_scheduler(self.config.namespace, interval_hours=interval_hours)
+        # Chat retention runs with promotion when a policy is configured
+        self.conscious.start_scheduler(self.config.namespace, interval_hours=interval_hours, retention=self.retention)
 
     def stop_background_scheduler(self) -> None:
         self.conscious.stop_scheduler()
@@ -170,15 +363,41 @@ class MemoryStore:
             counts["short_term"] = self.db.delete_stm(self.config.namespace)
         if memory_type in (None, "long_term"):
             counts["long_term"] = self.db.delete_ltm(self.config.namespace)
+            if self.semantic:
+                self.semantic.drop(self.config.namespace)
         return counts
 
-    def export_namespace(self, path: Optional[str] = None) -> Dict[str, Any]:
-        data = self.db.export_namespace(self.config.namespace)
-        if path:
-            from pathlib import Path
-            import json
+    def apply_chat_retention(self) -> int:
+        """Archive chats outside the configured retention policy to Parquet; returns rows moved."""
+        return sum(self.retention.run(self.config.namespace).values())
+
+    def export_namespace(self, path: Optional[str] = None, fmt: str = "ndjson") -> Dict[str, Any]:
+        """Without a path, return all rows in memory; with one, stream to `<path>/<table>.<fmt>` and return row counts."""
+        if not path:
+            return self.db.export_namespace(self.config.namespace)
+        return self.db.export_namespace_files(self.config.namespace, path, fmt=fmt)
+
+    def import_namespace(self, path: str, keep_namespace: bool = False) -> Dict[str, int]:
+        """Append an exported directory into this store's namespace (or the exported ones with keep_namespace)."""
+        ns = self.config.namespace
+        imported: set = set()
+        counts = self.db.import_namespace_files(path, namespace=None if keep_namespace else ns, ltm_namespaces=imported)
+        if counts.get("long_term_memory") and self.config.conscious_ingest and not self.config.read_only:
+            self.conscious.run_initial_promotion(ns)
+        if self.semantic:
+            for target in sorted(imported):
+                self.rebuild_vectors(namespace=target)
+        return counts
 
-            p = Path(path)
-            p.parent.mkdir(parents=True, exist_ok=True)
-            p.write_text(json.dumps(data, indent=2))
-        return data
+    def rebuild_vectors(self, chunk_size: int = 5000, namespace: Optional[str] = None) -> int:
+        """Recompute a namespace's semantic vectors (default: this store's) from long_term_memory."""
+        if self.semantic is None:
+            return 0
+        ns = namespace or self.config.namespace
+        self.semantic.drop(ns)
+        total = 0
+        for rows in self.db.iter_namespace_rows(ns, "long_term_memory", chunk_size=chunk_size):
+            vectors = self.semantic.vectorizer.transform_many([r["searchable_content"] for r in rows])
+            self.semantic.add(ns, [r["memory_id"] for r in rows], vectors)
+            total += len(rows)
+        return total
@@ -1,30 +1,130 @@
-from typing import Any, Dict, List
+import math
+import re
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+WORD = re.compile(r"\w+")
+WHITESPACE = re.compile(r"\s+")
+END_MARKER = "--- End Memories ---"
+
+
+def approx_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Cheap token estimate (~4 chars per token for English and code); no tokenizer dependency."""
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+def near_duplicate_key(summary: str) -> str:
+    """Lowercased words only: summaries differing in case, whitespace or punctuation collide."""
+    return " ".join(WORD.findall(summary.lower()))
 
 
 class ContextBuilder:
-    def __init__(self, max_chars: int = 2000, line_max: int = 240) -> None:
-        self.max_chars = max_chars
+    """Packs memory items into a bounded system block.
+
+    The budget is in approximate tokens. Each item costs its rendered line
+    plus a newline; header and end marker are reserved up front, so the block
+    is always well-formed. Items are chosen greedily by value per token (value
+    is rank_score when present, else importance_score), near-identical
+    summaries keep only their most valuable item, and the chosen lines are
+    emitted in input order. Cost is one render and one estimate per item.
+    """
+
+    def __init__(self, max_tokens: int = 500, line_max: int = 240, chars_per_token: float = 4.0) -> None:
+        self.max_tokens = max_tokens
         self.line_max = line_max
+        self.chars_per_token = chars_per_token
+
+    def _line(self, it: Dict[str, Any]) -> str:
+        cat = str(it.get("category_primary", "")).upper() or "CONTEXT"
+        summ = WHITESPACE.sub(" ", str(it.get("summary", ""))).strip()
+        created = str(it.get("created_at", ""))
+        imp = float(it.get("importance_score", 0.0))
+        line = f"- [{cat}] {summ} ({created}, importance={imp:.2f})"
+        if len(line) > self.line_max:
+            line = line[: self.line_max - 1] + "…"
+        return line
+
+    @staticmethod
+    def _value(it: Dict[str, Any]) -> float:
+        score = it.get("rank_score")
+        if score is None:
+            score = it.get("importance_score", 0.0)
+        return max(0.0, float(score or 0.0))
+
+    def select(self, items: List[Dict[str, Any]], budget: int, seen: Set[str]) -> Tuple[List[Tuple[int, str]], int]:
+        """Choose (input position, line) pairs within `budget` tokens; returns them in input order and the tokens used.
+
+        `seen` holds near-duplicate keys already emitted (and receives the chosen ones), so several
+        sections can share one dedup pass.
+        """
+        best: Dict[str, Tuple[float, int, str, int]] = {}
+        for pos, it in enumerate(items):
+            key = near_duplicate_key(str(it.get("summary", "")))
+            if key in seen:
+                continue
+            value = self._value(it)
+            if key in best and best[key][0] >= value:
+                continue
+            line = self._line(it)
+            best[key] = (value, pos, line, approx_tokens(line, self.chars_per_token) + 1)
+
+        # Greedy knapsack: highest value per token first; ties keep input order
+        candidates = sorted(best.items(), key=lambda kv: (-(kv[1][0] + 1e-9) / kv[1][3], kv[1][1]))
+        chosen: List[Tuple[int, str]] = []
+        chosen_keys: List[str] = []
+        chosen_value = 0.0
+        used = 0
+        for key, (value, pos, line, cost) in candidates:
+            if used + cost <= budget:
+                chosen.append((pos, line))
+                chosen_keys.append(key)
+                chosen_value += value
+                used += cost
+        # Density greedy can lose to one large valuable item that it skipped; take that item alone if better
+        top = max(((v, key, pos, line, cost) for key, (v, pos, line, cost) in best.items() if cost <= budget), default=None)
+        if top is not None and top[0] > chosen_value:
+            chosen, chosen_keys, used = [(top[2], top[3])], [top[1]], top[4]
+        seen.update(chosen_keys)
+        chosen.sort()
+        return chosen, used
 
     def build_system_block(self, items: List[Dict[str, Any]], header_label: str = "Relevant Memories", namespace: str = "") -> str:
         header_ns = f" (namespace={namespace})" if namespace else ""
-        lines = [f"--- {header_label}{header_ns} ---"]
-
-        for it in items:
-            cat = str(it.get("category_primary", "")).upper() or "CONTEXT"
-            summ = str(it.get("summary", "")).strip()
-            created = str(it.get("created_at", ""))
-            imp = float(it.get("importance_score", 0.0))
-            line = f"- [{cat}] {summ} ({created}, importance={imp:.2f})"
-            if len(line) > self.line_max:
-                line = line[: self.line_max - 1] + "…"
-            lines.append(line)
-
-            text = "\n".join(lines)
-            if len(text) >= self.max_chars:
-                break
-
-        lines.append("--- End Memories ---")
-        out = "\n".join(lines)
-        return out[: self.max_chars]
+        header = f"--- {header_label}{header_ns} ---"
+        reserved = approx_tokens(header, self.chars_per_token) + 1 + approx_tokens(END_MARKER, self.chars_per_token)
+        chosen, _ = self.select(items, self.max_tokens - reserved, set())
+        return "\n".join([header, *(line for _, line in chosen), END_MARKER])
+
+    def build_sections(
+        self,
+        sections: Sequence[Tuple[str, List[Dict[str, Any]], float]],
+        namespace: str = "",
+    ) -> str:
+        """One block from several (label, items, share) sections sharing the token budget.
 
+        Sections are packed in order: each gets up to `share` of the budget
+        plus whatever earlier sections left unused, and the last one takes
+        everything that remains. An item whose summary already appeared in an
+        earlier section is skipped. Sections with no chosen line are omitted
+        (the namespace goes on the first emitted header), and the block is ""
+        when nothing was chosen.
+        """
+        remaining = self.max_tokens - approx_tokens(END_MARKER, self.chars_per_token)
+        spare = 0
+        seen: Set[str] = set()
+        lines: List[str] = []
+        for i, (label, items, share) in enumerate(sections):
+            header_ns = f" (namespace={namespace})" if namespace and not lines else ""
+            header = f"--- {label}{header_ns} ---"
+            header_cost = approx_tokens(header, self.chars_per_token) + 1
+            allowance = remaining if i == len(sections) - 1 else min(remaining, int(self.max_tokens * share) + spare)
+            chosen, used = self.select(items, allowance - header_cost, seen)
+            if chosen:
+                lines.append(header)
+                lines.extend(line for _, line in chosen)
+                used += header_cost
+            spare = allowance - used
+            remaining -= used
+        if not lines:
+            return ""
+        lines.append(END_MARKER)
+        return "\n".join(lines)
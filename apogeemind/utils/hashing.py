@@ -0,0 +1,43 @@
+import hashlib
+import math
+from typing import Iterable
+
+
+def normalize_summary(summary: str) -> str:
+    return " ".join((summary or "").lower().split())
+
+
+def summary_hash(summary: str) -> str:
+    return hashlib.sha256(normalize_summary(summary).encode("utf-8")).hexdigest()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over hex digests (the digest bits are reused as hash functions)."""
+
+    def __init__(self, capacity: int = 1024, error_rate: float = 0.01) -> None:
+        self.capacity = max(1, capacity)
+        self.num_bits = max(64, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, min(8, round(self.num_bits / self.capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: str) -> Iterable[int]:
+        # 8 hex chars (32 bits) per probe; sha256 hex digests provide 8 independent probes
+        for i in range(self.num_hashes):
+            yield int(digest[i * 8 : i * 8 + 8], 16) % self.num_bits
+
+    def add(self, digest: str) -> None:
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, digest: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    @property
+    def saturated(self) -> bool:
+        return self.count > self.capacity
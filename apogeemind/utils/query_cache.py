@@ -0,0 +1,129 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+from .hashing import normalize_summary
+
+
+class QueryCache:
+    """Sidecar cache of rendered inject blocks, shared by all processes using one DuckDB file.
+
+    Stored in SQLite next to the database so short-lived read-only hook
+    processes can read and fill it without the DuckDB write lock. Entries are
+    keyed by (namespace, normalized query, limit, mode) and tagged with the
+    namespace's write generation; any write to the namespace bumps the
+    generation and thereby invalidates its entries. An entry may also carry
+    its own expiry (the next STM expiry when it was built, since expiry changes
+    results without a write). TTL bounds staleness from time-dependent ranking,
+    LRU bounds size. All errors degrade to a miss.
+    """
+
+    def __init__(self, path: str, max_entries: int = 256, ttl_seconds: float = 3600.0) -> None:
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._con: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._con is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_cache (
+                  cache_key TEXT PRIMARY KEY,
+                  namespace TEXT NOT NULL,
+                  generation INTEGER NOT NULL,
+                  block TEXT NOT NULL,
+                  created_at REAL NOT NULL,
+                  used_at REAL NOT NULL,
+                  expires_at REAL
+                )
+                """
+            )
+            if "expires_at" not in {row[1] for row in con.execute("PRAGMA table_info(query_cache)")}:
+                con.execute("ALTER TABLE query_cache ADD COLUMN expires_at REAL")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_qc_used ON query_cache(used_at)")
+            self._con = con
+        return self._con
+
+    @staticmethod
+    def key(namespace: str, query: str, limit: int, mode: str = "") -> str:
+        raw = f"{namespace}\x00{normalize_summary(query)}\x00{int(limit)}"
+        if mode:
+            raw += f"\x00{mode}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, namespace: str, query: str, limit: int, generation: int, mode: str = "") -> Optional[str]:
+        k = self.key(namespace, query, limit, mode)
+        now = time.time()
+        try:
+            con = self._connect()
+            row = con.execute(
+                "SELECT block, generation, created_at, expires_at FROM query_cache WHERE cache_key = ?", (k,)
+            ).fetchone()
+            if row is None:
+                return None
+            block, gen, created, expires = row
+            if gen != generation or now - created > self.ttl_seconds or (expires is not None and now >= expires):
+                return None
+            con.execute("UPDATE query_cache SET used_at = ? WHERE cache_key = ?", (now, k))
+            return block
+        except sqlite3.Error:
+            return None
+
+    def put(
+        self,
+        namespace: str,
+        query: str,
+        limit: int,
+        generation: int,
+        block: str,
+        mode: str = "",
+        expires_at: Optional[float] = None,
+    ) -> None:
+        """Store a block; `expires_at` (epoch seconds) makes it a miss from then on, in addition to the TTL."""
+        k = self.key(namespace, query, limit, mode)
+        now = time.time()
+        try:
+            con = self._connect()
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                con.execute(
+                    """
+                    INSERT OR REPLACE INTO query_cache(cache_key, namespace, generation, block, created_at, used_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (k, namespace, int(generation), block, now, now, expires_at),
+                )
+                # Entries from older generations can never hit again
+                con.execute("DELETE FROM query_cache WHERE namespace = ? AND generation <> ?", (namespace, int(generation)))
+                con.execute(
+                    """
+                    DELETE FROM query_cache WHERE cache_key IN (
+                      SELECT cache_key FROM query_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+                con.execute("COMMIT")
+            except sqlite3.Error:
+                con.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            pass
+
+    def clear(self) -> None:
+        try:
+            self._connect().execute("DELETE FROM query_cache")
+        except sqlite3.Error:
+            pass
+
+    def close(self) -> None:
+        if self._con is not None:
+            self._con.close()
+            self._con = None
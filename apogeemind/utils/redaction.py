@@ -1,25 +1,186 @@
+import json
 import re
-from typing import List, Pattern
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Pattern, Sequence, Tuple, Union
 
 
-DEFAULT_PATTERNS: List[Pattern[str]] = [
+@dataclass(frozen=True)
+class RedactionPattern:
+    name: str
+    pattern: str
+    # Literal substrings every match contains. A match must lie within the
+    # whitespace-delimited token holding a trigger and its neighbouring token
+    # on either side. Empty means the pattern is tried over the whole text.
+    triggers: Tuple[str, ...] = ()
+
+
+DEFAULT_PATTERNS: List[RedactionPattern] = [
     # API keys / tokens (generic-ish, conservative)
-    re.compile(r"\b(?:sk|tok|key)_[A-Za-z0-9_\-]{16,}\b"),
+    RedactionPattern("api_key", r"\b(?:sk|tok|key)_[A-Za-z0-9_\-]{16,}\b", ("sk_", "tok_", "key_")),
     # Bearer tokens
-    re.compile(r"Bearer\s+[A-Za-z0-9\-_.~+/=]{10,}"),
-    # Email addresses
-    re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
-    # Simple URL with basic auth
-    re.compile(r"https?://[^\s:@]+:[^\s@]+@[^\s]+"),
+    RedactionPattern("bearer", r"Bearer\s+[A-Za-z0-9\-_.~+/=]{10,}", ("Bearer",)),
+    # Simple URL with basic auth (before email, which would otherwise eat its "pass@host" part)
+    RedactionPattern("url_credentials", r"https?://[^\s:@]+:[^\s@]+@[^\s]+", ("://",)),
+    # Email addresses; the lookbehind only starts at the beginning of a run, keeping long runs linear
+    RedactionPattern("email", r"(?<![A-Za-z0-9._%+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", ("@",)),
 ]
 
+# A regex string, a compiled pattern, or {"pattern": ..., "triggers": [...]}
+PatternSpec = Union[str, Pattern[str], RedactionPattern, Mapping[str, object]]
 
-def redact(text: str, extra_patterns: List[Pattern[str]] | None = None, replacement: str = "[REDACTED]") -> str:
-    patterns = list(DEFAULT_PATTERNS)
-    if extra_patterns:
-        patterns.extend(extra_patterns)
-    out = text
-    for pat in patterns:
-        out = pat.sub(replacement, out)
-    return out
 
+_WHITESPACE = " \t\n\r\f\v"
+_TOKEN_REST_AND_NEXT = re.compile(r"(\S*)\s*\S*")
+
+
+class Redactor:
+    """Replaces secrets with a placeholder in one pass over the text.
+
+    All patterns are compiled once into a single alternation with one named
+    group per pattern; at a given position the first listed pattern wins.
+    When every pattern declares trigger literals, one scan for the triggers
+    (a literal alternation, which the regex engine skips through quickly)
+    finds the few windows that can hold a match, and the combined pattern
+    only runs there; text without any trigger is returned untouched.
+    `hits` counts matches per pattern name over the redactor's lifetime.
+
+    Patterns must not use backreferences or named groups of their own, since
+    they are renumbered inside the combined expression.
+    """
+
+    def __init__(self, patterns: Sequence[RedactionPattern], replacement: str = "[REDACTED]") -> None:
+        self.patterns = list(patterns)
+        self.replacement = replacement
+        self.hits: Counter = Counter()
+        self._groups: Dict[str, str] = {}
+        alternatives = []
+        for i, p in enumerate(self.patterns):
+            try:
+                re.compile(p.pattern)
+            except re.error as e:
+                raise ValueError(f"invalid redaction pattern {p.name!r}: {e}") from e
+            group = f"p{i}"
+            self._groups[group] = p.name
+            alternatives.append(f"(?P<{group}>{p.pattern})")
+        try:
+            self._regex: Optional[Pattern[str]] = re.compile("|".join(alternatives)) if alternatives else None
+        except re.error as e:
+            raise ValueError(f"redaction patterns cannot be combined: {e}") from e
+        # None: some pattern has no triggers, so every position has to be tried
+        triggers = sorted({t for p in self.patterns for t in p.triggers}, key=len, reverse=True)
+        self._finder: Optional[Pattern[str]] = (
+            re.compile("|".join(map(re.escape, triggers))) if self.patterns and all(p.triggers for p in self.patterns) else None
+        )
+
+    @classmethod
+    def from_config(
+        cls,
+        extra: Optional[Mapping[str, PatternSpec]] = None,
+        defaults: bool = True,
+        replacement: str = "[REDACTED]",
+    ) -> "Redactor":
+        patterns = list(DEFAULT_PATTERNS) if defaults else []
+        for name, spec in (extra or {}).items():
+            patterns.append(_as_pattern(name, spec))
+        return cls(patterns, replacement=replacement)
+
+    def _sub(self, m: "re.Match[str]") -> str:
+        self.hits[self._groups[m.lastgroup or ""]] += 1
+        return self.replacement
+
+    def _windows(self, text: str) -> Optional[List[Tuple[int, int]]]:
+        """Merged [start, end) spans covering each trigger's token and its neighbours.
+
+        None when triggers are so dense (> 1 per 64 chars) that a plain pass is cheaper.
+        """
+        assert self._finder is not None
+        spans: List[Tuple[int, int]] = []
+        budget = len(text) // 64 + 16
+        start, end, token_end = -1, -1, -1
+        for m in self._finder.finditer(text):
+            budget -= 1
+            if budget < 0:
+                return None
+            if m.start() < token_end:
+                continue  # same token as the previous trigger: same span
+            nxt = _TOKEN_REST_AND_NEXT.match(text, m.end())
+            assert nxt is not None
+            token_end, right = nxt.end(1), nxt.end()
+            if m.start() < end:
+                end = max(end, right)
+                continue
+            # Token start: just after the nearest whitespace; never search back past the current window
+            floor = max(end, 0)
+            left = max(text.rfind(c, floor, m.start()) for c in _WHITESPACE) + 1 or floor
+            j = left - 1
+            while j >= floor and text[j] in _WHITESPACE:
+                j -= 1
+            if j >= floor:
+                left = max(text.rfind(c, floor, j) for c in _WHITESPACE) + 1 or floor
+            if left <= end:
+                end = max(end, right)
+                continue
+            if end > 0:
+                spans.append((start, end))
+            start, end = left, right
+        if end > 0:
+            spans.append((start, end))
+        return spans
+
+    def redact(self, text: str) -> str:
+        if not text or self._regex is None:
+            return text
+        spans = self._windows(text) if self._finder is not None else None
+        if spans is None:
+            return self._regex.sub(self._sub, text)
+        out: List[str] = []
+        pos = 0
+        for start, end in spans:
+            # pos/endpos keep lookbehinds and \b seeing the real neighbours
+            for m in self._regex.finditer(text, start, end):
+                out.append(text[pos : m.start()])
+                out.append(self._sub(m))
+                pos = m.end()
+        if not out:
+            return text
+        out.append(text[pos:])
+        return "".join(out)
+
+
+_INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+
+
+def _as_pattern(name: str, spec: PatternSpec) -> RedactionPattern:
+    if isinstance(spec, RedactionPattern):
+        return spec
+    if isinstance(spec, re.Pattern):
+        # Keep the compiled flags as a scoped inline group inside the combined regex
+        flags = "".join(c for flag, c in _INLINE_FLAGS if spec.flags & flag)
+        return RedactionPattern(name, f"(?{flags}:{spec.pattern})" if flags else spec.pattern)
+    if isinstance(spec, Mapping):
+        triggers = spec.get("triggers") or ()
+        return RedactionPattern(name, str(spec["pattern"]), tuple(str(t) for t in triggers))  # type: ignore[union-attr]
+    return RedactionPattern(name, str(spec))
+
+
+def load_patterns_file(path: str) -> Dict[str, PatternSpec]:
+    """Read custom patterns from JSON: {"name": "regex"} or {"name": {"pattern": "regex", "triggers": ["lit"]}}."""
+    with open(path, "r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object of name -> pattern")
+    return data
+
+
+_default_redactor: Optional[Redactor] = None
+
+
+def redact(text: str, extra_patterns: List[Pattern[str]] | None = None, replacement: str = "[REDACTED]") -> str:
+    global _default_redactor
+    if extra_patterns or replacement != "[REDACTED]":
+        extra = {f"extra_{i}": p for i, p in enumerate(extra_patterns or [])}
+        return Redactor.from_config(extra, replacement=replacement).redact(text)
+    if _default_redactor is None:
+        _default_redactor = Redactor(DEFAULT_PATTERNS)
+    return _default_redactor.redact(text)
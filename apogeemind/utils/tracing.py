@@ -0,0 +1,200 @@
+import atexit
+import json
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def process_age_ms() -> Optional[float]:
+    """Milliseconds since this process started (Linux /proc), so interpreter start-up shows up in traces."""
+    try:
+        with open("/proc/self/stat", "rb") as fh:
+            # Field 22 (starttime, clock ticks since boot) follows the parenthesized command name
+            start_ticks = int(fh.read().rsplit(b")", 1)[1].split()[19])
+        with open("/proc/uptime", "rb") as fh:
+            uptime = float(fh.read().split()[0])
+        return max(0.0, (uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000.0)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def statement_label(sql: str, limit: int = 80) -> str:
+    return WHITESPACE.sub(" ", sql).strip()[:limit]
+
+
+class Stages:
+    """Accumulates time per stage over a loop and emits one event per stage on flush()."""
+
+    def __init__(self, tracer: "Tracer", prefix: str) -> None:
+        self.tracer = tracer
+        self.prefix = prefix
+        self.totals: Dict[str, int] = {}
+        self.counts: Dict[str, int] = {}
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.totals[stage] = self.totals.get(stage, 0) + time.perf_counter_ns() - start
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def flush(self, **attrs: Any) -> None:
+        for stage, ns in self.totals.items():
+            self.tracer.event(f"{self.prefix}.{stage}", ns / 1e6, count=self.counts[stage], **attrs)
+        self.totals.clear()
+        self.counts.clear()
+
+
+class _NullSpan:
+    def __enter__(self) -> Dict[str, Any]:
+        return {}
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+class _NullStages:
+    def time(self, stage: str) -> _NullSpan:
+        return _NULL_SPAN
+
+    def flush(self, **attrs: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_NULL_STAGES = _NullStages()
+
+
+class Tracer:
+    """Opt-in timing spans written as NDJSON lines to a size-rotated local file.
+
+    One line per event: {"ts", "pid", "name", "ms", ...attrs}. Events are
+    buffered and appended when the outermost span closes (and at exit), so a
+    traced hook pays one write per request. The file rotates to `.1` ..
+    `.<keep>` past `max_bytes`; several processes may append to it at once.
+    A disabled tracer hands out shared no-op objects.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 5 * 1024 * 1024, keep: int = 3) -> None:
+        self.path = path
+        self.enabled = path is not None
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self._buffer: List[str] = []
+        self._local = threading.local()  # span nesting depth per thread
+        if self.enabled:
+            atexit.register(self.flush)
+
+    def event(self, name: str, ms: float, **attrs: Any) -> None:
+        if not self.enabled:
+            return
+        rec = {"ts": round(time.time(), 3), "pid": os.getpid(), "name": name, "ms": round(ms, 4), **attrs}
+        self._buffer.append(json.dumps(rec, default=str))
+        if not getattr(self._local, "depth", 0) or len(self._buffer) >= 512:
+            self.flush()
+
+    @contextmanager
+    def _span(self, name: str, attrs: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        start = time.perf_counter_ns()
+        try:
+            yield attrs  # callers may add attributes (row counts, hits) before the span closes
+        finally:
+            self._local.depth -= 1
+            self.event(name, (time.perf_counter_ns() - start) / 1e6, **attrs)
+
+    def span(self, name: str, **attrs: Any) -> Any:
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, attrs)
+
+    def stages(self, prefix: str) -> Any:
+        return Stages(self, prefix) if self.enabled else _NULL_STAGES
+
+    def flush(self) -> None:
+        if not self._buffer or self.path is None:
+            return
+        lines, self._buffer = self._buffer, []
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        try:
+            self._rotate_if_needed()
+            # O_APPEND: concurrent writers never interleave within one write
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass  # tracing never fails the traced operation
+
+    def _rotate_if_needed(self) -> None:
+        assert self.path is not None
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except OSError:
+            return
+        for i in range(self.keep - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def trace_files(path: str) -> List[Path]:
+    base = Path(path)
+    return [p for p in [base, *sorted(base.parent.glob(base.name + ".*"))] if p.exists()]
+
+
+def summarize_trace(path: str, since_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Per-event-name count/p50/p95/max (ms) over the trace file and its rotations, slowest p95 first."""
+    cutoff = time.time() - since_seconds if since_seconds else None
+    by_name: Dict[str, List[float]] = {}
+    for file in trace_files(path):
+        with open(file, "r", encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # a partial line from a crashed writer
+                if cutoff is not None and rec.get("ts", 0) < cutoff:
+                    continue
+                by_name.setdefault(str(rec.get("name")), []).append(float(rec.get("ms", 0.0)))
+
+    def pct(values: List[float], p: float) -> float:
+        return values[min(len(values) - 1, max(0, math.ceil(p * len(values)) - 1))]
+
+    out = []
+    for name, values in by_name.items():
+        values.sort()
+        out.append({"name": name, "count": len(values), "p50_ms": pct(values, 0.5), "p95_ms": pct(values, 0.95), "max_ms": values[-1]})
+    out.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return out
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """The process-wide tracer, configured once from APOGEEMIND_TRACE / _TRACE_FILE / _TRACE_MAX_BYTES."""
+    global _tracer
+    if _tracer is None:
+        from ..config import Config
+
+        cfg = Config.from_env()
+        path = (cfg.trace_file or f"{cfg.db_path}.trace.ndjson") if cfg.trace else None
+        _tracer = Tracer(path, max_bytes=cfg.trace_max_bytes)
+        if path is not None:
+            age = process_age_ms()
+            if age is not None:
+                _tracer.event("process.startup", age)
+    return _tracer
@@ -0,0 +1,137 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+Exchange = Tuple[str, str]
+
+
+def message_text(entry: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    """Return (role, text) for a transcript entry; text joins the message's text blocks."""
+    msg = entry.get("message")
+    if not isinstance(msg, dict) or entry.get("isMeta"):
+        return None, ""
+    role = msg.get("role") or entry.get("type")
+    content = msg.get("content")
+    if isinstance(content, str):
+        return role, content.strip()
+    parts: List[str] = []
+    if isinstance(content, list):
+        for block in content:
+            if isinstance(block, dict) and block.get("type") == "text" and block.get("text"):
+                parts.append(str(block["text"]))
+    return role, "\n".join(parts).strip()
+
+
+def parse_exchanges(fh: BinaryIO, start: int = 0) -> Tuple[List[Exchange], int]:
+    """Stream-parse NDJSON from `start` into (user, assistant) exchanges.
+
+    Returns the exchanges and the offset to resume from next time: a trailing
+    partial line, or a final user prompt that has no answer yet, is left unread.
+    Tool results (user entries without text) are skipped.
+    """
+    fh.seek(start)
+    pos = start
+    exchanges: List[Exchange] = []
+    user: Optional[str] = None
+    user_pos = start
+    ai: List[str] = []
+
+    for line in fh:
+        line_start = pos
+        if not line.endswith(b"\n"):
+            break
+        pos += len(line)
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(entry, dict):
+            continue
+        role, text = message_text(entry)
+        if not text:
+            continue
+        if role == "user":
+            if user is not None or ai:
+                exchanges.append((user or "", "\n".join(ai)))
+            user, user_pos, ai = text, line_start, []
+        elif role == "assistant":
+            ai.append(text)
+
+    if ai:
+        exchanges.append((user or "", "\n".join(ai)))
+        return exchanges, pos
+    if user is not None:
+        return exchanges, user_pos
+    return exchanges, pos
+
+
+def read_last_user_text(path: str, block_size: int = 65536) -> str:
+    """Return the most recent user prompt, reading backwards from the end of the file."""
+    with open(path, "rb") as fh:
+        fh.seek(0, os.SEEK_END)
+        end = fh.tell()
+        tail = b""
+        while end > 0:
+            start = max(0, end - block_size)
+            fh.seek(start)
+            tail = fh.read(end - start) + tail
+            end = start
+            lines = tail.split(b"\n")
+            # The first piece may be a partial line unless we reached the file start
+            complete = lines if start == 0 else lines[1:]
+            for line in reversed(complete):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                role, text = message_text(entry) if isinstance(entry, dict) else (None, "")
+                if role == "user" and text:
+                    return text
+            tail = lines[0] if start > 0 else b""
+    return ""
+
+
+class TranscriptTailer:
+    """Tracks the last processed byte offset per transcript in a small JSON state file."""
+
+    def __init__(self, state_path: str) -> None:
+        self.state_path = state_path
+
+    def _load(self) -> Dict[str, int]:
+        try:
+            data = json.loads(Path(self.state_path).read_text() or "{}")
+            return {str(k): int(v) for k, v in data.items()}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, offsets: Dict[str, int]) -> None:
+        tmp = f"{self.state_path}.tmp"
+        Path(tmp).write_text(json.dumps(offsets, sort_keys=True))
+        os.replace(tmp, self.state_path)
+
+    @contextmanager
+    def pending(self, transcript_path: str) -> Iterator[List[Exchange]]:
+        """Yield exchanges added since the last run; the offset advances only if the block succeeds.
+
+        An exclusive lock on the state file keeps concurrent hook runs from
+        recording the same exchanges twice.
+        """
+        Path(self.state_path).parent.mkdir(parents=True, exist_ok=True)
+        key = str(Path(transcript_path).resolve())
+        with open(f"{self.state_path}.lock", "w") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            offsets = self._load()
+            start = offsets.get(key, 0)
+            with open(transcript_path, "rb") as fh:
+                if start > os.fstat(fh.fileno()).st_size:
+                    start = 0  # truncated or replaced
+                exchanges, resume = parse_exchanges(fh, start)
+            yield exchanges
+            if resume != offsets.get(key):
+                offsets[key] = resume
+                self._save(offsets)
@@ -8,17 +8,13 @@ current_prompt=$(echo "$stdin_json" | jq -r '.prompt // empty' 2>/dev/null || tr
 
 query="${current_prompt:-}"
 
-if [[ -z "$query" && -n "${transcript_path:-}" && -f "$transcript_path" ]]; then
-  # Try to extract the last user text line from the transcript (NDJSON-like)
-  last_user_line=$(grep '"role":"user"' "$transcript_path" | tail -n 1 || true)
-  if [[ -n "$last_user_line" ]]; then
-    query=$(jq -r '.message.content[0].text // empty' <<< "$last_user_line" 2>/dev/null || true)
-  fi
-fi
-
-query=${query:-}
+# Without a prompt, the injector reads the last user prompt from the end of the transcript
+args=(--query "$query")
 if [[ -z "$query" ]]; then
-  exit 0
+  if [[ -z "${transcript_path:-}" || ! -f "$transcript_path" ]]; then
+    exit 0
+  fi
+  args+=(--transcript "$transcript_path")
 fi
 
 # Determine paths
@@ -32,5 +28,5 @@ if [[ -z "${APOGEEMIND_NAMESPACE:-}" ]]; then
 fi
 
 # Call the Python injector from the .claude repo
-python3 "$CLAUDE_REPO_ROOT/scripts/apogeemind_inject.py" --query "$query"
+python3 "$CLAUDE_REPO_ROOT/scripts/apogeemind_inject.py" "${args[@]}"
 exit 0
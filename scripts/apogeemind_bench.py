@@ -1,110 +1,474 @@
 #!/usr/bin/env python3
+"""Benchmark harness for apogeemind.
+
+Each corpus size gets a fresh temporary DB populated with synthetic
+exchanges (log-normal text lengths, Zipfian vocabulary, occasional
+preferences, file paths and multi-paragraph answers). Every operation is
+warmed up, then timed per iteration with perf_counter_ns (GC disabled
+while timing). Percentiles come with distribution-free confidence
+intervals, so two JSON results can be compared to flag regressions
+(`--compare old.json`).
+"""
 import argparse
+import gc
+import importlib.util
+import json
+import math
 import os
+import platform
 import random
+import statistics
 import string
+import subprocess
+import sys
+import tempfile
 import time
-from dataclasses import asdict
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Ensure repo root (parent of scripts/) is importable
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+# duckdb probes `import pandas` for every bound parameter and Python does not cache a
+# failed import (~0.1ms each), which would dominate the statement timings; when pandas
+# is absent, record the miss once. Kept to this script: it changes import state process-wide.
+if "pandas" not in sys.modules and importlib.util.find_spec("pandas") is None:
+    sys.modules["pandas"] = None  # type: ignore[assignment]
 
 from apogeemind.store.memory_store import MemoryStore, MemoryStoreConfig
 
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+PERCENTILES = (0.50, 0.95, 0.99)
+NAMESPACE = "bench"
+
+TECH = ["python", "pytest", "fastapi", "duckdb", "docker", "redis", "postgres", "typescript", "react", "ruff", "mypy", "poetry"]
+PREFERENCES = [
+    "I prefer {a} over {b} for this project.",
+    "Please always run {a} before committing.",
+    "Never use {a} in the {b} module.",
+    "We use {a} with {b} for the service.",
+]
+
 
 def rand_text(prefix: str, n: int = 12) -> str:
     return f"{prefix}-" + "".join(random.choices(string.ascii_lowercase, k=n))
 
 
-def bench_record(store: MemoryStore, n: int) -> Dict[str, Any]:
-    start = time.time()
-    for i in range(n):
-        if i % 4 == 0:
-            user = "I prefer using ruff and black for Python."
-            ai = "Acknowledged. Will use ruff + black."
-        elif i % 4 == 1:
-            user = "We use FastAPI for the service and test with pytest."
-            ai = f"Create app/{rand_text('main', 6)}.py and add routers."
-        elif i % 4 == 2:
-            user = f"Implement feature {rand_text('FEAT', 4)} and link issue #{random.randint(10,999)}"
-            ai = "Added endpoints and basic tests."
-        else:
-            user = f"General refactor in {rand_text('module', 5)}.py"
-            ai = "Completed cleanup and renamed functions."
-        store.record_conversation(user, ai, model="bench")
-    dur = time.time() - start
-    return {"count": n, "seconds": dur, "ops_per_sec": n / dur if dur > 0 else None}
-
-
-def bench_promotion(store: MemoryStore) -> Dict[str, Any]:
-    start = time.time()
-    promoted = store.conscious.run_initial_promotion(store.config.namespace)
-    dur = time.time() - start
-    return {"promoted": promoted, "seconds": dur}
-
-
-def bench_retrieval(store: MemoryStore, query: str, n: int) -> Dict[str, Any]:
-    latencies = []
-    for _ in range(n):
-        s = time.time()
-        _ = store.retrieve_context(query, limit=5)
-        latencies.append(time.time() - s)
-    return {
-        "count": n,
-        "avg_ms": (sum(latencies) / n) * 1000.0 if n else 0.0,
-        "p95_ms": sorted(latencies)[int(0.95 * max(0, n - 1))] * 1000.0 if n else 0.0,
-        "max_ms": max(latencies) * 1000.0 if n else 0.0,
-    }
+class Corpus:
+    """Deterministic synthetic exchanges; the same seed yields the same corpus."""
 
+    def __init__(self, seed: int = 0, vocab_size: int = 20_000) -> None:
+        rng = random.Random(seed)
+        self.seed = seed
+        words = {"".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(vocab_size)}
+        self.vocab = sorted(words)
+        rng.shuffle(self.vocab)
+        self.vocab[10:10] = TECH  # frequent, but not the most frequent
+        # Zipf (s=1.1) rank weights as cumulative weights for fast sampling
+        total = 0.0
+        self.cum_weights: List[float] = []
+        for rank in range(len(self.vocab)):
+            total += 1.0 / (rank + 1) ** 1.1
+            self.cum_weights.append(total)
 
-def main() -> int:
-    ap = argparse.ArgumentParser(description="Benchmark apogeemind operations")
-    ap.add_argument("--db-path", default=str(Path.cwd() / "apogeemind" / "apogeemind.duckdb"))
-    ap.add_argument("--namespace", default="bench")
-    ap.add_argument("--chats", type=int, default=200)
-    ap.add_argument("--retrievals", type=int, default=50)
-    ap.add_argument("--query", default="pytest")
-    ap.add_argument("--fts", choices=["auto", "on", "off"], default="auto")
-    ap.add_argument("--conscious", action="store_true", default=True)
-    ap.add_argument("--no-conscious", dest="conscious", action="store_false")
-    ap.add_argument("--auto", action="store_true", default=True)
-    ap.add_argument("--no-auto", dest="auto", action="store_false")
-    args = ap.parse_args()
+    def _words(self, rng: random.Random, chars: int) -> str:
+        words = rng.choices(self.vocab, cum_weights=self.cum_weights, k=max(1, chars // 6))
+        return " ".join(words)
+
+    def _prose(self, rng: random.Random, chars: int) -> str:
+        paragraphs: List[str] = []
+        while chars > 0:
+            size = min(chars, int(rng.lognormvariate(math.log(350), 0.6)))
+            text = self._words(rng, size)
+            if rng.random() < 0.3:
+                text += f" Edit src/{rng.choice(self.vocab[:500])}/{rng.choice(self.vocab[:2000])}.py next."
+            paragraphs.append(text[:1].upper() + text[1:] + ".")
+            chars -= size
+        return "\n\n".join(paragraphs)
+
+    def exchange(self, rng: random.Random) -> Tuple[str, str]:
+        # Log-normal lengths: short prompts (median ~90 chars), answers with a long tail (median ~600, p99 ~8k)
+        user = self._words(rng, min(4_000, int(rng.lognormvariate(math.log(90), 0.8))))
+        if rng.random() < 0.1:
+            a, b = rng.sample(TECH, 2)
+            user = rng.choice(PREFERENCES).format(a=a, b=b) + " " + user
+        ai = self._prose(rng, min(30_000, int(rng.lognormvariate(math.log(600), 1.1))))
+        if rng.random() < 0.15:
+            ai += f"\n\n```python\ndef {rng.choice(self.vocab[:300])}():\n    return {rng.randint(0, 99)}\n```"
+        return user, ai
+
+    def batches(self, n: int, batch: int, stream: int = 0) -> Iterator[List[Tuple[str, str]]]:
+        rng = random.Random(f"{self.seed}:{stream}")
+        for start in range(0, n, batch):
+            yield [self.exchange(rng) for _ in range(min(batch, n - start))]
+
+    def queries(self, k: int, stream: int = 1) -> List[str]:
+        """One- and two-term queries over mid-frequency words, so most match without matching everything."""
+        rng = random.Random(f"{self.seed}:q{stream}")
+        pool = self.vocab[20:3000]
+        return [" ".join(rng.sample(pool, 1 if rng.random() < 0.7 else 2)) for _ in range(k)]
+
+
+# Statistics
+def percentile(ordered: Sequence[float], p: float) -> float:
+    """Linear interpolation between closest ranks (numpy's default)."""
+    pos = p * (len(ordered) - 1)
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def percentile_ci(ordered: Sequence[float], p: float, z: float = 1.96) -> Tuple[Optional[float], Optional[float]]:
+    """Distribution-free CI for a quantile from order statistics (normal approximation to the binomial).
 
-    cfg = MemoryStoreConfig(
-        db_path=args.db_path,
-        namespace=args.namespace,
-        conscious_ingest=args.conscious,
-        auto_ingest=args.auto,
+    A bound is None when the sample is too small to place it (e.g. p99 from 50 samples).
+    """
+    n = len(ordered)
+    half = z * math.sqrt(n * p * (1 - p))
+    # 1-based ranks floor(np - half) and ceil(np + half) + 1, as 0-based indexes
+    lo = math.floor(n * p - half) - 1
+    hi = math.ceil(n * p + half)
+    return (ordered[lo] if 0 <= lo < n else None, ordered[hi] if 0 <= hi < n else None)
+
+
+def summarize(samples_ns: Sequence[int], ops_per_sample: int = 1) -> Dict[str, Any]:
+    ms = sorted(s / 1e6 for s in samples_ns)
+    out: Dict[str, Any] = {"n": len(ms), "unit": "ms"}
+    if not ms:
+        return out
+    for p in PERCENTILES:
+        name = f"p{int(p * 100)}"
+        out[name] = percentile(ms, p)
+        out[f"{name}_ci95"] = list(percentile_ci(ms, p))
+    out["mean"] = statistics.fmean(ms)
+    out["stdev"] = statistics.stdev(ms) if len(ms) > 1 else 0.0
+    out["min"], out["max"] = ms[0], ms[-1]
+    if ops_per_sample > 1:
+        out["ops_per_sample"] = ops_per_sample
+        out["ops_per_sec"] = ops_per_sample * 1000.0 / out["p50"] if out["p50"] > 0 else None
+    return out
+
+
+def measure(
+    fn: Callable[[int], Any],
+    iterations: int,
+    warmup: int,
+    setup: Optional[Callable[[int], Any]] = None,
+) -> List[int]:
+    """Per-iteration wall time of fn(i) in ns; setup(i) runs untimed before each call."""
+    for i in range(warmup):
+        if setup:
+            setup(-1 - i)
+        fn(-1 - i)
+    samples: List[int] = []
+    gc.collect()
+    gc.disable()
+    try:
+        for i in range(iterations):
+            if setup:
+                setup(i)
+            start = time.perf_counter_ns()
+            fn(i)
+            samples.append(time.perf_counter_ns() - start)
+    finally:
+        gc.enable()
+    return samples
+
+
+# Scenarios
+def make_store(db_path: str) -> MemoryStore:
+    return MemoryStore(MemoryStoreConfig(db_path=db_path, namespace=NAMESPACE, conscious_ingest=True, auto_ingest=True))
+
+
+def populate(store: MemoryStore, corpus: Corpus, n: int, batch: int = 1000) -> Dict[str, Any]:
+    start = time.perf_counter_ns()
+    for exchanges in corpus.batches(n, batch):
+        store.record_conversations_bulk(exchanges, model="bench")
+    seconds = (time.perf_counter_ns() - start) / 1e9
+    counts = store.db.namespace_counts(NAMESPACE)
+    return {"exchanges": n, "seconds": seconds, "exchanges_per_sec": n / seconds if seconds > 0 else None, **counts}
+
+
+def spawn_env(db_path: str, tmp: str, daemon: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        APOGEEMIND_DUCKDB_PATH=db_path,
+        APOGEEMIND_NAMESPACE=NAMESPACE,
+        APOGEEMIND_QUERY_CACHE="0",  # measure retrieval, not the sidecar
+        APOGEEMIND_DAEMON="1" if daemon else "0",
+        APOGEEMIND_DAEMON_SOCKET=str(Path(tmp) / "daemon.sock"),
     )
-    store = MemoryStore(cfg)
+    return env
+
+
+def bench_inject_spawn(db_path: str, tmp: str, queries: List[str], iterations: int, warmup: int, daemon: bool) -> List[int]:
+    """The hook path: a fresh interpreter running scripts/apogeemind_inject.py per prompt."""
+    env = spawn_env(db_path, tmp, daemon)
+    script = str(SCRIPT_DIR / "apogeemind_inject.py")
+
+    def run(i: int) -> None:
+        subprocess.run([sys.executable, script, "--query", queries[i % len(queries)]], env=env, check=True, stdout=subprocess.DEVNULL)
+
+    try:
+        return measure(run, iterations, warmup)
+    finally:
+        if daemon:
+            from apogeemind.daemon.client import DaemonClient, DaemonError
+
+            try:
+                DaemonClient(env["APOGEEMIND_DAEMON_SOCKET"], spawn=False).shutdown()
+            except DaemonError:
+                pass
+
+
+def bench_size(label: str, n: int, args: argparse.Namespace) -> Dict[str, Any]:
+    corpus = Corpus(seed=args.seed)
+    queries = corpus.queries(max(args.iterations, 64))
+    it, warm = args.iterations, args.warmup
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix=f"apogeemind-bench-{label}-") as tmp:
+        db_path = str(Path(tmp) / "bench.duckdb")
+        store = make_store(db_path)
+        print(f"[{label}] populating {n} exchanges...", file=sys.stderr)
+        results["populate"] = populate(store, corpus, n)
+        store.db.refresh_fts_indexes(force=True)
+        ns = store.config.namespace
 
-    # Control FTS path if requested
-    if args.fts == "on":
+        # Reads first: later writes mark the FTS index dirty
         store.db.fts_enabled = True
-    elif args.fts == "off":
+        results["retrieval_fts"] = summarize(measure(lambda i: store.retrieve_context(queries[i % len(queries)]), it, warm))
+        results["retrieval_fts"]["backend"] = store.db.search_backend
         store.db.fts_enabled = False
+        results["retrieval_like"] = summarize(measure(lambda i: store.retrieve_context(queries[i % len(queries)]), it, warm))
+        store.db.fts_enabled = True
+
+        cache, store.query_cache = store.query_cache, None
+        results["inject"] = summarize(measure(lambda i: store.get_combined_system_prompt(queries[i % len(queries)]), it, warm))
+        store.query_cache = cache
+        if cache is not None:
+            # Same query every time: warmup fills the entry, every timed call hits it
+            results["inject_cached"] = summarize(measure(lambda i: store.get_combined_system_prompt(queries[0]), it, warm))
+
+        # Full pass: forget the watermark so every eligible LTM row is reconsidered
+        reset = lambda i: store.db._set_meta(f"promotion_watermark:{ns}", None)  # noqa: E731
+        results["promotion"] = summarize(measure(lambda i: store.conscious.run_initial_promotion(ns), args.slow_iterations, 1, setup=reset))
+
+        known = next(corpus.batches(it + warm, it + warm))
+        results["dedup"] = summarize(measure(lambda i: store.record_conversation(*known[i]), it, warm))
+
+        fresh = iter(next(corpus.batches(it + warm, it + warm, stream=2)))
+        results["record"] = summarize(measure(lambda i: store.record_conversation(*next(fresh), model="bench"), it, warm))
+
+        batches = corpus.batches((args.slow_iterations + 1) * args.bulk_batch, args.bulk_batch, stream=3)
+        results["record_bulk"] = summarize(
+            measure(lambda i: store.record_conversations_bulk(next(batches), model="bench"), args.slow_iterations, 1),
+            ops_per_sample=args.bulk_batch,
+        )
+
+        out_dirs = iter(range(args.slow_iterations + 1))
+        results["export"] = summarize(
+            measure(lambda i: store.export_namespace(str(Path(tmp) / f"export{next(out_dirs)}"), fmt="parquet"), args.slow_iterations, 1)
+        )
+
+        # The hook processes need the DB lock
+        store.db.close()
+        if args.spawn_iterations > 0:
+            results["inject_spawn"] = summarize(bench_inject_spawn(db_path, tmp, queries, args.spawn_iterations, 2, daemon=False))
+            results["inject_spawn_daemon"] = summarize(bench_inject_spawn(db_path, tmp, queries, args.spawn_iterations, 2, daemon=True))
+    return results
+
+
+# Regression check
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[str]:
+    """p50 regressions: slower by more than `threshold` with non-overlapping 95% CIs."""
+    found: List[str] = []
+    for size, ops in new.get("results", {}).items():
+        for op, cur in ops.items():
+            prev = old.get("results", {}).get(size, {}).get(op)
+            if not prev or "p50" not in cur or "p50" not in prev:
+                continue
+            cur_lo = cur["p50_ci95"][0]
+            prev_hi = prev["p50_ci95"][1]
+            if cur["p50"] > prev["p50"] * (1 + threshold) and cur_lo is not None and prev_hi is not None and cur_lo > prev_hi:
+                found.append(f"{size}/{op}: p50 {prev['p50']:.3f}ms -> {cur['p50']:.3f}ms ({cur['p50'] / prev['p50']:.2f}x)")
+    return found
+
+
+def git_commit() -> Optional[str]:
+    try:
+        res = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+        return res.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_ann(rows: int, queries: int, k: int, nprobe: int, dim: int = 256) -> Dict[str, Any]:
+    """IVF vs exact top-k over hashed n-gram vectors of synthetic Zipfian texts (numpy required)."""
+    from apogeemind.processing.vectors import HashedNgramVectorizer
+    from apogeemind.retrieval.vector_store import IVFIndex, VectorStore
+
+    vocab = [rand_text("w", random.randint(2, 8)) for _ in range(5000)]
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]
+    vec = HashedNgramVectorizer(dim=dim)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(tmp, dim=dim)
+        ivf = IVFIndex(store, nprobe=nprobe)
+        start = time.perf_counter()
+        texts: List[str] = []
+        for i in range(0, rows, 10000):
+            chunk = [" ".join(random.choices(vocab, weights=weights, k=random.randint(5, 25))) for _ in range(min(10000, rows - i))]
+            store.add("ann", [f"m{i + j}" for j in range(len(chunk))], vec.transform_many(chunk))
+            texts.extend(chunk[:1])
+        vectors_s = time.perf_counter() - start
+        start = time.perf_counter()
+        nlist = ivf.train("ann")
+        train_s = time.perf_counter() - start
+
+        probes = [vec.transform(" ".join(random.choice(texts).split()[:4])) for _ in range(queries)]
+        ivf.search("ann", probes[0], k)  # warm caches / page in
+        store.search("ann", probes[0], k)
+        ann_ns: List[int] = []
+        exact_ns: List[int] = []
+        recall = 0.0
+        for q in probes:
+            s = time.perf_counter_ns()
+            approx = ivf.search("ann", q, k)
+            ann_ns.append(time.perf_counter_ns() - s)
+            s = time.perf_counter_ns()
+            exact = store.search("ann", q, k)
+            exact_ns.append(time.perf_counter_ns() - s)
+            recall += len({m for m, _ in approx} & {m for m, _ in exact}) / max(1, len(exact))
+
+    return {
+        "rows": rows,
+        "nlist": nlist,
+        "nprobe": nprobe,
+        "vectorize_seconds": vectors_s,
+        "train_seconds": train_s,
+        f"recall_at_{k}": recall / queries,
+        "ann": summarize(ann_ns),
+        "exact": summarize(exact_ns),
+    }
+
+
+def _redact_sequential(text: str, patterns: List[Any], replacement: str = "[REDACTED]") -> str:
+    """The previous implementation: one full regex pass per pattern."""
+    for pat in patterns:
+        text = pat.sub(replacement, text)
+    return text
+
+
+def bench_redaction(megabytes: float, repeats: int = 5) -> Dict[str, Any]:
+    import re
+
+    from apogeemind.utils.redaction import DEFAULT_PATTERNS, Redactor
+
+    legacy = [re.compile(p.pattern) for p in DEFAULT_PATTERNS]
+    size = int(megabytes * 1024 * 1024)
+    words = ["refactor", "module", "pytest", "fixture", "the", "and", "service", "def", "return", "config.py"]
+    prose = " ".join(random.choices(words, k=size // 6))[:size]
+    secrets = ["sk_" + rand_text("live", 24), "Bearer " + rand_text("tok", 20), "dev@example.com", "https://u:pw@db.local/x"]
+    # One secret roughly every 4KB
+    chunks = [prose[i : i + 4096] for i in range(0, len(prose), 4096)]
+    mixed = " ".join(c + " " + secrets[i % len(secrets)] for i, c in enumerate(chunks))
+
+    out: Dict[str, Any] = {"megabytes": megabytes}
+    redactor = Redactor(DEFAULT_PATTERNS)
+    for label, text in (("clean", prose), ("secrets", mixed)):
+        timings = {}
+        for name, fn in (("sequential", lambda t: _redact_sequential(t, legacy)), ("single_pass", redactor.redact)):
+            best = float("inf")
+            for _ in range(repeats):
+                s = time.perf_counter()
+                fn(text)
+                best = min(best, time.perf_counter() - s)
+            timings[name] = best
+        out[f"{label}_sequential_ms"] = timings["sequential"] * 1000.0
+        out[f"{label}_single_pass_ms"] = timings["single_pass"] * 1000.0
+        out[f"{label}_speedup"] = timings["sequential"] / timings["single_pass"] if timings["single_pass"] > 0 else None
+    out["hits"] = dict(redactor.hits)
+    return out
 
-    print("== Record benchmark ==")
-    rec = bench_record(store, args.chats)
-    print(rec)
 
-    print("\n== Promotion benchmark ==")
-    prom = bench_promotion(store)
-    print(prom)
+def print_table(results: Dict[str, Any]) -> None:
+    for size, ops in results.items():
+        pop = ops.get("populate", {})
+        print(f"== {size}: {pop.get('exchanges')} exchanges, ltm={pop.get('ltm')}, populate {pop.get('exchanges_per_sec') or 0:.0f}/s ==")
+        for op, s in ops.items():
+            if "p50" not in s:
+                continue
+            ci = s["p50_ci95"]
+            ci_txt = f"[{ci[0]:.3f}, {ci[1]:.3f}]" if None not in ci else "[n/a]"
+            extra = f"  {s['ops_per_sec']:.0f} ops/s" if s.get("ops_per_sec") else ""
+            print(f"  {op:<20} n={s['n']:<4} p50={s['p50']:9.3f}ms {ci_txt:<22} p95={s['p95']:9.3f}ms p99={s['p99']:9.3f}ms{extra}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark apogeemind operations on fresh synthetic corpora")
+    ap.add_argument("--sizes", default="1k,10k", help=f"Comma-separated corpus sizes from {', '.join(SIZES)} (default: 1k,10k)")
+    ap.add_argument("--iterations", type=int, default=200, help="Timed iterations for fast operations")
+    ap.add_argument("--warmup", type=int, default=20)
+    ap.add_argument("--slow-iterations", type=int, default=20, help="Timed iterations for promotion, bulk record and export")
+    ap.add_argument("--spawn-iterations", type=int, default=20, help="Hook process spawns per inject mode; 0 skips")
+    ap.add_argument("--bulk-batch", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="Write JSON results here")
+    ap.add_argument("--compare", default=None, help="Earlier JSON results; report p50 regressions")
+    ap.add_argument("--threshold", type=float, default=0.05, help="Minimum relative p50 slowdown reported by --compare")
+    ap.add_argument("--ann-rows", type=int, default=0, help="Also benchmark the semantic IVF index (recall/latency) over this many vectors")
+    ap.add_argument("--ann-queries", type=int, default=200)
+    ap.add_argument("--ann-nprobe", type=int, default=48)
+    ap.add_argument("--redact-mb", type=float, default=0, help="Also microbenchmark redaction (sequential vs single pass) on inputs of this size")
+    args = ap.parse_args()
+
+    sizes = [s.strip().lower() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        ap.error(f"unknown sizes: {', '.join(unknown)}")
+    random.seed(args.seed)
+
+    import duckdb
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "duckdb": duckdb.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": {},
+    }
+    for size in sizes:
+        report["results"][size] = bench_size(size, SIZES[size], args)
+    print_table(report["results"])
 
-    print("\n== Retrieval benchmark ==")
-    ret = bench_retrieval(store, args.query, args.retrievals)
-    print(ret)
+    micro: Dict[str, Any] = {}
+    if args.ann_rows > 0:
+        micro["ann"] = bench_ann(args.ann_rows, args.ann_queries, 10, args.ann_nprobe)
+        print(f"\n== Semantic ANN ==\n{micro['ann']}")
+    if args.redact_mb > 0:
+        micro["redaction"] = bench_redaction(args.redact_mb)
+        print(f"\n== Redaction ==\n{micro['redaction']}")
+    if micro:
+        report["micro"] = micro
 
-    # Suggestions
-    print("\n== Suggestions ==")
-    if rec["ops_per_sec"] and rec["ops_per_sec"] < 50:
-        print("- Recording is < 50 ops/sec; consider disabling redaction patterns that you don't need or reduce text size.")
-    if ret["avg_ms"] > 50:
-        print("- Retrieval avg > 50ms; enable FTS (--fts on) if not already, or reduce STM size / query limit.")
-    if prom["seconds"] > 0.5:
-        print("- Promotion took > 0.5s; run it in the background scheduler and keep STM capacity modest (<=20).")
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2, default=str) + "\n", encoding="utf-8")
+        print(f"\nresults: {args.out}")
 
+    if args.compare:
+        regressions = compare(json.loads(Path(args.compare).read_text(encoding="utf-8")), report, args.threshold)
+        print(f"\n== Regressions vs {args.compare} ==")
+        for line in regressions or ["none"]:
+            print(f"- {line}")
+        if regressions:
+            return 1
     return 0
 
 
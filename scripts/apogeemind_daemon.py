@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+from pathlib import Path
+
+# Ensure repo root (parent of scripts/) is importable
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from apogeemind.config import Config
+from apogeemind.daemon.client import DaemonClient, DaemonError
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Manage the resident apogeemind daemon")
+    ap.add_argument("action", choices=["start", "serve", "status", "stop"])
+    ap.add_argument("--socket", default=None, help="Unix socket path (default: APOGEEMIND_DAEMON_SOCKET or runtime dir)")
+    args = ap.parse_args()
+
+    env_cfg = Config.from_env()
+    socket_path = args.socket or env_cfg.daemon_socket
+
+    if args.action == "serve":
+        # Foreground; useful under a process supervisor
+        from apogeemind.daemon.server import MemoryDaemon
+
+        return MemoryDaemon(socket_path, idle_seconds=env_cfg.daemon_idle_seconds).serve()
+
+    client = DaemonClient(socket_path, idle_seconds=env_cfg.daemon_idle_seconds, spawn=args.action == "start")
+    try:
+        if args.action == "stop":
+            client.shutdown()
+            print(f"apogeemind daemon stopped ({client.socket_path})")
+        else:
+            info = client.ping()
+            print(f"apogeemind daemon running: pid={info.get('pid')} stores={info.get('stores')} socket={client.socket_path}")
+    except DaemonError as e:
+        print(f"apogeemind daemon not running ({e})", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
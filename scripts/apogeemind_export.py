@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Ensure repo root (parent of scripts/) is importable
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from apogeemind.db.duckdb_manager import EXPORT_FORMATS, DuckDBManager
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Export/import a namespace as Parquet or NDJSON files (one per table)")
+    ap.add_argument("action", choices=["export", "import"])
+    ap.add_argument("path", help="Directory to write to (export) or read from (import)")
+    ap.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet", help="Export file format")
+    ap.add_argument("--keep-namespace", action="store_true", help="Import rows into their exported namespace")
+    args = ap.parse_args()
+
+    project_dir = Path.cwd()
+    db_path = os.environ.get("APOGEEMIND_DUCKDB_PATH", str(project_dir / "apogeemind" / "apogeemind.duckdb"))
+    namespace = os.environ.get("APOGEEMIND_NAMESPACE", f"code:{project_dir.name}")
+
+    try:
+        # Export only reads; import needs the write lock (stop the daemon first if it holds the DB)
+        db = DuckDBManager(db_path, auto_init_schema=True, read_only=args.action == "export")
+    except Exception as e:
+        print(f"apogeemind: cannot open {db_path}: {e}", file=sys.stderr)
+        return 1
+    try:
+        if args.action == "export":
+            counts = db.export_namespace_files(namespace, args.path, fmt=args.format)
+        else:
+            counts = db.import_namespace_files(args.path, namespace=None if args.keep_namespace else namespace)
+    finally:
+        db.close()
+    summary = " ".join(f"{table}={n}" for table, n in counts.items())
+    print(f"apogeemind {args.action}: namespace={namespace} path={args.path} {summary}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -10,24 +10,58 @@ REPO_ROOT = SCRIPT_DIR.parent
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from apogeemind.db.duckdb_manager import DuckDBManager
+from apogeemind.config import Config
+from apogeemind.daemon.client import DaemonClient, DaemonError
+from apogeemind.utils.tracing import summarize_trace, trace_files
+
+
+def read_counts(db_path: str, namespace: str) -> dict:
+    env_cfg = Config.from_env(default_db=db_path)
+    if env_cfg.daemon:
+        # A running daemon holds the DB open; ask it instead of opening the file
+        try:
+            client = DaemonClient(env_cfg.daemon_socket, spawn=False)
+            return client.health({"db_path": db_path, "namespace": namespace})
+        except DaemonError:
+            pass
+    from apogeemind.db.duckdb_manager import DuckDBManager
+
+    db = DuckDBManager(db_path, auto_init_schema=True, read_only=True)
+    return {"search": db.search_backend, **db.namespace_counts(namespace)}
+
+
+def print_trace_summary(db_path: str, since_hours: float) -> None:
+    cfg = Config.from_env(default_db=db_path)
+    path = cfg.trace_file or f"{db_path}.trace.ndjson"
+    if not trace_files(path):
+        print(f"apogeemind health: no trace at {path} (set APOGEEMIND_TRACE=1 to record one)", file=sys.stderr)
+        return
+    rows = summarize_trace(path, since_seconds=since_hours * 3600.0 if since_hours > 0 else None)
+    print(f"trace: {path} (last {since_hours:g}h)" if since_hours > 0 else f"trace: {path}")
+    print(f"{'stage':<28} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for r in rows:
+        print(f"{r['name']:<28} {r['count']:>7} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['max_ms']:>10.3f}")
 
 
 def main() -> int:
     ap = argparse.ArgumentParser(description="ApogeeMind health: print DB path and counts")
     ap.add_argument("--to-context", action="store_true", help="Print as <system-reminder> to stdout for context")
+    ap.add_argument("--trace", action="store_true", help="Print p50/p95 per traced stage (see APOGEEMIND_TRACE) instead of counts")
+    ap.add_argument("--since-hours", type=float, default=24.0, help="Trace window for --trace; 0 reads the whole trace")
     args = ap.parse_args()
 
     project_dir = Path.cwd()
     db_path = os.environ.get("APOGEEMIND_DUCKDB_PATH", str(project_dir / "apogeemind" / "apogeemind.duckdb"))
+    if args.trace:
+        print_trace_summary(db_path, args.since_hours)
+        return 0
     namespace = os.environ.get("APOGEEMIND_NAMESPACE", f"code:{project_dir.name}")
 
-    db = DuckDBManager(db_path, auto_init_schema=True)
-    chats = db.execute("SELECT COUNT(*) AS c FROM chat_history WHERE namespace = ?", (namespace,)).rows[0]["c"]
-    stm = db.execute("SELECT COUNT(*) AS c FROM short_term_memory WHERE namespace = ?", (namespace,)).rows[0]["c"]
-    ltm = db.execute("SELECT COUNT(*) AS c FROM long_term_memory WHERE namespace = ?", (namespace,)).rows[0]["c"]
-
-    line = f"apogeemind health: db={db_path} ns={namespace} chats={chats} stm={stm} ltm={ltm}"
+    counts = read_counts(db_path, namespace)
+    line = (
+        f"apogeemind health: db={db_path} ns={namespace} "
+        f"chats={counts['chats']} stm={counts['stm']} ltm={counts['ltm']} search={counts.get('search', 'unknown')}"
+    )
 
     if args.to_context:
         sys.stdout.write("<system-reminder>\n")
@@ -17,6 +17,8 @@ def main() -> int:
     namespace = os.environ.get("APOGEEMIND_NAMESPACE") or f"code:{Path.cwd().name}"
     cfg = MemoryStoreConfig(db_path=db_path, namespace=namespace)
     store = MemoryStore(cfg)
+    # Explicit init: re-run DDL and migrations even when the stored version is current
+    store.db.initialize_schema(force=True)
     # Touch the DB by building a minimal prompt (no output required)
     _ = store.get_conscious_system_prompt()
     print(f"apogeemind initialized at: {db_path} (namespace={namespace})")
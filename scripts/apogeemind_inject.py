@@ -11,7 +11,10 @@ REPO_ROOT = SCRIPT_DIR.parent
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from apogeemind.store.memory_store import MemoryStore, MemoryStoreConfig
+from apogeemind.config import Config
+from apogeemind.daemon.client import DaemonClient, DaemonError
+from apogeemind.utils.tracing import get_tracer
+from apogeemind.utils.transcript import read_last_user_text
 
 
 def get_env_bool(name: str, default: bool) -> bool:
@@ -24,6 +27,14 @@ def get_env_bool(name: str, default: bool) -> bool:
 def main() -> int:
     ap = ArgumentParser(description="Memori-local inject: print system-reminder with relevant memories")
     ap.add_argument("--query", help="User query text to retrieve context for", default="")
+    ap.add_argument("--transcript", help="Transcript NDJSON; the last user prompt is used when --query is empty", default="")
+    ap.add_argument(
+        "--mode",
+        choices=["auto", "combined"],
+        default=None,
+        help="auto: relevant memories only; combined: conscious working memory + relevant memories in one retrieval "
+        "(default: APOGEEMIND_INJECT_MODE or combined)",
+    )
     args = ap.parse_args()
 
     db_path = os.environ.get("APOGEEMIND_DUCKDB_PATH", str(Path.cwd() / "apogeemind" / "apogeemind.duckdb"))
@@ -31,19 +42,39 @@ def main() -> int:
     conscious = get_env_bool("APOGEEMIND_CONSCIOUS", True)
     auto = get_env_bool("APOGEEMIND_AUTO", True)
 
-    cfg = MemoryStoreConfig(
-        db_path=db_path,
-        namespace=namespace if namespace else None or "default",
-        conscious_ingest=conscious,
-        auto_ingest=auto,
-    )
-    store = MemoryStore(cfg)
-
     query = args.query.strip()
+    if not query and args.transcript and Path(args.transcript).is_file():
+        query = read_last_user_text(args.transcript).strip()
     if not query:
         return 0
 
-    block = store.get_auto_ingest_system_prompt(query)
+    spec = {
+        "db_path": db_path,
+        "namespace": namespace if namespace else None or "default",
+        "conscious_ingest": conscious,
+        "auto_ingest": auto,
+    }
+    block = None
+    env_cfg = Config.from_env(default_db=db_path)
+    mode = args.mode or env_cfg.inject_mode
+    with get_tracer().span("hook.inject", mode=mode) as span:
+        if env_cfg.daemon:
+            try:
+                client = DaemonClient(env_cfg.daemon_socket, idle_seconds=env_cfg.daemon_idle_seconds)
+                block = client.inject(spec, query, mode=mode)
+                span["via"] = "daemon"
+            except DaemonError:
+                block = None
+        if block is None:
+            # In-process fallback (pays the full import + open cost)
+            from apogeemind.store.memory_store import MemoryStore, MemoryStoreConfig
+
+            span["via"] = "in_process"
+            store = MemoryStore(MemoryStoreConfig(**spec, read_only=True))
+            if mode == "combined":
+                block = store.get_combined_system_prompt(query)
+            else:
+                block = store.get_auto_ingest_system_prompt(query)
     if not block.strip():
         return 0
 
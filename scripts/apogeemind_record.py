@@ -4,6 +4,7 @@ import os
 import sys
 from argparse import ArgumentParser
 from pathlib import Path
+from typing import Dict, List, Tuple
 
 # Ensure repo root (parent of scripts/) is importable
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -11,7 +12,11 @@ REPO_ROOT = SCRIPT_DIR.parent
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from apogeemind.store.memory_store import MemoryStore, MemoryStoreConfig
+from apogeemind.config import Config
+from apogeemind.daemon.client import DaemonClient, DaemonError
+from apogeemind.db.spool import WriteSpool, apply_spool_entries
+from apogeemind.utils.tracing import get_tracer
+from apogeemind.utils.transcript import TranscriptTailer
 
 
 def get_env_bool(name: str, default: bool) -> bool:
@@ -21,31 +26,91 @@ def get_env_bool(name: str, default: bool) -> bool:
     return v.strip().lower() in {"1", "true", "yes", "on"}
 
 
+def drain_in_process(spool: WriteSpool) -> None:
+    # Only one writer drains at a time; if another holds the lock it will pick
+    # up our entry, otherwise the next hook run or the daemon will
+    with spool.writer_lock() as acquired:
+        if not acquired:
+            return
+        from apogeemind.store.memory_store import MemoryStore, MemoryStoreConfig
+
+        stores: Dict[str, MemoryStore] = {}
+
+        def get_store(spec: dict) -> MemoryStore:
+            key = json.dumps(spec, sort_keys=True)
+            if key not in stores:
+                stores[key] = MemoryStore(MemoryStoreConfig(**spec, lock_timeout=1.0))
+            return stores[key]
+
+        try:
+            spool.drain(lambda entries: apply_spool_entries(entries, get_store))
+        except Exception as e:
+            # DB busy or failing: entries stay spooled, nothing is lost
+            print(f"apogeemind record: left in spool ({e})", file=sys.stderr)
+
+
+def record_exchanges(spec: dict, exchanges: List[Tuple[str, str]], model: str) -> None:
+    with get_tracer().span("hook.record", exchanges=len(exchanges)) as span:
+        # Durable first: the batch is on disk before any DB work is attempted
+        spool = WriteSpool(spec["db_path"])
+        spool.enqueue(spec, exchanges, model=model)
+
+        env_cfg = Config.from_env(default_db=spec["db_path"])
+        if env_cfg.daemon:
+            try:
+                client = DaemonClient(env_cfg.daemon_socket, idle_seconds=env_cfg.daemon_idle_seconds)
+                client.drain(spec["db_path"])
+                span["via"] = "daemon"
+                return
+            except DaemonError:
+                pass
+
+        # In-process fallback (pays the full import + open cost)
+        span["via"] = "in_process"
+        drain_in_process(spool)
+
+
 def main() -> int:
     ap = ArgumentParser(description="Memori-local record: record a user/assistant exchange")
     ap.add_argument("--user", help="User input text", default="")
     ap.add_argument("--assistant", help="Assistant output text", default="")
+    ap.add_argument(
+        "--transcript",
+        help="Transcript NDJSON; records every exchange added since the last run (offsets kept in a state file)",
+        default="",
+    )
     args = ap.parse_args()
 
-    user = (args.user or "").strip()
-    assistant = (args.assistant or "").strip()
-    if not user and not assistant:
-        return 0
-
     db_path = os.environ.get("APOGEEMIND_DUCKDB_PATH", str(Path.cwd() / "apogeemind" / "apogeemind.duckdb"))
     namespace = os.environ.get("APOGEEMIND_NAMESPACE")
     conscious = get_env_bool("APOGEEMIND_CONSCIOUS", True)
     auto = get_env_bool("APOGEEMIND_AUTO", True)
     model = os.environ.get("APOGEEMIND_MODEL", "claude-code")
 
-    cfg = MemoryStoreConfig(
-        db_path=db_path,
-        namespace=namespace if namespace else None or "default",
-        conscious_ingest=conscious,
-        auto_ingest=auto,
-    )
-    store = MemoryStore(cfg)
-    store.record_conversation(user, assistant, model=model, metadata=None)
+    spec = {
+        "db_path": db_path,
+        "namespace": namespace if namespace else None or "default",
+        "conscious_ingest": conscious,
+        "auto_ingest": auto,
+    }
+
+    if args.transcript:
+        if not Path(args.transcript).is_file():
+            return 0
+        state_path = os.environ.get(
+            "APOGEEMIND_TRANSCRIPT_STATE", str(Path(db_path).parent / "transcript_offsets.json")
+        )
+        with TranscriptTailer(state_path).pending(args.transcript) as exchanges:
+            exchanges = [(u.strip(), a.strip()) for u, a in exchanges if u.strip() or a.strip()]
+            if exchanges:
+                record_exchanges(spec, exchanges, model)
+        return 0
+
+    user = (args.user or "").strip()
+    assistant = (args.assistant or "").strip()
+    if not user and not assistant:
+        return 0
+    record_exchanges(spec, [(user, assistant)], model)
     return 0
 
 
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Ensure repo root (parent of scripts/) is importable
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from apogeemind.agents.retention_agent import RetentionAgent, default_archive_dir
+from apogeemind.config import Config
+from apogeemind.db.duckdb_manager import DuckDBManager
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="ApogeeMind retention: archive old chat_history rows to Parquet")
+    ap.add_argument("--max-age-days", type=float, default=None, help="Archive chats older than this (default: APOGEEMIND_CHAT_RETENTION_DAYS)")
+    ap.add_argument("--max-rows", type=int, default=None, help="Keep only the newest N chats per namespace (default: APOGEEMIND_CHAT_RETENTION_ROWS)")
+    ap.add_argument("--archive-dir", default=None, help="Archive root (default: APOGEEMIND_ARCHIVE_DIR or <db dir>/archive)")
+    ap.add_argument("--all-namespaces", action="store_true", help="Apply the policy to every namespace in the DB")
+    args = ap.parse_args()
+
+    project_dir = Path.cwd()
+    db_path = os.environ.get("APOGEEMIND_DUCKDB_PATH", str(project_dir / "apogeemind" / "apogeemind.duckdb"))
+    namespace = os.environ.get("APOGEEMIND_NAMESPACE", f"code:{project_dir.name}")
+    env_cfg = Config.from_env(default_db=db_path)
+
+    max_age = args.max_age_days if args.max_age_days is not None else env_cfg.chat_retention_days
+    max_rows = args.max_rows if args.max_rows is not None else env_cfg.chat_retention_rows
+    if max_age is None and max_rows is None:
+        print("apogeemind retention: no policy (set --max-age-days/--max-rows or APOGEEMIND_CHAT_RETENTION_*)", file=sys.stderr)
+        return 2
+
+    try:
+        # Needs the write lock; stop the daemon first if it holds the DB
+        db = DuckDBManager(db_path, auto_init_schema=True)
+    except Exception as e:
+        print(f"apogeemind: cannot open {db_path}: {e}", file=sys.stderr)
+        return 1
+    archive_dir = args.archive_dir or env_cfg.archive_dir or default_archive_dir(db_path)
+    try:
+        agent = RetentionAgent(db, archive_dir, max_age_days=max_age, max_rows=max_rows)
+        moved = agent.run(None if args.all_namespaces else namespace)
+    finally:
+        db.close()
+    scope = "all" if args.all_namespaces else namespace
+    print(f"apogeemind retention: ns={scope} archived={sum(moved.values())} archive={archive_dir}")
+    for ns, n in moved.items():
+        print(f"  {ns}: {n}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
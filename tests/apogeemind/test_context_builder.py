@@ -0,0 +1,54 @@
+from apogeemind.utils.context_builder import END_MARKER, ContextBuilder, approx_tokens
+
+
+def item(summary: str, score: float, category: str = "context") -> dict:
+    return {"category_primary": category, "summary": summary, "created_at": "2024-01-01", "importance_score": 0.5, "rank_score": score}
+
+
+def test_block_stays_within_budget_and_well_formed():
+    builder = ContextBuilder(max_tokens=120)
+    items = [item(f"Memory number {i} about the loader " + "x" * (i * 7), 1.0) for i in range(40)]
+    block = builder.build_system_block(items, namespace="ns")
+    lines = block.split("\n")
+    assert lines[0] == "--- Relevant Memories (namespace=ns) ---" and lines[-1] == END_MARKER
+    assert approx_tokens(block) <= 120
+    assert 1 < len(lines) - 2 < len(items)
+    # A budget too small for any item still yields header and end marker
+    assert ContextBuilder(max_tokens=5).build_system_block(items).split("\n")[1:] == [END_MARKER]
+
+
+def test_value_per_token_selection_and_near_duplicates():
+    builder = ContextBuilder(max_tokens=60)
+    items = [
+        item("Long but only moderately relevant " + "detail " * 20, 0.6),
+        item("Use ruff for linting", 0.5),
+        item("use  RUFF for linting.", 0.9),
+        item("Tests run with pytest -q", 0.4),
+    ]
+    lines = builder.build_system_block(items).split("\n")[1:-1]
+    assert len(lines) == 2
+    # The duplicate with the higher score wins; chosen lines keep input order
+    assert lines[0].startswith("- [CONTEXT] use RUFF for linting.") and "pytest" in lines[1]
+
+
+def test_single_valuable_item_beats_many_cheap_ones():
+    builder = ContextBuilder(max_tokens=70)
+    items = [item("The deployment checklist " + "step " * 30, 5.0)] + [item(f"tip {i}", 0.05) for i in range(4)]
+    lines = builder.build_system_block(items).split("\n")[1:-1]
+    assert len(lines) == 1 and "deployment checklist" in lines[0]
+
+
+def test_sections_share_budget_and_dedup_across_sections():
+    builder = ContextBuilder(max_tokens=100)
+    conscious = [{"category_primary": "preference", "summary": "Use ruff for linting", "importance_score": 0.9}]
+    relevant = [item("use ruff for linting", 2.0), item("Tests run with pytest -q", 1.0)]
+    lines = builder.build_sections([("Conscious Working Memory", conscious, 0.4), ("Relevant Memories", relevant, 0.6)], namespace="ns")
+    lines = lines.split("\n")
+    assert lines[0] == "--- Conscious Working Memory (namespace=ns) ---" and lines[-1] == END_MARKER
+    assert lines.index("--- Relevant Memories ---") == 2
+    assert sum("ruff" in line.lower() for line in lines) == 1
+    assert approx_tokens("\n".join(lines)) <= 100
+    # Unused conscious share goes to the relevant section; nothing chosen at all means no block
+    only_relevant = builder.build_sections([("Conscious Working Memory", [], 0.9), ("Relevant Memories", relevant, 0.1)])
+    assert only_relevant.startswith("--- Relevant Memories ---") and only_relevant.count("\n- ") == 2
+    assert builder.build_sections([("Conscious Working Memory", [], 0.5), ("Relevant Memories", [], 0.5)]) == ""
@@ -0,0 +1,65 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from apogeemind.daemon.client import DaemonClient, DaemonError
+from apogeemind.daemon.server import MemoryDaemon
+
+
+def start_daemon(tmp_path: Path) -> tuple:
+    sock = str(tmp_path / "d.sock")
+    daemon = MemoryDaemon(sock, idle_seconds=30)
+    t = threading.Thread(target=daemon.serve, daemon=True)
+    t.start()
+    client = DaemonClient(sock, spawn=False)
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            client.ping()
+            break
+        except DaemonError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.02)
+    return daemon, t, client
+
+
+def test_daemon_record_inject_health_roundtrip(tmp_path: Path):
+    daemon, t, client = start_daemon(tmp_path)
+    spec = {"db_path": str(tmp_path / "memori.duckdb"), "namespace": "ns"}
+    try:
+        chat_id = client.record(spec, "We test with pytest fixtures", "Added conftest.py", model="local")
+        assert chat_id
+        block = client.inject(spec, "pytest")
+        assert "Relevant Memories" in block and "End Memories" in block
+        combined = client.inject(spec, "pytest", mode="combined")
+        assert "Relevant Memories" in combined and combined.endswith("--- End Memories ---")
+        health = client.health(spec)
+        assert health["chats"] == 1 and health["ltm"] >= 1
+        # Same spec reuses the warm store
+        assert client.ping()["stores"] == 1
+        # Health for another namespace or DB never builds a store
+        assert client.health({**spec, "namespace": "other"})["chats"] == 0
+        assert client.health({"db_path": str(tmp_path / "cold.duckdb"), "namespace": "ns"})["ltm"] == 0
+        assert client.ping()["stores"] == 1
+        with pytest.raises(DaemonError, match="db_path"):
+            client.health({"namespace": "ns"})
+    finally:
+        client.shutdown()
+        t.join(timeout=5)
+    assert not t.is_alive()
+    assert not Path(daemon.socket_path).exists()
+
+
+def test_daemon_reports_errors_and_missing_socket(tmp_path: Path):
+    _, t, client = start_daemon(tmp_path)
+    try:
+        with pytest.raises(DaemonError):
+            client.request({"op": "bogus", "store": {"db_path": str(tmp_path / "m.duckdb")}})
+    finally:
+        client.shutdown()
+        t.join(timeout=5)
+    with pytest.raises(DaemonError):
+        DaemonClient(str(tmp_path / "missing.sock"), spawn=False).ping()
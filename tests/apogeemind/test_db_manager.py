@@ -1,6 +1,9 @@
 from pathlib import Path
 
-from apogeemind.db.duckdb_manager import DuckDBManager
+import pytest
+
+from apogeemind.db.duckdb_manager import SCHEMA_VERSION, DuckDBManager
+from apogeemind.retrieval.scoring import LinearScoringModel
 
 
 def test_schema_init_and_basic_inserts(tmp_path: Path):
@@ -52,3 +55,275 @@ def test_search_like_fallback(tmp_path: Path):
 
     items = db.search_memories(namespace="ns", query="pytest", limit=5)
     assert any(r["memory_type"] == "short_term" for r in items)
+
+
+def test_fts_bm25_search_and_incremental_refresh(tmp_path: Path):
+    db = DuckDBManager(str(tmp_path / "memori.duckdb"), auto_init_schema=True, fts_refresh_threshold=2)
+    if not db.fts_enabled:
+        pytest.skip("duckdb fts extension not available")
+    assert db.search_backend == "fts"
+
+    def add(mid: str, text: str) -> None:
+        db.insert_ltm(
+            memory_id=mid,
+            namespace="ns",
+            category_primary="skill",
+            summary=text,
+            searchable_content=text,
+            importance_score=0.5,
+            classification=None,
+            entities_json=None,
+            keywords_json=None,
+            content_hash=None,
+        )
+
+    # Row added after the initial (empty) index build is found via the unindexed tail
+    add("l1", "We use pytest fixtures for tests")
+    assert db.fts_dirty_counts()["long_term_memory"] == 1
+    assert [r["memory_id"] for r in db.search_memories("ns", "pytest", limit=5)] == ["l1"]
+
+    # Reaching the threshold does not make the read path rebuild; the tail still finds the row
+    add("l2", "FastAPI routers and pytest")
+    assert [r["text_score"] for r in db.search_memories("ns", "fixtures", limit=5)] == [None]
+    assert db.fts_dirty_counts()["long_term_memory"] == 2
+
+    # The writer's refresh rebuilds; BM25 then scores the rows
+    assert db.refresh_fts_indexes() == ["long_term_memory"]
+    items = db.search_memories("ns", "fixtures", limit=5)
+    assert db.fts_dirty_counts()["long_term_memory"] == 0
+    assert [r["memory_id"] for r in items] == ["l1"]
+    assert items[0]["text_score"] is not None
+
+
+def test_prune_stm_keeps_highest_value_rows_and_drops_expired(tmp_path: Path):
+    db = DuckDBManager(str(tmp_path / "memori.duckdb"), auto_init_schema=True)
+
+    def add(mid: str, importance: float, permanent: bool = False, expires_at=None, ns: str = "ns") -> None:
+        db.insert_stm(
+            memory_id=mid,
+            namespace=ns,
+            category_primary="conscious_context",
+            summary=mid,
+            searchable_content=mid,
+            importance_score=importance,
+            is_permanent_context=permanent,
+            expires_at=expires_at,
+        )
+
+    for i in range(6):
+        add(f"s{i}", importance=i / 10)
+    add("perm", importance=0.0, permanent=True)
+    add("expired", importance=0.99, expires_at="2000-01-01 00:00:00")
+    add("other", importance=0.0, ns="other")
+    # Same importance: the newer row wins the tie
+    db.execute("UPDATE short_term_memory SET created_at = created_at - INTERVAL 1 DAY WHERE memory_id = 's4'")
+    add("s4b", importance=0.4)
+
+    assert db.prune_stm_by_capacity("ns", capacity=3) == 6
+    kept = {r["memory_id"] for r in db.execute("SELECT memory_id FROM short_term_memory WHERE namespace = 'ns'").rows}
+    # The permanent row occupies a slot but is never pruned; the expired row goes despite its importance
+    assert kept == {"perm", "s5", "s4b"}
+    assert db.stm_count("other") == 1
+
+    # Permanent rows over capacity are kept; everything else is pruned
+    add("perm2", importance=0.1, permanent=True)
+    assert db.prune_stm_by_capacity("ns", capacity=1) == 2
+    assert {r["memory_id"] for r in db.execute("SELECT memory_id FROM short_term_memory WHERE namespace = 'ns'").rows} == {"perm", "perm2"}
+
+
+@pytest.mark.parametrize("fts", [True, False])
+def test_search_ranked_single_query_bounded_and_recency_ordered(tmp_path: Path, fts: bool):
+    db = DuckDBManager(str(tmp_path / "memori.duckdb"), auto_init_schema=True)
+    if fts and not db.fts_enabled:
+        pytest.skip("duckdb fts extension not available")
+    db.fts_enabled = fts
+    for i in range(20):
+        db.insert_ltm(
+            memory_id=f"l{i}",
+            namespace="ns",
+            category_primary="skill",
+            summary=f"pytest note {i}",
+            searchable_content=f"we use pytest {i}",
+            importance_score=0.5,
+            classification=None,
+            entities_json=None,
+            keywords_json=None,
+            content_hash=None,
+        )
+    db.insert_stm(
+        memory_id="s1",
+        namespace="ns",
+        category_primary="conscious_context",
+        summary="pytest in stm",
+        searchable_content="pytest in stm",
+        importance_score=0.1,
+    )
+    # Equal importance: older rows decay out of the top results
+    db.execute("UPDATE long_term_memory SET created_at = created_at - INTERVAL 90 DAY WHERE memory_id <> 'l7'")
+
+    rank_sql, rank_params = LinearScoringModel().rank_sql(30)
+    items = db.search_ranked("ns", "pytest", rank_sql, rank_params, limit=3)
+    assert len(items) == 3
+    assert [r["memory_id"] for r in items[:2]] == ["s1", "l7"]
+    assert items[0]["rank_score"] >= items[1]["rank_score"] >= items[2]["rank_score"]
+    assert db.search_ranked("ns", "nomatch", rank_sql, rank_params, limit=3) == []
+
+
+def test_search_ranked_bm25_hit_beats_fresh_tail_match(tmp_path: Path):
+    db = DuckDBManager(str(tmp_path / "memori.duckdb"), auto_init_schema=True)
+    if not db.fts_enabled:
+        pytest.skip("duckdb fts extension not available")
+
+    def add(memory_id: str, text: str) -> None:
+        db.insert_ltm(
+            memory_id=memory_id,
+            namespace="ns",
+            category_primary="skill",
+            summary=text,
+            searchable_content=text,
+            importance_score=0.5,
+            classification=None,
+            entities_json=None,
+            keywords_json=None,
+            content_hash=None,
+        )
+
+    add("indexed", "ruff is our linter")
+    db.execute("UPDATE long_term_memory SET created_at = created_at - INTERVAL 30 DAY")
+    db.refresh_fts_indexes(force=True)
+    # Newer than the snapshot: only found by the ILIKE tail, without a BM25 score
+    add("tail", "mentions ruffle in passing")
+
+    rank_sql, rank_params = LinearScoringModel().rank_sql(30)
+    items = db.search_ranked("ns", "ruff", rank_sql, rank_params, limit=5)
+    assert [r["memory_id"] for r in items] == ["indexed", "tail"]
+    assert items[1]["text_score"] is None
+
+
+def test_ltm_dedup_by_hash_and_v2_backfill(tmp_path: Path):
+    from apogeemind.utils.hashing import content_hash, summary_hash
+
+    import duckdb
+
+    db_path = str(tmp_path / "memori.duckdb")
+    # Simulate a v1 database: no summary_hash column, rows without hashes
+    con = duckdb.connect(db_path)
+    con.execute(
+        """
+        CREATE TABLE long_term_memory (
+          memory_id TEXT PRIMARY KEY, namespace TEXT NOT NULL, category_primary TEXT NOT NULL,
+          summary TEXT NOT NULL, searchable_content TEXT NOT NULL, importance_score DOUBLE NOT NULL,
+          classification TEXT, created_at TIMESTAMP NOT NULL DEFAULT current_timestamp,
+          access_count INTEGER NOT NULL DEFAULT 0, topic TEXT, entities_json TEXT, keywords_json TEXT,
+          content_hash TEXT
+        );
+        INSERT INTO long_term_memory(memory_id, namespace, category_primary, summary, searchable_content, importance_score)
+        VALUES ('old1', 'ns', 'skill', 'Use  PyTest', 'we use pytest', 0.5);
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        INSERT INTO meta VALUES ('schema_version', '1');
+        """
+    )
+    con.close()
+
+    db = DuckDBManager(db_path, auto_init_schema=True)
+    row = db.execute("SELECT summary_hash, content_hash FROM long_term_memory WHERE memory_id = 'old1'").rows[0]
+    assert row["summary_hash"] == summary_hash("use pytest")
+    assert row["content_hash"] == content_hash("we use pytest")
+    assert db._get_schema_version() == SCHEMA_VERSION
+
+    # Either hash matches within the namespace; other namespaces never match
+    assert db.find_ltm_duplicate("ns", summary_hash("USE pytest"), None) == {"memory_id": "old1"}
+    assert db.find_ltm_duplicate("ns", None, content_hash("we use pytest")) == {"memory_id": "old1"}
+    assert db.find_ltm_duplicate("other", summary_hash("use pytest"), content_hash("we use pytest")) is None
+    assert db.find_ltm_duplicate("ns", summary_hash("something new"), content_hash("new")) is None
+
+    # Rows inserted after the filter was built are still found
+    db.insert_ltm(
+        memory_id="new1",
+        namespace="ns",
+        category_primary="skill",
+        summary="FastAPI routers",
+        searchable_content="fastapi routers",
+        importance_score=0.5,
+        classification=None,
+        entities_json=None,
+        keywords_json=None,
+        content_hash=content_hash("fastapi routers"),
+    )
+    assert db.find_ltm_duplicate("ns", summary_hash("fastapi routers"), None) == {"memory_id": "new1"}
+
+
+def test_schema_init_is_version_gated_and_read_only_open(tmp_path: Path):
+    db_path = str(tmp_path / "memori.duckdb")
+    db = DuckDBManager(db_path, auto_init_schema=True)
+    db.execute("DROP INDEX idx_st_ns_cat")
+    db.close()
+
+    def has_index(db: DuckDBManager) -> bool:
+        q = db.execute("SELECT 1 AS x FROM duckdb_indexes() WHERE index_name = 'idx_st_ns_cat'")
+        return bool(q.rows)
+
+    # Current version: DDL is skipped on open, only an explicit (forced) init re-runs it
+    db = DuckDBManager(db_path, auto_init_schema=True)
+    assert not has_index(db)
+    db.initialize_schema(force=True)
+    assert has_index(db)
+    db.insert_stm("s1", "ns", "conscious_context", "Use pytest", "we use pytest", 0.8)
+    db.close()
+
+    ro = DuckDBManager(db_path, auto_init_schema=True, read_only=True)
+    assert ro.read_only
+    assert [r["memory_id"] for r in ro.search_memories("ns", "pytest", limit=5)] == ["s1"]
+    with pytest.raises(Exception):
+        ro.insert_chat("ns", "sess", "u", "a")
+    ro.close()
+
+
+def test_read_only_open_bootstraps_missing_db(tmp_path: Path):
+    db = DuckDBManager(str(tmp_path / "new.duckdb"), auto_init_schema=True, read_only=True)
+    assert db._get_schema_version() == SCHEMA_VERSION
+    assert db.namespace_counts("ns") == {"chats": 0, "stm": 0, "ltm": 0}
+
+
+def test_bulk_writes_round_trip_timestamps_nulls_and_unicode(tmp_path: Path):
+    from datetime import datetime
+
+    db = DuckDBManager(str(tmp_path / "memori.duckdb"), auto_init_schema=True)
+    text = 'naïve — 日本語 "quoted" \\ back\nslash 🚀'
+    db.insert_chats_bulk(
+        [
+            {"chat_id": "c1", "session_id": "s", "namespace": "ns", "user_input": text, "ai_output": "", "model": None, "tokens_used": None},
+            {"chat_id": "c2", "session_id": "s", "namespace": "ns", "user_input": "u", "ai_output": text, "model": "m", "tokens_used": 42},
+        ]
+    )
+    chats = db.execute("SELECT chat_id, user_input, ai_output, model, tokens_used, timestamp FROM chat_history ORDER BY chat_id").rows
+    assert [(r["user_input"], r["ai_output"], r["model"], r["tokens_used"]) for r in chats] == [(text, "", None, None), ("u", text, "m", 42)]
+    assert all(r["timestamp"] is not None for r in chats)  # column default, not NULL
+
+    ltm = {
+        "memory_id": "l-ü", "namespace": "ns", "category_primary": "context", "summary": text,
+        "searchable_content": text, "importance_score": 0.125, "classification": None,
+        "entities_json": '["日本語"]', "keywords_json": None, "content_hash": None, "chat_id": None, "chunk_index": None,
+    }
+    db.insert_ltm_bulk([ltm, {**ltm, "memory_id": "l2", "chat_id": "c1", "chunk_index": 3}])
+    rows = db.execute("SELECT * FROM long_term_memory ORDER BY memory_id").rows
+    assert [r["memory_id"] for r in rows] == ["l-ü", "l2"]
+    assert rows[0]["summary"] == text and rows[0]["entities_json"] == '["日本語"]' and rows[0]["importance_score"] == 0.125
+    assert rows[0]["classification"] is None and rows[0]["chat_id"] is None and rows[0]["chunk_index"] is None
+    assert (rows[1]["chat_id"], rows[1]["chunk_index"]) == ("c1", 3)
+
+    expires = datetime(2031, 2, 3, 4, 5, 6, 789012)
+    stm = {"memory_id": "s1", "namespace": "ns", "category_primary": "conscious_context", "summary": text,
+           "searchable_content": text, "importance_score": 0.5, "expires_at": expires}
+    db.insert_stm_bulk([stm, {**stm, "memory_id": "s2", "expires_at": None, "is_permanent_context": True}])
+    db.insert_stm_bulk([{**stm, "summary": "ignored"}])  # existing id is skipped
+    rows = db.execute("SELECT memory_id, summary, expires_at, is_permanent_context FROM short_term_memory ORDER BY memory_id").rows
+    assert [(r["memory_id"], r["summary"], r["expires_at"], r["is_permanent_context"]) for r in rows] == [
+        ("s1", text, expires, False),
+        ("s2", text, None, True),
+    ]
+
+    db.bump_ltm_access_bulk({"l-ü": 2, "l2": 1, "missing": 5})
+    db.bump_ltm_access_bulk({"l-ü": 1})
+    counts = {r["memory_id"]: r["access_count"] for r in db.execute("SELECT memory_id, access_count FROM long_term_memory").rows}
+    assert counts == {"l-ü": 3, "l2": 1}
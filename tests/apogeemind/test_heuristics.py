@@ -1,4 +1,7 @@
+import pytest
+
 from apogeemind.processing.heuristics import HeuristicProcessor
+from apogeemind.utils.hashing import content_hash
 
 
 def test_preference_classification_and_promotion():
@@ -26,3 +29,98 @@ def test_skill_classification_and_entities():
     assert pm.category_primary in {"skill", "context", "rule"}
     # Extracted entities include file path
     assert any(e.endswith(".py") for e in pm.entities) or pm.keywords
+
+
+# Outputs of the processor before the single-normalization rewrite; any change here changes stored memories
+GOLDEN = [
+    (
+        ("I prefer using black and ruff for Python formatting.", "Sure, I'll adopt black + ruff in the project."),
+        ("preference", "Sure, I'll adopt black + ruff in the project.", [], ["python"], 0.67, "c174b7458ddae55e"),
+    ),
+    (
+        ("We use FastAPI and test with pytest.", "Create app/main.py and add routers for JIRA-42."),
+        ("context", "Create app/main.py and add routers for JIRA-42.", ["app/main.py", "JIRA-42"], ["fastapi"], 0.56, "30c4d5758f4973f3"),
+    ),
+    (
+        ("Fix the crash in docs/ABC-123.md, see #17", "Updated  the   file.\n\n```py\n# you must not do this\nx = 1\n```\nDone."),
+        ("rule", "Updated the file. Done.", ["docs/ABC-123.md", "ABC-123"], [], 0.69, "5c668ff10bd0ca29"),
+    ),
+    (
+        ("Why is Redis slow?", "It depends on eviction; check config.yaml and Docker limits."),
+        ("context", "It depends on eviction; check config.yaml and Docker limits.", ["config.yaml"], ["docker", "redis"], 0.56, "a29430acd3a383c3"),
+    ),
+    (
+        # The summary comes from the same combined split: the reply's text up to the closing fence is code
+        ("```\nunclosed fence in prompt", "reply with ``` closing it, then never.py and text"),
+        ("rule", "closing it, then never.py and text", ["never.py"], [], 0.67, "2d0b4c17f984d7e0"),
+    ),
+    (("Question only", ""), ("context", "Question only", [], [], 0.5, "7ea834f05e950327")),
+]
+
+
+@pytest.mark.parametrize("exchange,expected", GOLDEN)
+def test_golden_outputs(exchange, expected):
+    pm = HeuristicProcessor().process_conversation(*exchange)[0]
+    category, summary, entities, keywords, importance, hash_prefix = expected
+    assert pm.category_primary == category
+    assert pm.summary == summary
+    assert pm.entities == entities
+    assert pm.keywords == keywords
+    assert pm.importance_score == pytest.approx(importance)
+    assert pm.content_hash.startswith(hash_prefix)
+
+
+def test_long_output_is_analyzed_within_bound():
+    heur = HeuristicProcessor(max_chars=1000, chunk_chars=0)
+    ai = "Refactor the module and return early. " * 200 + "Then edit late/file.py with pytest."
+    pm = heur.process_conversation("Clean up", ai)[0]
+    assert len(pm.searchable_content) <= 1000 and not pm.searchable_content.endswith(" ")
+    # Signals past the window are not scanned; the hash still covers the whole exchange
+    assert "late/file.py" not in pm.entities and pm.keywords == []
+    assert pm.content_hash == heur.process_conversation("Clean up", ai)[0].content_hash
+    assert pm.content_hash != heur.process_conversation("Clean up", ai[:-1])[0].content_hash
+    assert pm.content_hash != content_hash(pm.searchable_content)
+
+
+def test_raw_input_past_bound_is_never_normalized(monkeypatch):
+    heur = HeuristicProcessor(max_chars=1000, chunk_chars=0)
+    seen = []
+    monkeypatch.setattr(heur, "_pieces", lambda s, ai_from: seen.append(len(s)) or HeuristicProcessor._pieces(heur, s, ai_from))
+    pm = heur.process_conversation("Clean up", "Refactor the module. " * 50_000)[0]
+    assert max(seen) <= heur.max_raw_chars
+    assert len(pm.searchable_content) <= 1000 and pm.importance_score < 0.5  # length still counts the whole reply
+
+
+def test_long_exchange_is_chunked_at_paragraphs():
+    heur = HeuristicProcessor(chunk_chars=200)
+    ai = "\n\n".join(
+        [
+            "Refactor the loader so it returns early. " * 3,
+            "I prefer pytest fixtures over setup methods in tests.",
+            "```py\nx = 1\n```",
+            "Then edit app/main.py and close #42. " * 2,
+            "One run-on paragraph without any sentence break " * 8,
+        ]
+    )
+    items = heur.process_conversation("Clean up the loader", ai)
+    assert len(items) > 1
+    assert [pm.chunk_index for pm in items] == list(range(len(items)))
+    assert all(len(pm.searchable_content) <= 200 for pm in items)
+    assert len({pm.content_hash for pm in items}) == len(items)
+    # Each chunk is analyzed on its own
+    assert any(pm.category_primary == "preference" for pm in items)
+    assert any("app/main.py" in pm.entities for pm in items)
+    assert not all("app/main.py" in pm.entities for pm in items)
+    # Short exchanges stay a single memory
+    assert len(heur.process_conversation("Hi", "Hello there.")) == 1
+
+
+def test_chunks_stop_at_first_paragraph_past_max_chars():
+    heur = HeuristicProcessor(max_chars=1000, chunk_chars=300)
+    names = ["Alpha", "Beta", "Gamma", "Delta", "Eps", "Zeta"]
+    sizes = [250, 250, 250, 280, 60, 60]
+    ai = "\n\n".join(f"{name} " + "word " * ((size - len(name)) // 5) for name, size in zip(names, sizes))
+    stored = " ".join(pm.searchable_content for pm in heur.process_conversation("", ai)).lower()
+    # Delta does not fit in the scanned window; the shorter paragraphs after it must not be stored either
+    assert all(name.lower() in stored for name in names[:3])
+    assert not any(name.lower() in stored for name in names[3:])
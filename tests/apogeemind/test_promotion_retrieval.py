@@ -1,5 +1,8 @@
+import json
 from pathlib import Path
 
+import pytest
+
 from apogeemind.store.memory_store import MemoryStore, MemoryStoreConfig
 
 
@@ -40,3 +43,243 @@ def test_retrieval_engine_ordering(tmp_path: Path):
     # At least one item should be from STM due to promotion in previous steps (if eligible)
     # Not strictly guaranteed, but we should see summaries present
     assert any("summary" in it for it in items)
+
+
+def test_record_dedups_repeated_exchange(tmp_path: Path):
+    store = make_store(tmp_path)
+    store.record_conversation("We use FastAPI", "Create app/main.py", model="local")
+    store.record_conversation("We use FastAPI", "Create   APP/main.py", model="local")
+    rows = store.db.execute("SELECT access_count FROM long_term_memory WHERE namespace = 'ns'").rows
+    assert len(rows) == 1
+    assert rows[0]["access_count"] == 1
+
+
+def test_record_conversations_bulk(tmp_path: Path):
+    store = make_store(tmp_path)
+    exchanges = [
+        ("I prefer using ruff and black for Python.", "Acknowledged. Will use ruff + black."),
+        ("We use FastAPI", "Create app/main.py"),
+        ("We use FastAPI", "Create app/main.py"),  # duplicate within the batch
+    ] + [(f"Refactor module{i}.py", f"Renamed helpers in module{i}.py") for i in range(8)]
+    chat_ids = store.record_conversations_bulk(exchanges, model="bulk")
+    assert len(chat_ids) == len(set(chat_ids)) == len(exchanges)
+
+    counts = store.db.namespace_counts("ns")
+    assert counts["chats"] == len(exchanges)
+    assert counts["ltm"] == len(exchanges) - 1
+    assert counts["stm"] <= 5  # capacity enforced once for the batch
+    dup = store.db.execute("SELECT access_count FROM long_term_memory WHERE summary = 'Create app/main.py'").rows
+    assert [r["access_count"] for r in dup] == [1]
+    # A later single record still dedups against the bulk-inserted rows
+    store.record_conversation("We use FastAPI", "Create app/main.py")
+    assert store.db.namespace_counts("ns")["ltm"] == len(exchanges) - 1
+
+
+def test_long_exchange_is_stored_as_linked_chunks(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("APOGEEMIND_CHUNK_CHARS", "300")
+    store = make_store(tmp_path)
+    ai = "\n\n".join(f"Step {i}: update services/worker{i}.py and rerun the pytest suite. " * 3 for i in range(6))
+    chat_id = store.record_conversation("Walk me through the migration", ai)
+    rows = store.db.execute(
+        "SELECT chat_id, chunk_index, searchable_content FROM long_term_memory WHERE namespace = 'ns' ORDER BY chunk_index"
+    ).rows
+    assert len(rows) > 1
+    assert {r["chat_id"] for r in rows} == {chat_id}
+    assert [r["chunk_index"] for r in rows] == list(range(len(rows)))
+    assert all(len(r["searchable_content"]) <= 300 for r in rows)
+    # Re-recording the same exchange dedups every chunk
+    store.record_conversation("Walk me through the migration", ai)
+    assert store.db.namespace_counts("ns")["ltm"] == len(rows)
+
+
+def test_combined_prompt_fetches_conscious_and_relevant_in_one_statement(tmp_path: Path):
+    store = make_store(tmp_path)
+    store.record_conversation("I prefer using ruff and black for Python.", "Acknowledged. Will use ruff + black.")
+    store.record_conversation("We use FastAPI", "Create app/main.py")
+    statements = []
+    execute = store.db.execute
+    store.db.execute = lambda sql, params=None: statements.append(sql) or execute(sql, params)
+
+    block = store.get_combined_system_prompt("FastAPI", pinned_limit=1)
+    # One retrieval statement; the cache's next-expiry lookup does not fetch rows
+    assert len([s for s in statements if "short_term_memory" in s and "min(expires_at)" not in s]) == 1
+    lines = block.split("\n")
+    assert lines[0].startswith("--- Conscious Working Memory") and "ruff + black" in lines[1]
+    assert lines[2] == "--- Relevant Memories ---" and "app/main.py" in lines[3] and lines[-1] == "--- End Memories ---"
+    # A pinned memory that also matches the query is shown once, as conscious memory
+    dedup = store.get_combined_system_prompt("ruff", pinned_limit=1)
+    assert dedup.count("ruff + black") == 1 and "Relevant Memories" not in dedup
+    # Cached separately from the relevant-only block
+    assert store.get_auto_ingest_system_prompt("FastAPI").startswith("--- Relevant Memories")
+    assert store.get_combined_system_prompt("FastAPI", pinned_limit=1) == block
+
+
+def test_retrieval_projects_columns_and_fetches_content_lazily(tmp_path: Path):
+    store = make_store(tmp_path)
+    store.record_conversation("Testing with pytest fixtures", "Add conftest.py with fixtures", model="local")
+    items = store.retrieve_context("pytest", limit=5)
+    assert items
+    assert all("searchable_content" not in it and "entities_json" not in it for it in items)
+
+    full = store.retrieve_context("pytest", limit=5, with_content=True)
+    assert all("pytest" in it["searchable_content"].lower() for it in full)
+    assert any(it.get("entities_json") for it in full if it["memory_type"] == "long_term")
+
+
+def test_ranking_weights_from_env_favor_recent_and_accessed(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("APOGEEMIND_RANK_STM_BOOST", "0")
+    monkeypatch.setenv("APOGEEMIND_RANK_ACCESS_WEIGHT", "1.0")
+    monkeypatch.setenv("APOGEEMIND_RANK_RECENCY_WEIGHT", "0.5")
+    store = make_store(tmp_path)
+    db = store.db
+    for mid in ("old", "used", "fresh"):
+        db.insert_ltm(
+            memory_id=mid,
+            namespace="ns",
+            category_primary="skill",
+            summary=f"docker compose {mid}",
+            searchable_content="docker compose services",
+            importance_score=0.9 if mid == "old" else 0.6,
+            classification=None,
+            entities_json=None,
+            keywords_json=None,
+            content_hash=None,
+        )
+    # A year-old high-importance row no longer crowds out fresh context
+    db.execute("UPDATE long_term_memory SET created_at = created_at - INTERVAL 365 DAY WHERE memory_id IN ('old', 'used')")
+    db.bump_ltm_access_bulk({"used": 20})
+
+    ids = [r["memory_id"] for r in store.retrieve_context("docker", limit=3)]
+    assert ids == ["used", "fresh", "old"]
+
+
+def test_promotion_is_incremental_from_watermark(tmp_path: Path):
+    store = make_store(tmp_path)
+    db, agent = store.db, store.conscious
+
+    def add(mid: str, category: str, importance: float) -> None:
+        db.insert_ltm(
+            memory_id=mid,
+            namespace="ns",
+            category_primary=category,
+            summary=f"summary {mid}",
+            searchable_content=f"content {mid}",
+            importance_score=importance,
+            classification=None,
+            entities_json=None,
+            keywords_json=None,
+            content_hash=None,
+        )
+
+    add("a", "preference", 0.9)
+    add("b", "skill", 0.7)
+    add("c", "skill", 0.1)  # below threshold
+    add("d", "fact", 0.9)  # not a promotable category
+    assert agent.run_initial_promotion("ns") == 2
+    rows = db.execute("SELECT memory_id, is_permanent_context FROM short_term_memory ORDER BY memory_id").rows
+    assert [(r["memory_id"], r["is_permanent_context"]) for r in rows] == [("conscious_a", True), ("conscious_b", False)]
+
+    # Nothing new: the pass returns without touching STM or the write generation
+    gen = db.write_generation("ns")
+    assert agent.run_initial_promotion("ns") == 0
+    assert db.write_generation("ns") == gen
+
+    # Only rows past the watermark are considered; re-promoting a deleted one does not happen
+    db.execute("DELETE FROM short_term_memory WHERE memory_id = 'conscious_b'")
+    add("e", "rule", 0.8)
+    assert agent.run_initial_promotion("ns") == 1
+    assert db.stm_count("ns") == 2
+
+
+def test_stm_ttl_assigned_excluded_and_swept(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("APOGEEMIND_STM_TTL_DAYS", "skill=1,context=1")
+    store = make_store(tmp_path)
+    db = store.db
+    db.insert_ltm(
+        memory_id="k1",
+        namespace="ns",
+        category_primary="skill",
+        summary="Use pytest parametrize",
+        searchable_content="pytest parametrize",
+        importance_score=0.9,
+        classification=None,
+        entities_json=None,
+        keywords_json=None,
+        content_hash=None,
+    )
+    store.conscious.run_initial_promotion("ns")
+    store.record_conversation("I prefer pytest over unittest", "Noted, pytest it is.", model="local")
+    rows = db.execute("SELECT memory_id, is_permanent_context, expires_at FROM short_term_memory WHERE namespace = 'ns'").rows
+    by_id = {r["memory_id"]: r for r in rows}
+    assert by_id["conscious_k1"]["expires_at"] is not None
+    # Preferences are permanent context and never get a TTL
+    assert all(r["expires_at"] is None for r in rows if r["is_permanent_context"])
+
+    db.execute("UPDATE short_term_memory SET expires_at = created_at - INTERVAL 1 MINUTE WHERE memory_id = 'conscious_k1'")
+    assert "parametrize" not in store.get_conscious_system_prompt()
+    assert all(r["memory_id"] != "conscious_k1" for r in store.retrieve_context("pytest", limit=10))
+
+    gen = db.write_generation("ns")
+    assert store.conscious.sweep_expired("ns") == 1
+    assert db.write_generation("ns") > gen
+    assert store.conscious.sweep_expired("ns") == 0
+
+
+def test_export_import_roundtrip_streams_and_dedups(tmp_path: Path):
+    src = make_store(tmp_path / "src")
+    src.record_conversation("We test with pytest fixtures", "Added conftest.py", model="local")
+    src.record_conversation("I prefer ruff for linting", "Will use ruff.", model="local")
+
+    for fmt in ("ndjson", "parquet"):
+        counts = src.export_namespace(str(tmp_path / fmt), fmt=fmt)
+        assert counts["chat_history"] == 2 and counts["long_term_memory"] >= 2
+    # NDJSON is one JSON object per line, timestamps included
+    first = (tmp_path / "ndjson" / "chat_history.ndjson").read_text().splitlines()[0]
+    assert json.loads(first)["timestamp"]
+    assert sum(len(c) for c in src.db.iter_namespace_rows("ns", "chat_history", chunk_size=1)) == 2
+
+    dst = make_store(tmp_path / "dst", namespace="other")
+    dst.record_conversation("We test with pytest fixtures", "Added conftest.py", model="local")
+    ltm_before = dst.db.namespace_counts("other")["ltm"]
+    got = dst.import_namespace(str(tmp_path / "parquet"))
+    assert got["chat_history"] == 2
+    # The LTM row already present in the target namespace is skipped by content_hash
+    assert dst.db.namespace_counts("other")["ltm"] == ltm_before + got["long_term_memory"] < ltm_before + counts["long_term_memory"]
+    assert dst.import_namespace(str(tmp_path / "ndjson")) == {t: 0 for t in got}
+    assert any("ruff" in r["summary"].lower() for r in dst.retrieve_context("ruff"))
+    with pytest.raises(ValueError):
+        src.export_namespace(str(tmp_path / "x"), fmt="csv")
+
+
+def test_import_into_indexed_db_is_searchable_and_promoted(tmp_path: Path):
+    src = make_store(tmp_path / "src")
+    src.record_conversation("I prefer ruff for linting", "Will use ruff.", model="local")
+    src.export_namespace(str(tmp_path / "export"), fmt="parquet")
+
+    # The target already has an FTS snapshot and a promotion watermark newer than the exported rows
+    dst = make_store(tmp_path / "dst", namespace="other")
+    dst.record_conversation("We test with pytest fixtures", "Added conftest.py", model="local")
+    dst.db.refresh_fts_indexes(force=True)
+    dst.db.promote_ltm_to_stm("other", 0.0, ["preference", "context"])
+
+    assert dst.import_namespace(str(tmp_path / "export"))["long_term_memory"] == 1
+    assert not any(dst.db.fts_dirty_counts().values()) or not dst.db.fts_enabled
+    hits = dst.db.search_memories("other", "ruff", limit=5)
+    assert any(r["memory_type"] == "long_term" for r in hits)
+    assert "ruff" in dst.get_conscious_system_prompt().lower()
+
+
+def test_record_batch_refreshes_fts_so_search_never_rebuilds(tmp_path: Path):
+    store = make_store(tmp_path)
+    if not store.db.fts_enabled:
+        pytest.skip("duckdb fts extension not available")
+    store.db.fts_refresh_threshold = 1
+    store.record_conversation("We lint with ruff", "Added ruff to pre-commit", model="local")
+    assert not any(store.db.fts_dirty_counts().values())
+
+    rebuilt = []
+    store.db.build_fts_index = rebuilt.append  # any rebuild on the read path is recorded
+    store.db.fts_refresh_threshold = 64
+    store.db._mark_fts_dirty("long_term_memory", 100)
+    assert store.retrieve_context("ruff") and store.get_combined_system_prompt("ruff")
+    assert rebuilt == []
@@ -0,0 +1,67 @@
+import time
+from pathlib import Path
+
+from apogeemind.store.memory_store import MemoryStore, MemoryStoreConfig
+from apogeemind.utils.query_cache import QueryCache
+
+
+def make_store(tmp_path: Path) -> MemoryStore:
+    return MemoryStore(MemoryStoreConfig(db_path=str(tmp_path / "memori.duckdb"), namespace="ns"))
+
+
+def test_inject_block_cached_across_instances_and_invalidated_by_writes(tmp_path: Path):
+    store = make_store(tmp_path)
+    store.record_conversation("We test with pytest fixtures", "Added conftest.py", model="local")
+    block = store.get_auto_ingest_system_prompt("pytest")
+    assert "conftest" in block
+
+    # A new instance (another hook process) hits the sidecar without searching
+    other = make_store(tmp_path)
+    other.retrieval.execute_search = None  # any retrieval would fail
+    assert other.get_auto_ingest_system_prompt("  PyTest ") == block
+
+    # A write to the namespace invalidates the cached block
+    gen = store.db.write_generation("ns")
+    store.record_conversation("How about temp dirs?", "Use tmp_path with pytest", model="local")
+    assert store.db.write_generation("ns") > gen
+    assert "tmp_path" in store.get_auto_ingest_system_prompt("pytest")
+
+    store.clear_memory("long_term")
+    assert "tmp_path" not in store.get_auto_ingest_system_prompt("pytest")
+
+
+def test_cached_block_expires_with_included_stm_row(tmp_path: Path):
+    store = make_store(tmp_path)
+    store.db.insert_stm(
+        memory_id="s1",
+        namespace="ns",
+        category_primary="conscious_context",
+        summary="Deploy freeze until the release",
+        searchable_content="Deploy freeze until the release",
+        importance_score=0.9,
+    )
+    # Give the row a TTL without a write that would bump the generation
+    store.db.execute("UPDATE short_term_memory SET expires_at = CAST(current_timestamp AS TIMESTAMP) + INTERVAL 1 SECOND")
+    assert "Deploy freeze" in store.get_combined_system_prompt("deploy")
+    assert "Deploy freeze" in store.get_combined_system_prompt("deploy")  # served from the cache
+
+    time.sleep(1.2)
+    # Nothing swept the row and the generation is unchanged, but the entry expired with it
+    assert "Deploy freeze" not in store.get_combined_system_prompt("deploy")
+
+
+def test_query_cache_ttl_and_lru(tmp_path: Path):
+    cache = QueryCache(str(tmp_path / "c.sqlite"), max_entries=2, ttl_seconds=60)
+    cache.put("ns", "a", 5, 1, "A")
+    cache.put("ns", "b", 5, 1, "B")
+    assert cache.get("ns", "a", 5, 1) == "A"  # a is now most recently used
+    cache.put("ns", "c", 5, 1, "C")
+    assert cache.get("ns", "b", 5, 1) is None
+    assert cache.get("ns", "a", 5, 1) == "A"
+    assert cache.get("ns", "a", 5, 2) is None  # other generation
+    cache.put("ns", "d", 5, 1, "D", expires_at=time.time() - 1)
+    assert cache.get("ns", "d", 5, 1) is None  # past its own expiry
+    assert cache.get("ns", "a", 3, 1) is None  # other limit
+
+    expired = QueryCache(str(tmp_path / "c.sqlite"), ttl_seconds=-1)
+    assert expired.get("ns", "a", 5, 1) is None
@@ -0,0 +1,25 @@
+from pathlib import Path
+
+from apogeemind.agents.retention_agent import RetentionAgent
+from apogeemind.db.duckdb_manager import DuckDBManager
+
+
+def test_retention_archives_by_age_and_row_count(tmp_path: Path):
+    db = DuckDBManager(str(tmp_path / "memori.duckdb"), auto_init_schema=True)
+    for i in range(5):
+        db.insert_chat("ns", "s", f"question {i}", f"answer {i}")
+    db.insert_chat("other", "s", "keep me", "ok")
+    db.execute("UPDATE chat_history SET timestamp = timestamp - INTERVAL 40 DAY WHERE user_input IN ('question 0', 'question 1')")
+
+    archive = tmp_path / "archive"
+    assert RetentionAgent(db, str(archive)).run("ns") == {}  # no policy configured
+    assert RetentionAgent(db, str(archive), max_age_days=30).run("ns") == {"ns": 2}
+    assert RetentionAgent(db, str(archive), max_rows=2).run() == {"ns": 1}
+    assert db.namespace_counts("ns")["chats"] == 2
+    assert db.namespace_counts("other")["chats"] == 1
+
+    # Archived rows stay queryable with read_parquet
+    rows = db.execute(
+        "SELECT user_input FROM read_parquet(?) ORDER BY user_input", (str(archive / "namespace=ns" / "*.parquet"),)
+    ).rows
+    assert [r["user_input"] for r in rows] == ["question 0", "question 1", "question 2"]
@@ -0,0 +1,113 @@
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from apogeemind.processing.vectors import HashedNgramVectorizer
+from apogeemind.retrieval.vector_store import IVFIndex, VectorStore
+from apogeemind.store.memory_store import MemoryStore, MemoryStoreConfig
+
+
+def test_vector_store_appends_and_searches_top_k(tmp_path: Path):
+    vec = HashedNgramVectorizer(dim=64)
+    store = VectorStore(str(tmp_path / "v"), dim=64)
+    texts = ["pytest fixtures", "docker compose services", "redis cache eviction"]
+    store.add("ns", ["a", "b"], vec.transform_many(texts[:2]))
+    assert store.search("ns", vec.transform("pytest fixture"), k=1)[0][0] == "a"
+
+    # A second reader picks up appended rows without reloading everything
+    reader = VectorStore(str(tmp_path / "v"), dim=64)
+    assert reader.count("ns") == 2
+    store.add("ns", ["c"], vec.transform_many(texts[2:]))
+    hits = reader.search("ns", vec.transform("redis cache"), k=3)
+    assert hits[0][0] == "c" and len(hits) == 3
+    assert hits[0][1] >= hits[1][1] >= hits[2][1]
+
+    store.drop("ns")
+    assert reader.count("ns") == 0 and reader.search("ns", vec.transform("x"), k=3) == []
+
+    # Drop and rewrite at least as many rows: the reader must not resume at its old offset
+    store.add("ns", ["a1", "a2"], vec.transform_many(texts[:2]))
+    assert reader.load("ns")[0] == ["a1", "a2"]
+    store.drop("ns")
+    store.add("ns", ["b1", "b2", "b3", "b4"], vec.transform_many(texts + ["pytest fixtures"]))
+    ids, mat = reader.load("ns")
+    assert ids == ["b1", "b2", "b3", "b4"] and mat.shape[0] == 4
+    assert reader.search("ns", vec.transform("redis cache"), k=1)[0][0] == "b3"
+
+
+def test_semantic_layer_finds_memories_without_lexical_overlap(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("APOGEEMIND_SEMANTIC", "1")
+    store = MemoryStore(MemoryStoreConfig(db_path=str(tmp_path / "memori.duckdb"), namespace="ns"))
+    store.record_conversation("How do we share setup?", "Use pytest fixtures in conftest.py", model="local")
+    store.record_conversation("Container setup?", "Run docker compose up for services", model="local")
+
+    items = store.retrieve_context("unit testing", limit=5)
+    assert items and "pytest" in items[0]["summary"]
+    assert items[0]["lexical"] is False and items[0]["semantic_score"] > 0
+
+    # Lexical matches still rank and carry their similarity too
+    lexical = store.retrieve_context("docker", limit=1)
+    assert lexical[0]["lexical"] is True and "docker" in lexical[0]["summary"]
+
+    # Rebuilding from the table reproduces the incrementally written vectors
+    ids_before = store.semantic.store.load("ns")[0]
+    assert store.rebuild_vectors() == len(ids_before)
+    assert sorted(store.semantic.store.load("ns")[0]) == sorted(ids_before)
+
+
+def test_ivf_index_trains_appends_and_repacks(tmp_path: Path):
+    rng = np.random.default_rng(0)
+    dim = 32
+
+    def batch(n):
+        m = rng.standard_normal((n, dim)).astype(np.float32)
+        return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+    store = VectorStore(str(tmp_path / "v"), dim=dim)
+    ivf = IVFIndex(store, nprobe=4, min_train_rows=256, retrain_growth=4.0, repack_fraction=0.25)
+    data = batch(300)
+    store.add("ns", [f"m{i}" for i in range(300)], data)
+    ivf.update("ns")
+    npz_path, assign_path = ivf._paths("ns")
+    assert npz_path.exists() and assign_path.stat().st_size == 300 * 4
+
+    # Appended rows are assigned and found through the exact tail before any repack
+    extra = batch(10)
+    store.add("ns", [f"x{i}" for i in range(10)], extra)
+    ivf.update("ns")
+    assert assign_path.stat().st_size == 310 * 4
+    assert ivf.search("ns", extra[3], k=1)[0][0] == "x3"
+
+    # Probing every list is exact
+    q = batch(1)[0]
+    exact = store.search("ns", q, k=5)
+    assert ivf.search("ns", q, k=5, nprobe=len(ivf._state("ns").centroids)) == exact
+
+    # Growing the tail past the repack threshold rewrites the pack; 4x growth retrains
+    more = batch(300)
+    store.add("ns", [f"y{i}" for i in range(300)], more)
+    ivf.update("ns")
+    assert len(ivf._state("ns").order) == 610
+    store.add("ns", [f"z{i}" for i in range(700)], batch(700))
+    ivf.update("ns")
+    assert len(ivf._state("ns").centroids) == IVFIndex.nlist_for(1310)
+    assert ivf.search("ns", more[7], k=1)[0][0] == "y7"
+
+    ivf.drop("ns")
+    assert not any(p.name.startswith("ns.d32.ivf") for p in (tmp_path / "v").iterdir())
+    assert ivf.search("ns", q, k=3) == store.search("ns", q, k=3)
+
+
+def test_keep_namespace_import_writes_vectors_for_each_imported_namespace(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("APOGEEMIND_SEMANTIC", "1")
+    src = MemoryStore(MemoryStoreConfig(db_path=str(tmp_path / "src" / "memori.duckdb"), namespace="code:a"))
+    src.record_conversation("I prefer ruff for linting", "Will use ruff.", model="local")
+    src.export_namespace(str(tmp_path / "export"), fmt="parquet")
+
+    dst = MemoryStore(MemoryStoreConfig(db_path=str(tmp_path / "dst" / "memori.duckdb"), namespace="ns"))
+    assert dst.import_namespace(str(tmp_path / "export"), keep_namespace=True)["long_term_memory"] >= 1
+    imported = [r["memory_id"] for rows in dst.db.iter_namespace_rows("code:a", "long_term_memory") for r in rows]
+    assert sorted(dst.semantic.store.load("code:a")[0]) == sorted(imported)
+    assert dst.semantic.store.load("ns")[0] == []
@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+
+from apogeemind.db.spool import WriteSpool, apply_spool_entries
+from apogeemind.store.memory_store import MemoryStore, MemoryStoreConfig
+
+
+def test_spool_drains_in_order_under_single_writer(tmp_path: Path):
+    db_path = str(tmp_path / "memori.duckdb")
+    spec = {"db_path": db_path, "namespace": "ns"}
+    spool = WriteSpool(db_path)
+    spool.enqueue(spec, [("We use FastAPI", "Create app/main.py")], model="m")
+    spool.enqueue(spec, [("Testing with pytest", "Add tests"), ("We use FastAPI", "Create app/main.py")], model="m")
+    assert len(spool.pending()) == 2
+
+    # A second drainer backs off while the writer lock is held; nothing is applied or lost
+    with spool.writer_lock() as held:
+        assert held
+        with spool.writer_lock() as other:
+            assert not other
+    assert len(spool.pending()) == 2
+
+    stores = {}
+
+    def get_store(s):
+        return stores.setdefault(s["namespace"], MemoryStore(MemoryStoreConfig(**s)))
+
+    with spool.writer_lock() as held:
+        assert spool.drain(lambda entries: apply_spool_entries(entries, get_store), batch_size=1) == 2
+    assert spool.pending() == []
+    counts = stores["ns"].db.namespace_counts("ns")
+    assert counts["chats"] == 3 and counts["ltm"] == 2
+
+
+def test_spool_keeps_entries_when_apply_fails(tmp_path: Path):
+    spool = WriteSpool(str(tmp_path / "memori.duckdb"))
+    spool.enqueue({"db_path": "x", "namespace": "ns"}, [("u", "a")])
+    (spool.spool_dir / "garbage.json").write_text("{not json")
+
+    def boom(entries):
+        raise RuntimeError("database is locked")
+
+    try:
+        spool.drain(boom)
+    except RuntimeError:
+        pass
+    pending = spool.pending()
+    assert len(pending) == 1 and pending[0].name != "garbage.json"
+    assert (spool.spool_dir / "garbage.bad").exists()
+
+
+def test_spool_is_per_db_file(tmp_path: Path):
+    a, b = str(tmp_path / "a.duckdb"), str(tmp_path / "b.duckdb")
+    spool_a, spool_b = WriteSpool(a), WriteSpool(b)
+    spool_a.enqueue({"db_path": a, "namespace": "ns"}, [("u", "a")])
+    spool_b.enqueue({"db_path": b, "namespace": "ns"}, [("u", "b")])
+    # An entry left in the shared directory by an older version goes to its own DB's drainer
+    legacy = tmp_path / "spool"
+    legacy.mkdir()
+    (legacy / "00000000000000000001-1-old.json").write_text(
+        json.dumps({"spec": {"db_path": b, "namespace": "ns"}, "model": None, "exchanges": [["u", "old"]]})
+    )
+
+    seen = []
+    with spool_a.writer_lock():
+        spool_a.drain(seen.extend)
+    assert [e["spec"]["db_path"] for e in seen] == [a]
+    assert len(spool_b.pending()) == 1 and len(list(legacy.iterdir())) == 1
+
+    seen.clear()
+    with spool_b.writer_lock():
+        assert spool_b.drain(seen.extend) == 2
+    assert [e["exchanges"][0][1] for e in seen] == ["old", "b"]
+    assert list(legacy.iterdir()) == []
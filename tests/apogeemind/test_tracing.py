@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import apogeemind.utils.tracing as tracing
+from apogeemind.store.memory_store import MemoryStore, MemoryStoreConfig
+from apogeemind.utils.tracing import Tracer, summarize_trace, trace_files
+
+
+@pytest.fixture
+def trace_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    path = tmp_path / "trace.ndjson"
+    monkeypatch.setenv("APOGEEMIND_TRACE", "1")
+    monkeypatch.setenv("APOGEEMIND_TRACE_FILE", str(path))
+    monkeypatch.setattr(tracing, "_tracer", None)
+    yield path
+    tracing._tracer = None
+
+
+def read_events(path: Path) -> list:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_store_stages_and_statements_are_traced(tmp_path: Path, trace_path: Path):
+    store = MemoryStore(MemoryStoreConfig(db_path=str(tmp_path / "memori.duckdb"), namespace="ns"))
+    store.record_conversation("I prefer ruff for linting", "Configured ruff in pyproject", model="local")
+    store.get_combined_system_prompt("ruff")
+    store.db.tracer.flush()
+
+    events = read_events(trace_path)
+    names = {e["name"] for e in events}
+    for stage in ("db.connect", "db.schema_init", "store.open", "promotion", "record", "record.redact",
+                  "record.heuristics", "record.dedup", "record.write", "record.prune", "inject", "inject.retrieve"):
+        assert stage in names, stage
+    statements = [e for e in events if e["name"] == "db.execute"]
+    assert statements and all("sql" in e and ("rows" in e or "error" in e) for e in statements)
+    assert any(e["name"] == "db.insert_many" and e["rows"] == 1 for e in events)
+
+    summary = {r["name"]: r for r in summarize_trace(str(trace_path))}
+    assert summary["record"]["count"] == 1
+    assert summary["db.execute"]["p50_ms"] <= summary["db.execute"]["p95_ms"] <= summary["db.execute"]["max_ms"]
+
+
+def test_disabled_tracer_writes_nothing(tmp_path: Path):
+    tracer = Tracer(None)
+    with tracer.span("x") as span:
+        span["rows"] = 1
+    with tracer.stages("s").time("a"):
+        pass
+    tracer.event("y", 1.0)
+    tracer.flush()
+    assert not list(tmp_path.iterdir())
+
+
+def test_trace_file_rotates(tmp_path: Path):
+    path = tmp_path / "t.ndjson"
+    tracer = Tracer(str(path), max_bytes=200, keep=2)
+    for i in range(40):
+        tracer.event("tick", float(i))
+    files = trace_files(str(path))
+    assert [p.name for p in files] == ["t.ndjson", "t.ndjson.1", "t.ndjson.2"]
+    assert all(p.stat().st_size < 400 for p in files)
+    [row] = summarize_trace(str(path))
+    assert row["name"] == "tick" and row["max_ms"] == 39.0
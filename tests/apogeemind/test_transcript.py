@@ -0,0 +1,62 @@
+import json
+from pathlib import Path
+
+from apogeemind.utils.transcript import TranscriptTailer, read_last_user_text
+
+
+def line(role: str, text: str, blocks: bool = True) -> str:
+    content = [{"type": "text", "text": text}] if blocks else text
+    return json.dumps({"type": role, "message": {"role": role, "content": content}}) + "\n"
+
+
+def tool_result() -> str:
+    content = [{"type": "tool_result", "tool_use_id": "t1", "content": "ok"}]
+    return json.dumps({"type": "user", "message": {"role": "user", "content": content}}) + "\n"
+
+
+def test_tailer_records_only_new_exchanges(tmp_path: Path):
+    transcript = tmp_path / "t.jsonl"
+    tailer = TranscriptTailer(str(tmp_path / "state.json"))
+    transcript.write_text(
+        line("user", "first question", blocks=False)
+        + line("assistant", "part one")
+        + tool_result()
+        + line("assistant", "part two")
+        + line("user", "second question")
+        + line("assistant", "second answer")
+    )
+    with tailer.pending(str(transcript)) as ex:
+        assert ex == [("first question", "part one\npart two"), ("second question", "second answer")]
+
+    # Nothing new: nothing returned; an unanswered prompt and a partial line wait for the next run
+    with tailer.pending(str(transcript)) as ex:
+        assert ex == []
+    with transcript.open("a") as fh:
+        fh.write(line("user", "third question") + '{"type": "assist')
+    with tailer.pending(str(transcript)) as ex:
+        assert ex == []
+    with transcript.open("a") as fh:
+        fh.write('ant"}\n' + line("assistant", "third answer"))
+    with tailer.pending(str(transcript)) as ex:
+        assert ex == [("third question", "third answer")]
+
+
+def test_tailer_keeps_offset_when_recording_fails(tmp_path: Path):
+    transcript = tmp_path / "t.jsonl"
+    transcript.write_text(line("user", "q") + line("assistant", "a"))
+    tailer = TranscriptTailer(str(tmp_path / "state.json"))
+    try:
+        with tailer.pending(str(transcript)) as ex:
+            assert ex
+            raise RuntimeError("db unavailable")
+    except RuntimeError:
+        pass
+    with tailer.pending(str(transcript)) as ex:
+        assert ex == [("q", "a")]
+
+
+def test_read_last_user_text_scans_backwards(tmp_path: Path):
+    transcript = tmp_path / "t.jsonl"
+    body = "".join(line("assistant", "x" * 100) for _ in range(50))
+    transcript.write_text(line("user", "old") + body + line("user", "latest prompt") + tool_result() + body)
+    assert read_last_user_text(str(transcript), block_size=256) == "latest prompt"